@@ -0,0 +1,69 @@
+"""
+Условные GET-запросы для метрик проекта (ETag / If-None-Match).
+Conditional GET support for project metric endpoints.
+
+ETag строится из пути эндпоинта, параметров запроса, версии данных проекта
+(Project.data_version, растёт при каждой загрузке) и текущего календарного
+интервала кэша метрик: ответ с относительным периодом (period_end = сейчас)
+меняется при смене интервала даже без новых данных. Время создания проекта
+отличает проект, пересозданный после удаления с тем же ID.
+
+Проверка стоит одного поиска по первичному ключу и выполняется как
+зависимость маршрута - до расчёта метрики. Зависимость возвращает ту же
+версию данных, и обработчик передаёт её в ключ кэша метрик, поэтому тело
+ответа и ETag всегда соответствуют одной версии данных в базе.
+"""
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import metrics_cache
+from app.db.session import get_async_read_db
+from app.models.models import Project
+
+
+def metric_etag(path: str, params: Iterable[Tuple[str, str]], version: Tuple, bucket: int) -> str:
+    """Сильный ETag для (эндпоинт, параметры, версия данных, интервал)."""
+    key = repr((path, sorted(params), version, bucket)).encode()
+    return f'"{hashlib.sha256(key).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, как требует RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def project_etag(
+    project_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+) -> Optional[Tuple]:
+    """
+    Зависимость маршрута метрики проекта: выставить ETag или ответить 304.
+    Route dependency that sets the ETag header or short-circuits with 304 Not Modified.
+
+    Возвращает версию данных проекта для ключа кэша (None - проект не найден).
+    """
+    row = (await db.execute(
+        select(Project.data_version, Project.created_at).where(Project.id == project_id)
+    )).first()
+    if row is None:
+        return None  # Обработчик ответит 404
+    version = (row.data_version, str(row.created_at))
+    etag = metric_etag(
+        request.url.path,
+        request.query_params.multi_items(),
+        version,
+        metrics_cache.current_bucket()
+    )
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return version
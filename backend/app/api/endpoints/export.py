@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db.session import get_read_db
+from app.models.models import Project
+from app.services.commit_export_service import EXPORT_FORMATS, CommitExportService
+
+router = APIRouter()
+
+
+@router.get("/{project_id}/commits/export")
+def export_commits(
+    project_id: int,
+    export_format: str = Query("parquet", alias="format", pattern="^(parquet|arrow)$"),
+    period_start: Optional[datetime] = Query(None, alias="from"),
+    period_end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Потоковый экспорт истории коммитов проекта в Parquet или Arrow IPC.
+    Stream the project's commits (all columns) as Parquet or an Arrow IPC stream.
+    """
+    if not CommitExportService.available():
+        raise HTTPException(status_code=501, detail="Export requires pyarrow: pip install pyarrow")
+    if db.query(Project.id).filter(Project.id == project_id).first() is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        CommitExportService.stream(db, project_id, export_format, period_start, period_end),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="project-{project_id}-commits.{extension}"'
+        }
+    )
@@ -0,0 +1,138 @@
+from typing import AsyncIterator, List, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import metrics_cache
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.models import Project
+from app.schemas.schemas import BulkIngestSummary
+from app.services.bulk_ingest_service import BulkIngestService
+
+router = APIRouter()
+
+
+async def _ndjson_batches(
+    request: Request,
+    batch_size: int,
+    max_line_bytes: int
+) -> AsyncIterator[Tuple[int, List[bytes]]]:
+    """
+    Разбить поток тела запроса на пачки строк NDJSON.
+
+    В памяти держится только текущая пачка и незавершённая строка.
+
+    Yields:
+        (номер первой строки пачки, строки пачки)
+    """
+    buffer = b""
+    batch: List[bytes] = []
+    first_line = 1
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > max_line_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"NDJSON line {first_line + len(batch)} exceeds {max_line_bytes} bytes"
+            )
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield first_line, batch
+                first_line += len(batch)
+                batch = []
+    if buffer:
+        batch.append(buffer)
+    if batch:
+        yield first_line, batch
+
+
+async def _bulk_ingest(request: Request, project_id: int, kind: str, db: Session) -> dict:
+    """Загрузить поток NDJSON пачками; разбор и запись пачки выполняются в пуле потоков."""
+    project = await run_in_threadpool(
+        lambda: db.query(Project.id).filter(Project.id == project_id).first()
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    members = await run_in_threadpool(BulkIngestService.load_member_ids, db, project_id)
+    summary = {
+        "project_id": project_id,
+        "kind": kind,
+        "received": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "rejected": 0,
+        "batches": 0,
+        "errors": [],
+    }
+    try:
+        async for first_line, lines in _ndjson_batches(
+            request, settings.BULK_INGEST_BATCH_SIZE, settings.BULK_INGEST_MAX_LINE_BYTES
+        ):
+            result = await run_in_threadpool(
+                BulkIngestService.ingest_batch, db, project_id, kind, lines, members, first_line
+            )
+            for key in ("received", "inserted", "duplicates", "rejected"):
+                summary[key] += result[key]
+            summary["batches"] += 1
+            remaining = settings.BULK_INGEST_MAX_ERRORS - len(summary["errors"])
+            summary["errors"].extend(result["errors"][:max(remaining, 0)])
+    finally:
+        # Уже записанные пачки остаются в базе даже при обрыве потока
+        if summary["inserted"]:
+            metrics_cache.invalidate_project(project_id)
+    return summary
+
+
+@router.post("/{project_id}/commits:bulk", response_model=BulkIngestSummary)
+async def bulk_ingest_commits(
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Потоковая загрузка коммитов в формате NDJSON (одна запись CommitIngest на строку).
+    Stream commits as NDJSON; existing external_ids are skipped.
+    """
+    return await _bulk_ingest(request, project_id, "commits", db)
+
+
+@router.post("/{project_id}/pull_requests:bulk", response_model=BulkIngestSummary)
+async def bulk_ingest_pull_requests(
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Потоковая загрузка pull request в формате NDJSON (PullRequestIngest).
+    Stream pull requests as NDJSON.
+    """
+    return await _bulk_ingest(request, project_id, "pull_requests", db)
+
+
+@router.post("/{project_id}/reviews:bulk", response_model=BulkIngestSummary)
+async def bulk_ingest_reviews(
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Потоковая загрузка code review в формате NDJSON (CodeReviewIngest).
+    Stream code reviews as NDJSON; PRs must be loaded first.
+    """
+    return await _bulk_ingest(request, project_id, "reviews", db)
+
+
+@router.post("/{project_id}/tasks:bulk", response_model=BulkIngestSummary)
+async def bulk_ingest_tasks(
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Потоковая загрузка задач в формате NDJSON (TaskIngest).
+    Stream tasks as NDJSON.
+    """
+    return await _bulk_ingest(request, project_id, "tasks", db)
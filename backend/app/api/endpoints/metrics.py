@@ -1,63 +1,87 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from app.db.session import get_db
+from typing import Optional, Tuple
+from app.api.conditional import project_etag
+from app.core.cache import metrics_cache
+from app.core.request_profiler import ProfiledRoute, profile_store, require_profiling_enabled
+from app.db.session import get_async_read_db
 from app.schemas.schemas import (
     ProjectEffectivenessMetrics,
+    PortfolioEffectivenessResponse,
     EmployeeCareMetrics,
     ActiveContributorsMetrics,
     CommitsPerPersonMetrics,
     TechnicalDebtAnalysis,
     BottleneckAnalysis,
-    PRsNeedingAttentionResponse
+    PRsNeedingAttentionResponse,
+    MetricTimeseries,
+    MetricsCacheStats,
+    RequestProfileReport
 )
 from app.services.project_effectiveness_service import ProjectEffectivenessService
 from app.services.project_technical_debt_service import ProjectTechnicalDebtService
-from app.services.project_bottleneck_service import ProjectBottleneckService
+from app.services.async_services import (
+    AsyncProjectBottleneckService,
+    AsyncProjectEffectivenessService,
+    AsyncProjectTechnicalDebtService,
+    AsyncProjectTimeseriesService
+)
+from app.services.metric_snapshot_writer import snapshot_writer
+from app.services.project_timeseries_service import TIMESERIES_BUCKETS, TIMESERIES_METRICS
 
-router = APIRouter()
+# Любой эндпоинт метрик можно профилировать параметром ?profile=cpu|mem
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/project/{project_id}/technical-debt", response_model=TechnicalDebtAnalysis)
-def get_project_technical_debt(
+async def get_project_technical_debt(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить анализ технического долга для проекта.
     Get technical debt analysis for a specific project.
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        analysis = await AsyncProjectTechnicalDebtService.analyze_technical_debt(
+            db=db,
+            project_id=project_id,
+            period_start=period_start,
+            period_end=period_end
+        )
+        
+        if analysis:
+            # Сохранить метрику в фоне
+            snapshot_writer.enqueue(ProjectTechnicalDebtService.build_technical_debt_metric(
+                project_id=project_id,
+                metrics=analysis,
+                period_start=period_start,
+                period_end=period_end
+            ))
+        return analysis
     
-    analysis = ProjectTechnicalDebtService.analyze_technical_debt(
-        db=db,
-        project_id=project_id,
-        period_start=period_start,
-        period_end=period_end
+    analysis = await metrics_cache.get_or_compute_async(
+        project_id, "technical_debt", period_days, compute, version=data_version
     )
     
     if not analysis:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Сохранить метрику
-    ProjectTechnicalDebtService.save_technical_debt_metric(
-        db=db,
-        project_id=project_id,
-        metrics=analysis,
-        period_start=period_start,
-        period_end=period_end
-    )
-    
     return analysis
 
 
 @router.get("/project/{project_id}/effectiveness", response_model=ProjectEffectivenessMetrics)
-def get_project_effectiveness(
+async def get_project_effectiveness(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить комплексные метрики эффективности проекта.
@@ -68,39 +92,82 @@ def get_project_effectiveness(
     - Work-life balance metrics
     - Alerts and recommendations
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        metrics = await AsyncProjectEffectivenessService.calculate_effectiveness_score(
+            db, project_id, period_start, period_end
+        )
+        
+        if metrics:
+            # Сохранить метрику в фоне
+            snapshot_writer.enqueue(ProjectEffectivenessService.build_project_metric(
+                project_id=project_id,
+                metric_type="effectiveness_score",
+                metric_data=metrics,
+                score=metrics["effectiveness_score"],
+                trend=metrics["trend"],
+                period_start=period_start,
+                period_end=period_end,
+                has_alert=metrics["has_alert"],
+                alert_message=metrics["alert_message"],
+                alert_severity=metrics["alert_severity"]
+            ))
+        return metrics
     
-    metrics = ProjectEffectivenessService.calculate_effectiveness_score(
-        db, project_id, period_start, period_end
+    metrics = await metrics_cache.get_or_compute_async(
+        project_id, "effectiveness", period_days, compute, version=data_version
     )
     
     if not metrics:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Сохранить метрику
-    ProjectEffectivenessService.save_project_metric(
-        db=db,
-        project_id=project_id,
-        metric_type="effectiveness_score",
-        metric_data=metrics,
-        score=metrics["effectiveness_score"],
-        trend=metrics["trend"],
-        period_start=period_start,
-        period_end=period_end,
-        has_alert=metrics["has_alert"],
-        alert_message=metrics["alert_message"],
-        alert_severity=metrics["alert_severity"]
-    )
-    
     return metrics
 
 
+@router.get("/projects/effectiveness", response_model=PortfolioEffectivenessResponse)
+async def get_portfolio_effectiveness(
+    ids: Optional[str] = Query(default=None, description="ID проектов через запятую (по умолчанию все проекты)"),
+    period_days: int = Query(default=30, ge=1, le=365),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Получить метрики эффективности для множества проектов одним запросом.
+    Get effectiveness metrics for many projects in one request.
+    
+    Оценка считается по тем же правилам, что и /project/{id}/effectiveness,
+    но статистика всех проектов страницы собирается одним GROUP BY project_id.
+    Несуществующие ID пропускаются.
+    """
+    project_ids = None
+    if ids:
+        try:
+            project_ids = sorted({int(value) for value in ids.split(",") if value.strip()})
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid project ids")
+    
+    period_end = datetime.utcnow()
+    period_start = period_end - timedelta(days=period_days)
+    
+    return await AsyncProjectEffectivenessService.calculate_portfolio_effectiveness(
+        db,
+        period_start,
+        period_end,
+        project_ids=project_ids,
+        skip=skip,
+        limit=limit
+    )
+
+
 @router.get("/project/{project_id}/employee-care", response_model=EmployeeCareMetrics)
-def get_project_employee_care(
+async def get_project_employee_care(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить агрегированную метрику заботы о сотрудниках для проекта.
@@ -113,39 +180,46 @@ def get_project_employee_care(
     - Статус (excellent, good, needs_attention, critical)
     - Рекомендации по улучшению
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        metrics = await AsyncProjectEffectivenessService.calculate_employee_care_metric(
+            db, project_id, period_start, period_end
+        )
+        
+        if metrics:
+            # Сохранить метрику в фоне
+            snapshot_writer.enqueue(ProjectEffectivenessService.build_project_metric(
+                project_id=project_id,
+                metric_type="employee_care",
+                metric_data=metrics,
+                score=metrics["employee_care_score"],
+                trend="stable",
+                period_start=period_start,
+                period_end=period_end,
+                has_alert=metrics["status"] in ["needs_attention", "critical"],
+                alert_message=metrics["recommendations"][0] if metrics["recommendations"] else None,
+                alert_severity="warning" if metrics["status"] == "needs_attention" else "critical" if metrics["status"] == "critical" else None
+            ))
+        return metrics
     
-    metrics = ProjectEffectivenessService.calculate_employee_care_metric(
-        db, project_id, period_start, period_end
+    metrics = await metrics_cache.get_or_compute_async(
+        project_id, "employee_care", period_days, compute, version=data_version
     )
     
     if not metrics:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Сохранить метрику
-    ProjectEffectivenessService.save_project_metric(
-        db=db,
-        project_id=project_id,
-        metric_type="employee_care",
-        metric_data=metrics,
-        score=metrics["employee_care_score"],
-        trend="stable",
-        period_start=period_start,
-        period_end=period_end,
-        has_alert=metrics["status"] in ["needs_attention", "critical"],
-        alert_message=metrics["recommendations"][0] if metrics["recommendations"] else None,
-        alert_severity="warning" if metrics["status"] == "needs_attention" else "critical" if metrics["status"] == "critical" else None
-    )
-    
     return metrics
 
 
 @router.get("/project/{project_id}/bottlenecks", response_model=BottleneckAnalysis)
-def get_project_bottlenecks(
+async def get_project_bottlenecks(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Анализ узких мест workflow проекта.
@@ -155,14 +229,19 @@ def get_project_bottlenecks(
     - Impact assessment
     - Recommendations to improve workflow
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        return await AsyncProjectBottleneckService.analyze_bottlenecks(
+            db=db,
+            project_id=project_id,
+            period_start=period_start,
+            period_end=period_end
+        )
     
-    analysis = ProjectBottleneckService.analyze_bottlenecks(
-        db=db,
-        project_id=project_id,
-        period_start=period_start,
-        period_end=period_end
+    analysis = await metrics_cache.get_or_compute_async(
+        project_id, "bottlenecks", period_days, compute, version=data_version
     )
     
     if not analysis:
@@ -171,12 +250,12 @@ def get_project_bottlenecks(
     return analysis
 
 
-@router.get("/project/{project_id}/prs-needing-attention", response_model=PRsNeedingAttentionResponse)
-def get_prs_needing_attention(
+@router.get("/project/{project_id}/prs-needing-attention", response_model=PRsNeedingAttentionResponse, dependencies=[Depends(project_etag)])
+async def get_prs_needing_attention(
     project_id: int,
     min_hours: float = Query(default=0.0, ge=0, description="Минимальное количество часов на ревью (0 = все PR)"),
     limit: int = Query(default=5, ge=1, le=20, description="Максимальное количество PR для возврата"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить список PR/MR (запросов).
@@ -187,7 +266,7 @@ def get_prs_needing_attention(
     
     УСТАРЕЛО: В новом ТЗ у нас нет доступа к данным о PR/MR.
     """
-    prs = ProjectBottleneckService.get_prs_needing_attention(
+    prs = await AsyncProjectBottleneckService.get_prs_needing_attention(
         db=db,
         project_id=project_id,
         min_hours_in_review=min_hours,
@@ -205,10 +284,11 @@ def get_prs_needing_attention(
 
 
 @router.get("/project/{project_id}/active-contributors", response_model=ActiveContributorsMetrics)
-def get_active_contributors(
+async def get_active_contributors(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365, description="Период анализа в днях (по умолчанию 30 дней)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить метрику активных участников проекта.
@@ -219,11 +299,16 @@ def get_active_contributors(
     Берутся все коммиты за последний месяц и смотрим кто автор.
     Каждый уникальный автор - это активный участник.
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        return await AsyncProjectEffectivenessService.calculate_active_contributors(
+            db, project_id, period_start, period_end
+        )
     
-    metrics = ProjectEffectivenessService.calculate_active_contributors(
-        db, project_id, period_start, period_end
+    metrics = await metrics_cache.get_or_compute_async(
+        project_id, "active_contributors", period_days, compute, version=data_version
     )
     
     if not metrics:
@@ -233,10 +318,11 @@ def get_active_contributors(
 
 
 @router.get("/project/{project_id}/commits-per-person", response_model=CommitsPerPersonMetrics)
-def get_commits_per_person(
+async def get_commits_per_person(
     project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
     period_days: int = Query(default=30, ge=1, le=365, description="Период анализа в днях (по умолчанию 30 дней)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Получить количество коммитов на каждого участника проекта.
@@ -249,11 +335,16 @@ def get_commits_per_person(
     - Количество измененных строк
     - Уровень экспертности (beginner, intermediate, advanced, expert)
     """
-    period_end = datetime.utcnow()
-    period_start = period_end - timedelta(days=period_days)
+    async def compute():
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=period_days)
+        
+        return await AsyncProjectEffectivenessService.calculate_commits_per_person(
+            db, project_id, period_start, period_end
+        )
     
-    metrics = ProjectEffectivenessService.calculate_commits_per_person(
-        db, project_id, period_start, period_end
+    metrics = await metrics_cache.get_or_compute_async(
+        project_id, "commits_per_person", period_days, compute, version=data_version
     )
     
     if not metrics:
@@ -261,3 +352,56 @@ def get_commits_per_person(
     
     return metrics
 
+
+@router.get("/project/{project_id}/timeseries", response_model=MetricTimeseries)
+async def get_metric_timeseries(
+    project_id: int,
+    data_version: Optional[Tuple] = Depends(project_etag),
+    metric: str = Query(default="effectiveness", pattern="^(" + "|".join(TIMESERIES_METRICS) + ")$",
+                        description="Метрика ряда"),
+    bucket: str = Query(default="week", pattern="^(" + "|".join(TIMESERIES_BUCKETS) + ")$",
+                        description="Интервал точки: day, week или month"),
+    periods: int = Query(default=12, ge=1, le=366, description="Количество интервалов"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Получить временной ряд метрики проекта для графиков.
+    Get a project metric for each of the last N day/week/month buckets.
+    
+    Все интервалы агрегируются одним запросом с GROUP BY по интервалу;
+    значения считаются теми же правилами, что и эндпоинты одного периода.
+    """
+    async def compute():
+        return await AsyncProjectTimeseriesService.calculate_timeseries(
+            db, project_id, metric, bucket, periods
+        )
+    
+    series = await metrics_cache.get_or_compute_async(
+        project_id, "timeseries", (metric, bucket, periods), compute, version=data_version
+    )
+    
+    if not series:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return series
+
+
+@router.get("/cache/stats", response_model=MetricsCacheStats)
+async def get_metrics_cache_stats():
+    """
+    Получить статистику кэша результатов метрик.
+    Get metric result cache statistics (hits, misses, hit ratio, evictions).
+    """
+    return metrics_cache.stats()
+
+
+@router.get("/profiles/{profile_id}", response_model=RequestProfileReport, dependencies=[Depends(require_profiling_enabled)])
+async def get_request_profile(profile_id: str):
+    """
+    Получить отчёт профилирования запроса по ID из заголовка X-Profile-Id.
+    Get a stored ?profile=cpu|mem report (top functions by cumulative time or top allocation sites).
+    """
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
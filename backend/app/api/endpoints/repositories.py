@@ -1,24 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
-from app.models.models import Project as ProjectModel
+from app.core.cache import metrics_cache
+from app.db.session import get_async_read_db, get_db
+from app.models.models import Commit, CommitDailyStats, FileModification, Project as ProjectModel
 from app.schemas.schemas import Project, ProjectCreate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Project])
-def list_projects(
+async def list_projects(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """List all projects."""
-    projects = db.query(ProjectModel).offset(skip).limit(limit).all()
-    return projects
+    result = await db.execute(select(ProjectModel).offset(skip).limit(limit))
+    return result.scalars().all()
 
 
+# Запись идёт через единственный пишущий engine; синхронный обработчик
+# выполняется в пуле потоков и не блокирует event loop
 @router.post("/", response_model=Project)
 def create_project(
     project: ProjectCreate,
@@ -26,9 +31,9 @@ def create_project(
 ):
     """Create a new project."""
     # Check if project already exists
-    existing = db.query(ProjectModel).filter(
-        ProjectModel.external_id == project.external_id
-    ).first()
+    existing = db.scalar(
+        select(ProjectModel.id).where(ProjectModel.external_id == project.external_id)
+    )
     if existing:
         raise HTTPException(status_code=400, detail="Project already exists")
     
@@ -40,14 +45,12 @@ def create_project(
 
 
 @router.get("/{project_id}", response_model=Project)
-def get_project(
+async def get_project(
     project_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific project."""
-    project = db.query(ProjectModel).filter(
-        ProjectModel.id == project_id
-    ).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
@@ -59,14 +62,18 @@ def delete_project(
     db: Session = Depends(get_db)
 ):
     """Delete a project."""
-    project = db.query(ProjectModel).filter(
-        ProjectModel.id == project_id
-    ).first()
+    project = db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    # Строки с денормализованным project_id удаляются одним запросом: иначе они
+    # указывали бы на ID, который SQLite выдаст следующему созданному проекту
+    db.execute(delete(Commit).where(Commit.project_id == project_id))
+    db.execute(delete(CommitDailyStats).where(CommitDailyStats.project_id == project_id))
+    db.execute(delete(FileModification).where(FileModification.project_id == project_id))
     db.delete(project)
     db.commit()
+    metrics_cache.invalidate_project(project_id)
     return {"message": "Project deleted successfully"}
 
 
@@ -0,0 +1,191 @@
+"""
+Кэш результатов метрик проектов.
+Result cache for project metric endpoints.
+
+Ключ записи: (проект, метрика, параметры, календарный интервал, версия данных).
+Календарный интервал выравнивается по METRICS_CACHE_BUCKET_SECONDS, поэтому
+запросы в пределах одного интервала переиспользуют результат, несмотря на то,
+что period_end = datetime.utcnow() меняется при каждом вызове.
+Версию данных передаёт вызывающий код - это (Project.data_version, created_at)
+из базы данных, та же, что входит в ETag. Загрузка в другом процессе (воркер
+uvicorn, координатор синхронизации) увеличивает версию в базе, и записи
+этого процесса со старой версией становятся недостижимыми.
+"""
+import contextvars
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Пропуск чтения из кэша в текущем контексте (профилирование запроса)
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("metrics_cache_bypass", default=False)
+
+
+class MetricsCache:
+    """Ограниченный LRU/TTL кэш с версионированием по проекту."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        bucket_seconds: float = 300.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def current_bucket(self) -> int:
+        """Номер текущего календарного интервала (общий для кэша и ETag метрик)."""
+        return int(self._clock() // self.bucket_seconds)
+
+    def _key(self, project_id: int, metric: str, params: Hashable, version: Hashable) -> Tuple:
+        """Построить ключ записи для текущего интервала и версии данных проекта."""
+        return (project_id, metric, params, self.current_bucket(), version)
+
+    def get(
+        self,
+        project_id: int,
+        metric: str,
+        params: Hashable = None,
+        version: Hashable = None
+    ) -> Optional[Any]:
+        """Получить значение из кэша или None, если записи нет или она устарела."""
+        if not self.enabled or _bypass.get():
+            return None
+        now = self._clock()
+        with self._lock:
+            key = self._key(project_id, metric, params, version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(
+        self,
+        project_id: int,
+        metric: str,
+        params: Hashable,
+        value: Any,
+        version: Hashable = None
+    ) -> None:
+        """Сохранить значение, вытесняя самые старые записи при переполнении."""
+        if not self.enabled:
+            return
+        with self._lock:
+            key = self._key(project_id, metric, params, version)
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @contextmanager
+    def bypass(self) -> Iterator[None]:
+        """Читать мимо кэша внутри блока (результаты по-прежнему сохраняются)."""
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
+
+    def get_or_compute(
+        self,
+        project_id: int,
+        metric: str,
+        params: Hashable,
+        compute: Callable[[], Any],
+        version: Hashable = None
+    ) -> Any:
+        """
+        Вернуть значение из кэша или вычислить и сохранить его.
+
+        Результат None (например, проект не найден) не кэшируется.
+        """
+        value = self.get(project_id, metric, params, version)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None:
+            self.set(project_id, metric, params, value, version)
+        return value
+
+    async def get_or_compute_async(
+        self,
+        project_id: int,
+        metric: str,
+        params: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        version: Hashable = None
+    ) -> Any:
+        """Асинхронный вариант get_or_compute: при попадании в кэш база данных не используется."""
+        value = self.get(project_id, metric, params, version)
+        if value is not None:
+            return value
+        value = await compute()
+        if value is not None:
+            self.set(project_id, metric, params, value, version)
+        return value
+
+    def invalidate_project(self, project_id: int) -> None:
+        """
+        Удалить записи проекта (новые данные или удаление проекта в этом процессе).
+
+        Устаревание определяется версией данных в ключе; удаление лишь
+        освобождает память сразу, не дожидаясь TTL и вытеснения.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == project_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Очистить кэш и сбросить счётчики."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict:
+        """Счётчики попаданий/промахов и заполненность кэша."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+metrics_cache = MetricsCache(
+    max_entries=settings.METRICS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.METRICS_CACHE_TTL_SECONDS,
+    bucket_seconds=settings.METRICS_CACHE_BUCKET_SECONDS,
+    enabled=settings.METRICS_CACHE_ENABLED,
+)
@@ -1,4 +1,5 @@
-from typing import List
+import os
+from typing import List, Literal
 from pydantic_settings import BaseSettings
 
 
@@ -8,11 +9,75 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     
     DATABASE_URL: str = "sqlite:///./git_komet.db"
+    # Асинхронный URL для API; по умолчанию выводится из DATABASE_URL (sqlite → sqlite+aiosqlite)
+    ASYNC_DATABASE_URL: str = ""
+    
+    # Продакшен-режим SQLite: WAL, прагмы соединений, пул только для чтения и один писатель
+    SQLITE_PRODUCTION_MODE: bool = False
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE_BYTES: int = 268_435_456
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Размер пула читающих соединений (по умолчанию - число ядер)
+    DB_READ_POOL_SIZE: int = os.cpu_count() or 4
+    DB_READ_MAX_OVERFLOW: int = 0
+    # Сколько ждать единственное пишущее соединение, секунд
+    DB_WRITE_POOL_TIMEOUT_SECONDS: float = 30.0
     
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
     DEFAULT_BRANCH: str = "main"
     
+    # Эндпоинт /metrics в текстовом формате Prometheus (HTTP, SQL, пулы, кэши)
+    INSTRUMENTATION_ENABLED: bool = True
+    # Диагностика: строки, материализованные вызовом сервиса (буферизует результаты SELECT)
+    INSTRUMENTATION_COUNT_ROWS: bool = False
+    
+    # Профилировщик SQL: включён для всех запросов при DEBUG или по заголовку;
+    # предупреждение N+1, если форма запроса повторяется больше порога
+    SQL_PROFILER_HEADER: str = "X-SQL-Profile"
+    SQL_PROFILER_REPEAT_THRESHOLD: int = 10
+    
+    # Профилирование запросов ?profile=cpu|mem (только при явном включении,
+    # независимо от DEBUG); отчёты хранятся в памяти, топ-N функций или мест выделения памяти
+    REQUEST_PROFILING_ENABLED: bool = False
+    REQUEST_PROFILE_TOP_N: int = 30
+    REQUEST_PROFILE_STORE_SIZE: int = 50
+    REQUEST_PROFILE_TRACEMALLOC_FRAMES: int = 1
+    
+    # Кэш результатов метрик
+    METRICS_CACHE_ENABLED: bool = True
+    METRICS_CACHE_MAX_ENTRIES: int = 4096
+    METRICS_CACHE_TTL_SECONDS: float = 300.0
+    METRICS_CACHE_BUCKET_SECONDS: float = 300.0
+    
+    # Фоновая запись снимков метрик
+    METRIC_SNAPSHOT_QUEUE_SIZE: int = 10000
+    METRIC_SNAPSHOT_BATCH_SIZE: int = 500
+    METRIC_SNAPSHOT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    
+    # Хранение истории снимков метрик (0 - хранить недельные снимки бессрочно)
+    METRIC_HISTORY_HOURLY_RETENTION_DAYS: int = 7
+    METRIC_HISTORY_DAILY_RETENTION_DAYS: int = 90
+    METRIC_HISTORY_WEEKLY_RETENTION_DAYS: int = 730
+    METRIC_HISTORY_COMPACTION_BATCH_SIZE: int = 500
+    
+    # Потоковая загрузка NDJSON
+    BULK_INGEST_BATCH_SIZE: int = 1000
+    BULK_INGEST_MAX_LINE_BYTES: int = 1_048_576
+    BULK_INGEST_MAX_ERRORS: int = 20
+    
+    # Экспорт истории коммитов (Parquet / Arrow IPC): строк в пачке и сжатие Parquet
+    EXPORT_BATCH_SIZE: int = 50_000
+    EXPORT_PARQUET_COMPRESSION: str = "zstd"
+    
+    # Коммит считается churn, если меняет файл, изменённый не более N дней назад
+    CHURN_WINDOW_DAYS: int = 21
+    
+    # Параллельная синхронизация Git-репозиториев
+    INGEST_MAX_WORKERS: int = 4
+    INGEST_QUEUE_SIZE: int = 16
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,380 @@
+"""
+Инструментирование API и базы данных в текстовом формате Prometheus.
+Prometheus text-format instrumentation for the API and the database.
+
+Метрики хранятся в обычных словарях: запись выполняется под
+неконкурентной блокировкой метрики, а чтение при сборе (/metrics) блокировок
+не берёт - словарь копируется атомарно под GIL, значение гистограммы
+заменяется целиком (кортеж), поэтому частый опрос не тормозит запросы.
+
+Собираются:
+- число запросов и гистограмма задержки по маршруту, запросы в обработке;
+- SQL-запросы (всего и на один HTTP-запрос), выдачи соединений из пулов,
+  занятые и overflow-соединения пулов;
+- длительность вызовов сервисов метрик и (в диагностическом режиме
+  INSTRUMENTATION_COUNT_ROWS) число строк, материализованных за вызов;
+- попадания и промахи кэшей.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+ROW_COUNT_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Базовый класс метрики с метками."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(dict(self._values).items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Монотонный счётчик."""
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    """Текущее значение (может уменьшаться)."""
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+
+class CallbackGauge(_Metric):
+    """Gauge, значения которого вычисляются при сборе: callback() -> {метки: значение}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(labels) or ((0,) * (len(self.buckets) + 1), 0.0, 0)
+            counts = counts[:index] + (counts[index] + 1,) + counts[index + 1:]
+            # Значение заменяется целиком: сбор видит согласованный снимок без блокировки
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total, count) in sorted(dict(self._values).items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых эндпоинтом /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "gitkomet_http_requests_total", "HTTP requests by route template and status.",
+    ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "gitkomet_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route")
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "gitkomet_http_requests_in_flight", "HTTP requests currently being served."
+)
+DB_QUERIES = registry.counter(
+    "gitkomet_db_queries_total", "SQL statements executed."
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "gitkomet_db_queries_per_request", "SQL statements executed while serving one HTTP request.",
+    ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+DB_POOL_CHECKOUTS = registry.counter(
+    "gitkomet_db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",)
+)
+SERVICE_CALL_DURATION = registry.histogram(
+    "gitkomet_service_call_duration_seconds", "Metric service call latency.", ("service",)
+)
+SERVICE_ROWS = registry.histogram(
+    "gitkomet_service_rows_materialized", "Result rows materialized by one metric service call.",
+    ("service",), buckets=ROW_COUNT_BUCKETS
+)
+
+_engines: Dict[str, Engine] = {}
+_caches: Dict[str, object] = {}
+
+
+def _pool_stats() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        for stat in ("size", "checkedout", "overflow"):
+            # NullPool и StaticPool не ведут этих счётчиков
+            if hasattr(pool, stat):
+                values[(name, stat)] = getattr(pool, stat)()
+        if (name, "overflow") in values:
+            # QueuePool отсчитывает overflow от -pool_size
+            values[(name, "overflow")] = max(values[(name, "overflow")], 0)
+    return values
+
+
+def _cache_stats() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for name, cache in list(_caches.items()):
+        stats = cache.stats()
+        for stat in ("entries", "hits", "misses", "hit_ratio", "evictions", "invalidations"):
+            values[(name, stat)] = stats[stat]
+    return values
+
+
+registry.register(CallbackGauge(
+    "gitkomet_db_pool_connections", "Pool size, checked-out and overflow connections per engine.",
+    ("engine", "stat"), _pool_stats
+))
+registry.register(CallbackGauge(
+    "gitkomet_cache", "Cache entries, hits, misses, hit ratio, evictions and invalidations.",
+    ("cache", "stat"), _cache_stats
+))
+
+
+class _CallStats:
+    """Счётчики текущего HTTP-запроса или вызова сервиса."""
+    __slots__ = ("queries", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+
+# Контекст передаётся в потоки пула Starlette и в greenlet run_sync,
+# поэтому SQL-события относятся к своему запросу
+_request_stats: contextvars.ContextVar[Optional[_CallStats]] = contextvars.ContextVar(
+    "gitkomet_request_stats", default=None
+)
+_service_stats: contextvars.ContextVar[Optional[_CallStats]] = contextvars.ContextVar(
+    "gitkomet_service_stats", default=None
+)
+
+
+def _on_cursor_execute(*_) -> None:
+    DB_QUERIES.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+def _on_orm_execute(state):
+    """
+    Подсчитать строки SELECT внутри вызова сервиса метрик.
+
+    Результат буферизуется целиком (freeze), в том числе для .first() без
+    LIMIT, поэтому подсчёт включается только явно (count_rows).
+    """
+    stats = _service_stats.get()
+    if stats is None or not state.is_select:
+        return None
+    options = state.execution_options
+    if options.get("stream_results") or options.get("yield_per"):
+        return None  # Потоковые результаты не буферизуются
+    frozen = state.invoke_statement().freeze()
+    stats.rows += len(frozen.data)
+    return frozen()
+
+
+_installed = False
+_count_rows = False
+
+
+def instrument_sqlalchemy(count_rows: bool = False) -> None:
+    """
+    Подписаться на события выполнения SQL всех engine (один раз).
+
+    count_rows - диагностический режим: считать строки, материализованные
+    вызовами сервисов метрик (ценой буферизации результатов SELECT).
+    """
+    global _installed, _count_rows
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _on_cursor_execute)
+        _installed = True
+    if count_rows and not _count_rows:
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+        _count_rows = True
+
+
+def instrument_engine(name: str, engine: Engine) -> None:
+    """
+    Учитывать выдачи соединений и состояние пула engine (для async - engine.sync_engine).
+    Engine, уже зарегистрированный под другим именем (общий пул чтения и записи), пропускается.
+    """
+    if any(registered is engine for registered in _engines.values()):
+        return
+    _engines[name] = engine
+    event.listen(engine, "checkout", lambda *_: DB_POOL_CHECKOUTS.inc(name))
+
+
+def register_cache(name: str, cache) -> None:
+    """Отдавать статистику кэша (объект с методом stats(), как MetricsCache)."""
+    _caches[name] = cache
+
+
+@contextmanager
+def service_call(service: str) -> Iterator[None]:
+    """Измерить длительность вызова сервиса и (если включено) число материализованных строк."""
+    stats = _CallStats()
+    token = _service_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _service_stats.reset(token)
+        SERVICE_CALL_DURATION.observe(service, value=time.perf_counter() - started)
+        if _count_rows:
+            SERVICE_ROWS.observe(service, value=stats.rows)
+
+
+class InstrumentationMiddleware:
+    """ASGI-middleware: число запросов, задержка, запросы в обработке и SQL на запрос."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = _CallStats()
+        token = _request_stats.set(stats)
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            _request_stats.reset(token)
+            # Шаблон маршрута (а не путь) ограничивает число рядов
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status["code"]))
+            HTTP_REQUEST_DURATION.observe(method, route, value=elapsed)
+            DB_QUERIES_PER_REQUEST.observe(route, value=stats.queries)
@@ -0,0 +1,328 @@
+"""
+Профилирование отдельных запросов по требованию (?profile=cpu|mem).
+On-demand CPU and allocation profiling of individual requests.
+
+Маршруты роутера с route_class=ProfiledRoute принимают параметр запроса
+profile: обработчик целиком (зависимости, SQL, загрузка ORM-объектов, расчёт
+оценок и сериализация ответа pydantic) выполняется под cProfile (cpu) или
+tracemalloc (mem). Отчёт с топом функций по накопленному времени или мест
+выделения памяти сохраняется в ограниченном хранилище; его ID возвращается
+в заголовке X-Profile-Id, сам отчёт - GET /api/v1/metrics/profiles/{id}.
+
+Доступно только при REQUEST_PROFILING_ENABLED (и параметр, и чтение
+отчётов). Кэш метрик на время профилирования пропускается, иначе измерялось
+бы попадание в кэш.
+
+Профилирование выполняется по одному запросу за раз, но cProfile работает
+на потоке event loop, а tracemalloc - на весь процесс, поэтому запросы,
+выполняющиеся во время ожиданий обработчика, тоже измеряются. Отчёт cpu
+оставляет только функции, достижимые из обработчика, и не заходит в
+эндпоинты и зависимости других маршрутов; время общих функций (SQLAlchemy,
+pydantic) всё равно может включать чужие вызовы. Это ограничение указывается
+в поле note отчёта.
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.cache import metrics_cache
+from app.core.config import settings
+
+
+PROFILE_MODES = ("cpu", "mem")
+
+PROFILE_NOTES = {
+    "cpu": (
+        "Only functions reached from this handler are listed, but the profiler runs on the "
+        "event-loop thread: shared functions (SQLAlchemy, pydantic) also include calls made "
+        "by other requests that ran while this handler was awaiting."
+    ),
+    "mem": (
+        "tracemalloc traces the whole process: allocations by other requests that ran while "
+        "this handler was awaiting are included."
+    ),
+}
+
+FunctionKey = Tuple[str, int, str]
+
+# Кадры самого профилировщика не интересны в отчёте
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+
+
+def _location(filename: str, lineno: int, function: Optional[str] = None) -> str:
+    """Короткое место в коде: путь относительно каталога из sys.path (пакет/модуль)."""
+    roots = sorted((os.path.abspath(path) for path in sys.path), key=len, reverse=True)
+    for root in roots:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    location = f"{filename}:{lineno}"
+    return f"{location}({function})" if function else location
+
+
+def _function_key(function) -> Optional[FunctionKey]:
+    """Ключ функции в статистике cProfile: (файл, первая строка, имя)."""
+    code = getattr(function, "__code__", None)
+    if code is None:
+        return None
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _dependency_calls(route: APIRoute) -> Iterable:
+    """Эндпоинт маршрута и все его зависимости."""
+    stack = [route.dependant]
+    while stack:
+        dependant = stack.pop()
+        if dependant.call is not None:
+            yield dependant.call
+        stack.extend(dependant.dependencies)
+
+
+def foreign_functions(route: APIRoute, routes: Iterable) -> Set[FunctionKey]:
+    """Эндпоинты и зависимости других маршрутов приложения, не используемые этим маршрутом."""
+    own = {_function_key(call) for call in _dependency_calls(route)}
+    foreign = {
+        _function_key(call)
+        for other in routes if isinstance(other, APIRoute) and other is not route
+        for call in _dependency_calls(other)
+    }
+    return foreign - own - {None}
+
+
+def _reachable(stats: Dict, roots: Set[FunctionKey], blocked: Set[FunctionKey]) -> Set[FunctionKey]:
+    """
+    Функции, вызванные (транзитивно) из roots, не заходя в blocked.
+
+    Встроенные функции (sum, sorted, greenlet.switch, ...) раскрываются,
+    только если все их вызывающие уже достижимы: иначе через обратные вызовы
+    граф связал бы обработчик с чужим кодом, использующим ту же функцию.
+    """
+    children = defaultdict(set)
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller in callers:
+            children[caller].add(function)
+    reached = set()
+    pending = set()  # Достижимые встроенные функции, ещё не раскрытые
+    stack = list(roots)
+    while True:
+        while stack:
+            function = stack.pop()
+            if function in reached or function in blocked:
+                continue
+            reached.add(function)
+            if function[0] == "~":
+                pending.add(function)
+            else:
+                stack.extend(children[function])
+        expandable = [function for function in pending if reached.issuperset(stats[function][4])]
+        if not expandable:
+            return reached
+        for function in expandable:
+            pending.discard(function)
+            stack.extend(children[function])
+
+
+def _enclosing_functions() -> Set[FunctionKey]:
+    """
+    Функции текущего стека вызовов (ASGI-приложение, middleware, цикл событий).
+
+    Они уже выполняются при включении cProfile и повторно входят при каждом
+    возобновлении корутины, поэтому их время - это время всего запроса.
+    """
+    functions = set()
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        functions.add((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return functions
+
+
+def cpu_entries(
+    profiler: cProfile.Profile,
+    limit: int,
+    exclude: Set[FunctionKey] = frozenset(),
+    blocked: Set[FunctionKey] = frozenset()
+) -> List[Dict]:
+    """
+    Топ функций по накопленному времени.
+
+    Учитываются только функции, достижимые из обработчика (вызванные из
+    run_profiled), без функций из blocked и всего, что вызвано только ими.
+    """
+    stats = pstats.Stats(profiler).stats
+    handler = {
+        function for function, (_, _, _, _, callers) in stats.items()
+        if _RUN_PROFILED in callers
+    }
+    reachable = _reachable(stats, handler, blocked)
+    rows = sorted(
+        (
+            (function, stats[function]) for function in reachable
+            if function[0] not in _IGNORED_FILES and function not in exclude
+        ),
+        key=lambda item: item[1][3],
+        reverse=True
+    )
+    return [
+        {
+            "location": _location(filename, lineno, function),
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, lineno, function), (_, calls, own, cumulative, _) in rows[:limit]
+    ]
+
+
+def memory_entries(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> List[Dict]:
+    """Топ мест выделения памяти, оставшейся занятой к концу запроса."""
+    filters = [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    entries = []
+    for stat in diff:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        entries.append({
+            "location": _location(frame.filename, frame.lineno),
+            "size_kb": round(stat.size_diff / 1024, 2),
+            "allocations": stat.count_diff,
+        })
+        if len(entries) == limit:
+            break
+    return entries
+
+
+class ProfileStore:
+    """Ограниченное хранилище последних отчётов (вытесняются самые старые)."""
+
+    def __init__(self, max_entries: int = 50):
+        self.max_entries = max_entries
+        self._reports: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, report: Dict) -> str:
+        report_id = uuid.uuid4().hex
+        with self._lock:
+            self._reports[report_id] = {"id": report_id, **report}
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+        return report_id
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reports.clear()
+
+
+profile_store = ProfileStore(max_entries=settings.REQUEST_PROFILE_STORE_SIZE)
+
+# Один профилируемый запрос за раз
+_profile_lock = asyncio.Lock()
+
+
+def require_profiling_enabled() -> None:
+    """Профилирование запросов и чтение отчётов доступны только при REQUEST_PROFILING_ENABLED."""
+    if not settings.REQUEST_PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Request profiling is disabled")
+
+
+async def run_profiled(
+    mode: str,
+    call: Callable[[], Awaitable[Response]],
+    blocked: Set[FunctionKey] = frozenset()
+) -> Tuple[Response, Dict]:
+    """
+    Выполнить обработчик под профилировщиком и вернуть (ответ, отчёт).
+
+    blocked - функции других маршрутов, которые исключаются из отчёта cpu.
+    """
+    limit = settings.REQUEST_PROFILE_TOP_N
+    async with _profile_lock:
+        with metrics_cache.bypass():
+            started = time.perf_counter()
+            if mode == "cpu":
+                enclosing = _enclosing_functions()
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = await call()
+                finally:
+                    profiler.disable()
+                duration = time.perf_counter() - started
+                report = {"entries": cpu_entries(profiler, limit, enclosing, blocked)}
+            else:
+                was_tracing = tracemalloc.is_tracing()
+                if not was_tracing:
+                    tracemalloc.start(settings.REQUEST_PROFILE_TRACEMALLOC_FRAMES)
+                try:
+                    before = tracemalloc.take_snapshot()
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    response = await call()
+                    duration = time.perf_counter() - started
+                    peak = tracemalloc.get_traced_memory()[1]
+                    after = tracemalloc.take_snapshot()
+                finally:
+                    if not was_tracing:
+                        tracemalloc.stop()
+                report = {
+                    "peak_kb": round((peak - baseline) / 1024, 2),
+                    "entries": memory_entries(before, after, limit),
+                }
+    report["duration_ms"] = round(duration * 1000, 2)
+    report["note"] = PROFILE_NOTES[mode]
+    return response, report
+
+
+_RUN_PROFILED = _function_key(run_profiled)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Маршрут с поддержкой ?profile=cpu|mem.
+    Route class adding on-demand profiling to every endpoint of a router.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            mode = request.query_params.get("profile")
+            if mode is None:
+                return await handler(request)
+            require_profiling_enabled()
+            if mode not in PROFILE_MODES:
+                raise HTTPException(status_code=422, detail=f"Unknown profile mode, expected one of {PROFILE_MODES}")
+
+            blocked = foreign_functions(self, request.app.routes)
+            response, report = await run_profiled(mode, lambda: handler(request), blocked)
+            report_id = profile_store.add({
+                "mode": mode,
+                "method": request.method,
+                "path": request.url.path,
+                "query": str(request.query_params),
+                "status_code": response.status_code,
+                "created_at": datetime.utcnow(),
+                **report,
+            })
+            response.headers["X-Profile-Id"] = report_id
+            return response
+
+        return profiled_handler
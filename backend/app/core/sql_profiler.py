@@ -0,0 +1,158 @@
+"""
+Профилировщик SQL-запросов одного HTTP-запроса с поиском N+1.
+Per-request SQL profiler with N+1 detection.
+
+Включается для всех запросов при Settings.DEBUG или для отдельного запроса
+заголовком SQL_PROFILER_HEADER (например, X-SQL-Profile: 1). Считает
+запросы, их суммарное и максимальное время и повторы одинаковых по форме
+запросов (текст без значений параметров, списки IN (?, ?, ...) свёрнуты).
+
+Итог возвращается в заголовке Server-Timing и пишется структурированной
+строкой лога; если форма запроса повторяется больше
+SQL_PROFILER_REPEAT_THRESHOLD раз, пишется предупреждение о вероятном N+1.
+Для потоковых ответов заголовок отражает запросы до начала ответа.
+"""
+import contextvars
+import json
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Список параметров: (?, ?, ?), (%s, %s) или (:p_1, :p_2)
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: пробелы нормализованы, списки параметров свёрнуты."""
+    return _PARAMETER_LIST.sub("(?...)", " ".join(statement.split()))
+
+
+class QueryProfile:
+    """Статистика SQL-запросов одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        shape = statement_shape(statement)
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = shape
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Формы запросов, повторённые больше threshold раз (по убыванию числа повторов)."""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count > threshold),
+            key=lambda item: -item[1]
+        )
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing."""
+        return (
+            f'db;desc="{self.count} queries";dur={self.total_seconds * 1000:.2f}, '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}"
+        )
+
+    def summary(self, threshold: int) -> Dict:
+        repeated = self.repeated(threshold)
+        return {
+            "queries": self.count,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "slowest_ms": round(self.slowest_seconds * 1000, 2),
+            "slowest_statement": self.slowest_statement,
+            "distinct_statements": len(self.shapes),
+            "repeated_statements": [{"statement": shape, "count": count} for shape, count in repeated],
+        }
+
+
+_current_profile: contextvars.ContextVar[Optional[QueryProfile]] = contextvars.ContextVar(
+    "gitkomet_sql_profile", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("sql_profiler_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = conn.info.get("sql_profiler_started")
+    if profile is not None and started:
+        profile.record(statement, time.perf_counter() - started.pop())
+
+
+_installed = False
+
+
+def install_sql_profiler() -> None:
+    """Подписаться на события выполнения SQL всех engine (один раз)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+class SQLProfilerMiddleware:
+    """ASGI-middleware: профиль SQL запроса в Server-Timing и в логе."""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.SQL_PROFILER_HEADER.lower().encode()
+
+    def _enabled(self, scope) -> bool:
+        if settings.DEBUG:
+            return True
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value not in (b"", b"0", b"false")
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            threshold = settings.SQL_PROFILER_REPEAT_THRESHOLD
+            summary = profile.summary(threshold)
+            logger.info(json.dumps(
+                {"event": "sql_profile", "method": scope["method"], "path": scope["path"], **summary},
+                ensure_ascii=False
+            ))
+            for repeated in summary["repeated_statements"]:
+                logger.warning(
+                    "Вероятный N+1: %s %s выполнил один и тот же запрос %d раз: %s",
+                    scope["method"], scope["path"], repeated["count"], repeated["statement"]
+                )
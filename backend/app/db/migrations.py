@@ -0,0 +1,121 @@
+"""
+Лёгкие миграции схемы для уже существующих баз данных.
+Lightweight schema migrations for existing databases.
+
+Base.metadata.create_all() создаёт только отсутствующие таблицы и не изменяет
+существующие, поэтому новые колонки, backfill данных и индексы добавляются здесь.
+Все шаги идемпотентны и могут выполняться при каждом запуске init_db().
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.db.session import Base
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    """Проверить наличие колонки в таблице."""
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """Добавить колонку, если её ещё нет. Возвращает True, если колонка была добавлена."""
+    if _column_exists(conn, table, column):
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def migrate_commit_project_id(conn: Connection) -> None:
+    """
+    Добавить commits.project_id и заполнить его по проекту автора коммита.
+    Add commits.project_id and backfill it from the commit author's project.
+    """
+    _add_column_if_missing(conn, "commits", "project_id", "INTEGER REFERENCES projects(id)")
+    conn.execute(text(
+        "UPDATE commits SET project_id = ("
+        "  SELECT team_members.project_id FROM team_members"
+        "  WHERE team_members.id = commits.author_id"
+        ") WHERE project_id IS NULL AND author_id IS NOT NULL"
+    ))
+
+
+def backfill_commit_daily_stats(conn: Connection) -> None:
+    """
+    Заполнить дневную сводку коммитов, если она пуста, а коммиты уже есть.
+    Backfill the daily commit rollup for databases created before it existed.
+    """
+    has_rollup = conn.execute(text("SELECT 1 FROM commit_daily_stats LIMIT 1")).first()
+    has_commits = conn.execute(text(
+        "SELECT 1 FROM commits WHERE project_id IS NOT NULL AND author_id IS NOT NULL LIMIT 1"
+    )).first()
+    if has_rollup or not has_commits:
+        return
+
+    from app.services.commit_stats_service import CommitStatsService
+
+    session = Session(bind=conn)
+    CommitStatsService.rebuild(session)
+    session.flush()
+
+
+def migrate_metric_snapshot_keys(conn: Connection, table: str, key_columns: str) -> None:
+    """
+    Добавить ключ снимка (period_days, granularity, bucket_start) и удалить дубликаты.
+    Add snapshot key columns and deduplicate before the unique index is created.
+
+    Старые снимки считаются почасовыми по моменту period_end; из снимков
+    одного часа остаётся последний записанный.
+    """
+    _add_column_if_missing(conn, table, "period_days", "INTEGER")
+    _add_column_if_missing(conn, table, "granularity", "VARCHAR")
+    _add_column_if_missing(conn, table, "bucket_start", "DATETIME")
+    conn.execute(text(
+        f"UPDATE {table} SET"
+        "  period_days = CAST(ROUND(julianday(period_end) - julianday(period_start)) AS INTEGER),"
+        "  granularity = 'hourly',"
+        "  bucket_start = strftime('%Y-%m-%d %H:00:00.000000', period_end)"
+        " WHERE bucket_start IS NULL"
+    ))
+    conn.execute(text(
+        f"DELETE FROM {table} WHERE id NOT IN ("
+        f"  SELECT MAX(id) FROM {table} GROUP BY {key_columns}, granularity, bucket_start"
+        ")"
+    ))
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    """Создать индексы, объявленные в моделях, которых ещё нет в базе."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def run_migrations(engine: Engine) -> None:
+    """Применить все миграции к базе данных."""
+    with engine.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        if "projects" in existing_tables:
+            _add_column_if_missing(conn, "projects", "repository_path", "VARCHAR")
+            _add_column_if_missing(conn, "projects", "last_synced_sha", "VARCHAR")
+            _add_column_if_missing(conn, "projects", "data_version", "INTEGER NOT NULL DEFAULT 0")
+        if "commits" in existing_tables:
+            migrate_commit_project_id(conn)
+            _add_column_if_missing(conn, "commits", "todo_removed", "INTEGER DEFAULT 0")
+        if "commit_daily_stats" in existing_tables:
+            _add_column_if_missing(
+                conn, "commit_daily_stats", "todo_removed_count", "INTEGER NOT NULL DEFAULT 0"
+            )
+        if "code_reviews" in existing_tables:
+            _add_column_if_missing(conn, "code_reviews", "external_id", "VARCHAR")
+        if "project_metrics" in existing_tables:
+            migrate_metric_snapshot_keys(
+                conn, "project_metrics", "project_id, metric_type, period_days"
+            )
+        if "technical_debt_metrics" in existing_tables:
+            migrate_metric_snapshot_keys(
+                conn, "technical_debt_metrics", "project_id, period_days"
+            )
+        create_missing_indexes(conn)
+        if {"commits", "commit_daily_stats"} <= existing_tables:
+            backfill_commit_daily_stats(conn)
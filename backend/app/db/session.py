@@ -1,15 +1,134 @@
-from sqlalchemy import create_engine
+from typing import Dict, List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    Прагмы SQLite, выполняемые при открытии соединения в продакшен-режиме.
+    SQLite pragmas applied on connect in production mode.
+
+    WAL позволяет читателям работать параллельно с писателем; режим журнала
+    хранится в файле базы, поэтому его включает только пишущее соединение.
+    Читающие соединения открываются с query_only.
+    """
+    pragmas = [] if read_only else ["PRAGMA journal_mode=WAL"]
+    pragmas += [
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        # Отрицательное значение cache_size задаётся в килобайтах
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_BYTES)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _production_mode(url: str) -> bool:
+    """Продакшен-режим применяется только к файловой базе SQLite."""
+    parsed = make_url(url)
+    return (
+        settings.SQLITE_PRODUCTION_MODE
+        and parsed.get_backend_name() == "sqlite"
+        and parsed.database not in (None, "", ":memory:")
+    )
+
+
+def _engine_options(url: str, read_only: bool, async_engine: bool = False) -> Dict:
+    """Параметры пула: читатели - пул размера DB_READ_POOL_SIZE, писатель - одно соединение."""
+    if not _production_mode(url):
+        return {}
+    if read_only:
+        options = {"pool_size": settings.DB_READ_POOL_SIZE, "max_overflow": settings.DB_READ_MAX_OVERFLOW}
+    else:
+        options = {"pool_size": 1, "max_overflow": 0, "pool_timeout": settings.DB_WRITE_POOL_TIMEOUT_SECONDS}
+    # aiosqlite по умолчанию не держит пул (NullPool)
+    options["poolclass"] = AsyncAdaptedQueuePool if async_engine else QueuePool
+    return options
+
+
+def configure_sqlite(engine: Engine, read_only: bool = False) -> None:
+    """Выполнять прагмы продакшен-режима на каждом новом соединении engine."""
+    if not _production_mode(str(engine.url)):
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+# Единственный пишущий engine: загрузка данных, запись снимков метрик, изменение проектов
 engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
+    settings.DATABASE_URL, connect_args={"check_same_thread": False},
+    **_engine_options(settings.DATABASE_URL, read_only=False)
 )
+configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Синхронный читающий engine для долгих потоковых чтений (экспорт), чтобы
+# не занимать единственное пишущее соединение
+if settings.SQLITE_PRODUCTION_MODE:
+    read_engine = create_engine(
+        settings.DATABASE_URL, connect_args={"check_same_thread": False},
+        **_engine_options(settings.DATABASE_URL, read_only=True)
+    )
+    configure_sqlite(read_engine, read_only=True)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
+# Асинхронные драйверы для синхронных URL базы данных
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    URL асинхронного драйвера для той же базы данных.
+
+    URL с асинхронным драйвером (например, sqlite+aiosqlite) не изменяется.
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS.values():
+        return url
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _create_async_engine(read_only: bool):
+    url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+    created = create_async_engine(url, **_engine_options(url, read_only, async_engine=True))
+    configure_sqlite(created.sync_engine, read_only)
+    return created
+
+
+# Асинхронный путь для обработчиков API только для чтения: ожидание базы
+# данных не занимает поток из пула Starlette. Асинхронного писателя нет:
+# все записи идут через единственное соединение синхронного engine
+# (обработчики записи - синхронные и выполняются в пуле потоков), поэтому
+# в процессе не бывает двух пишущих соединений, ждущих busy_timeout.
+# В продакшен-режиме соединения открываются с query_only.
+async_read_engine = _create_async_engine(read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -19,5 +138,22 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def init_db():
+    from app.db.migrations import run_migrations
+    import app.models.models  # noqa: F401 - зарегистрировать модели в Base.metadata
+
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
@@ -1,12 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.core import instrumentation
+from app.core.cache import metrics_cache
 from app.core.config import settings
-from app.api.endpoints import metrics, repositories
+from app.core.sql_profiler import SQLProfilerMiddleware, install_sql_profiler
+from app.api.endpoints import export, ingest, metrics, repositories
+from app.db.session import async_read_engine, engine, read_engine
+from app.services.metric_snapshot_writer import snapshot_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Фоновая запись снимков метрик; при остановке очередь дописывается
+    snapshot_writer.start()
+    yield
+    snapshot_writer.stop()
+    await async_read_engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    description="Git-Komet: Project effectiveness analysis through Git metrics"
+    description="Git-Komet: Project effectiveness analysis through Git metrics",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -16,10 +34,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Дашборд передаёт ETag обратно в If-None-Match
+    expose_headers=["ETag", "X-Profile-Id"],
 )
 
+if settings.INSTRUMENTATION_ENABLED:
+    instrumentation.instrument_sqlalchemy(count_rows=settings.INSTRUMENTATION_COUNT_ROWS)
+    instrumentation.instrument_engine("write", engine)
+    instrumentation.instrument_engine("read", read_engine)
+    instrumentation.instrument_engine("async_read", async_read_engine.sync_engine)
+    instrumentation.register_cache("metrics", metrics_cache)
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+
+# Профиль SQL запроса (DEBUG или заголовок X-SQL-Profile)
+install_sql_profiler()
+app.add_middleware(SQLProfilerMiddleware)
+
 # Include routers
 app.include_router(repositories.router, prefix=f"{settings.API_V1_STR}/projects", tags=["projects"])
+app.include_router(ingest.router, prefix=f"{settings.API_V1_STR}/projects", tags=["ingest"])
+app.include_router(export.router, prefix=f"{settings.API_V1_STR}/projects", tags=["export"])
 app.include_router(metrics.router, prefix=f"{settings.API_V1_STR}/metrics", tags=["metrics"])
 
 
@@ -42,3 +76,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+if settings.INSTRUMENTATION_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Метрики сервиса в текстовом формате Prometheus."""
+        return PlainTextResponse(instrumentation.registry.render(), media_type=instrumentation.CONTENT_TYPE)
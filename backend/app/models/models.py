@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Float, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -12,6 +12,10 @@ class Project(Base):
     external_id = Column(String, unique=True, index=True, nullable=False)  # External project ID
     name = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
+    repository_path = Column(String, nullable=True)  # Путь к локальному клону для GitRepositoryProvider
+    last_synced_sha = Column(String, nullable=True)  # Последний загруженный коммит (HEAD при синхронизации)
+    # Увеличивается при каждой загрузке новых данных; входит в ETag ответов метрик
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -21,6 +25,7 @@ class Project(Base):
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     project_metrics = relationship("ProjectMetric", back_populates="project", cascade="all, delete-orphan")
     technical_debt_metrics = relationship("TechnicalDebtMetric", back_populates="project", cascade="all, delete-orphan")
+    file_modifications = relationship("FileModification", back_populates="project", cascade="all, delete-orphan")
 
 
 class ProjectMember(Base):
@@ -41,6 +46,11 @@ class ProjectMember(Base):
     pull_requests = relationship("PullRequest", foreign_keys="PullRequest.author_id", back_populates="author")
     reviews = relationship("CodeReview", back_populates="reviewer")
     tasks = relationship("Task", back_populates="assignee")
+    
+    __table_args__ = (
+        # Поиск участника проекта по email при загрузке данных
+        Index("ix_team_members_project_email", "project_id", "email"),
+    )
 
 
 class Commit(Base):
@@ -49,6 +59,7 @@ class Commit(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     external_id = Column(String, unique=True, index=True, nullable=False)  # Commit SHA
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)  # Денормализовано из автора
     author_id = Column(Integer, ForeignKey("team_members.id"), nullable=True)
     message = Column(String, nullable=False)
     author_email = Column(String, nullable=False)
@@ -60,6 +71,7 @@ class Commit(Base):
     has_tests = Column(Boolean, default=False)
     test_coverage_delta = Column(Float, nullable=True)  # Change in test coverage
     todo_count = Column(Integer, default=0)  # Number of TODO comments added
+    todo_removed = Column(Integer, default=0)  # Number of TODO comments removed
     
     # Code churn tracking
     is_churn = Column(Boolean, default=False)  # If code was modified again within short period
@@ -71,6 +83,58 @@ class Commit(Base):
     
     # Relationships
     author = relationship("ProjectMember", back_populates="commits")
+    
+    __table_args__ = (
+        # Покрывающий индекс для агрегатов по периоду (без обращения к таблице)
+        Index(
+            "ix_commits_project_committed_at",
+            "project_id", "committed_at", "author_id",
+            "is_after_hours", "is_weekend", "is_churn",
+        ),
+        Index("ix_commits_project_author_committed_at", "project_id", "author_id", "committed_at"),
+    )
+
+
+class CommitDailyStats(Base):
+    """Дневная сводка коммитов автора в проекте / Daily commit rollup per project author"""
+    __tablename__ = "commit_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("team_members.id"), nullable=False)
+    day = Column(Date, nullable=False)  # День коммитов (UTC)
+    
+    commit_count = Column(Integer, nullable=False, default=0)
+    insertions = Column(Integer, nullable=False, default=0)
+    deletions = Column(Integer, nullable=False, default=0)
+    after_hours_count = Column(Integer, nullable=False, default=0)
+    weekend_count = Column(Integer, nullable=False, default=0)
+    churn_count = Column(Integer, nullable=False, default=0)
+    todo_count = Column(Integer, nullable=False, default=0)
+    todo_removed_count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_commit_daily_stats_project_day_author", "project_id", "day", "author_id", unique=True),
+    )
+
+
+class FileModification(Base):
+    """Последнее изменение файла проекта / Last modification of a project file (churn index)"""
+    __tablename__ = "file_modifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    path = Column(String, nullable=False)
+    last_modified_at = Column(DateTime, nullable=False)
+    last_author_email = Column(String, nullable=True)
+    last_commit_sha = Column(String, nullable=True)
+    
+    # Relationships
+    project = relationship("Project", back_populates="file_modifications")
+    
+    __table_args__ = (
+        Index("ix_file_modifications_project_path", "project_id", "path", unique=True),
+    )
 
 
 class PullRequest(Base):
@@ -103,6 +167,10 @@ class PullRequest(Base):
     project = relationship("Project", back_populates="pull_requests")
     author = relationship("ProjectMember", foreign_keys=[author_id], back_populates="pull_requests")
     reviews = relationship("CodeReview", back_populates="pull_request", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_pull_requests_project_state", "project_id", "state"),
+    )
 
 
 class CodeReview(Base):
@@ -110,6 +178,7 @@ class CodeReview(Base):
     __tablename__ = "code_reviews"
 
     id = Column(Integer, primary_key=True, index=True)
+    external_id = Column(String, unique=True, index=True, nullable=True)  # Review ID (для идемпотентной загрузки)
     pull_request_id = Column(Integer, ForeignKey("pull_requests.id"), nullable=False)
     reviewer_id = Column(Integer, ForeignKey("team_members.id"), nullable=True)
     state = Column(String, nullable=False)  # approved, changes_requested, commented
@@ -121,6 +190,11 @@ class CodeReview(Base):
     # Relationships
     pull_request = relationship("PullRequest", back_populates="reviews")
     reviewer = relationship("ProjectMember", back_populates="reviews")
+    
+    __table_args__ = (
+        # Поиск первого ревью PR через MIN(created_at) по индексу
+        Index("ix_code_reviews_pr_created_at", "pull_request_id", "created_at"),
+    )
 
 
 class Task(Base):
@@ -165,6 +239,11 @@ class ProjectMetric(Base):
     period_end = Column(DateTime, nullable=False)
     calculated_at = Column(DateTime, default=datetime.utcnow)
     
+    # Ключ снимка: одна строка на (проект, метрика, длина периода, интервал истории)
+    period_days = Column(Integer, nullable=True)
+    granularity = Column(String, nullable=True, default="hourly")  # hourly, daily, weekly
+    bucket_start = Column(DateTime, nullable=True)
+    
     # Alert data
     has_alert = Column(Boolean, default=False)
     alert_message = Column(String, nullable=True)
@@ -173,6 +252,14 @@ class ProjectMetric(Base):
     # Relationships
     project = relationship("Project", back_populates="project_metrics")
 
+    __table_args__ = (
+        Index(
+            "ix_project_metrics_snapshot_key",
+            "project_id", "metric_type", "period_days", "granularity", "bucket_start",
+            unique=True
+        ),
+    )
+
 
 class TechnicalDebtMetric(Base):
     """Отслеживание технического долга / Technical debt tracking over time"""
@@ -192,5 +279,18 @@ class TechnicalDebtMetric(Base):
     period_start = Column(DateTime, nullable=False)
     period_end = Column(DateTime, nullable=False)
     
+    # Ключ снимка: одна строка на (проект, длина периода, интервал истории)
+    period_days = Column(Integer, nullable=True)
+    granularity = Column(String, nullable=True, default="hourly")  # hourly, daily, weekly
+    bucket_start = Column(DateTime, nullable=True)
+    
     # Relationships
     project = relationship("Project", back_populates="technical_debt_metrics")
+
+    __table_args__ = (
+        Index(
+            "ix_technical_debt_metrics_snapshot_key",
+            "project_id", "period_days", "granularity", "bucket_start",
+            unique=True
+        ),
+    )
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 # Project Schemas (replaces Repository)
@@ -8,6 +8,7 @@ class ProjectBase(BaseModel):
     name: str
     external_id: str
     description: Optional[str] = None
+    repository_path: Optional[str] = None
 
 
 class ProjectCreate(ProjectBase):
@@ -16,6 +17,8 @@ class ProjectCreate(ProjectBase):
 
 class Project(ProjectBase):
     id: int
+    last_synced_sha: Optional[str] = None
+    data_version: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -56,6 +59,7 @@ class CommitBase(BaseModel):
     has_tests: bool = False
     test_coverage_delta: Optional[float] = None
     todo_count: int = 0
+    todo_removed: int = 0
 
 
 class Commit(CommitBase):
@@ -135,7 +139,96 @@ class Task(TaskBase):
         from_attributes = True
 
 
+# Bulk Ingest Schemas (одна запись NDJSON; проект задаётся в пути запроса)
+class CommitIngest(CommitBase):
+    is_churn: bool = False
+    churn_days: Optional[int] = None
+    # Пути изменённых файлов; если указаны, is_churn и churn_days вычисляются по индексу файлов
+    files: Optional[List[str]] = None
+    # Если не указаны, вычисляются по committed_at
+    is_after_hours: Optional[bool] = None
+    is_weekend: Optional[bool] = None
+
+
+class PullRequestIngest(BaseModel):
+    external_id: str
+    author_email: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    state: str
+    created_at: datetime
+    updated_at: datetime
+    merged_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+    time_to_first_review: Optional[float] = None
+    time_to_merge: Optional[float] = None
+    review_cycles: int = 0
+    lines_added: int = 0
+    lines_deleted: int = 0
+    files_changed: int = 0
+
+
+class CodeReviewIngest(BaseModel):
+    external_id: str
+    # PR задаётся внешним ID или внутренним ID
+    pull_request_external_id: Optional[str] = None
+    pull_request_id: Optional[int] = None
+    reviewer_email: Optional[str] = None
+    state: str
+    created_at: datetime
+    comments_count: int = 0
+    critical_comments: int = 0
+    todo_comments: int = 0
+
+
+class TaskIngest(BaseModel):
+    external_id: str
+    assignee_email: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    state: str
+    priority: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    time_in_todo: Optional[float] = None
+    time_in_development: Optional[float] = None
+    time_in_review: Optional[float] = None
+    time_in_testing: Optional[float] = None
+
+
+class BulkIngestError(BaseModel):
+    """Отклонённая строка NDJSON / Rejected NDJSON line"""
+    line: int
+    message: str
+
+
+class BulkIngestSummary(BaseModel):
+    """Итог потоковой загрузки / Bulk ingestion summary"""
+    project_id: int
+    kind: str  # commits, pull_requests, reviews, tasks
+    received: int
+    inserted: int
+    duplicates: int
+    rejected: int
+    batches: int
+    errors: List[BulkIngestError]
+
+
 # Analysis Response Schemas
+class EffectivenessPeriodMetrics(BaseModel):
+    """Оценка эффективности за предыдущий период / Effectiveness score for the previous window"""
+    effectiveness_score: float
+    total_commits: int
+    active_contributors: int
+    after_hours_percentage: float
+    weekend_percentage: float
+    churn_rate: float
+    components: Dict[str, float]
+    period_start: datetime
+    period_end: datetime
+
+
 class ProjectEffectivenessMetrics(BaseModel):
     """
     Метрики эффективности проекта / Project effectiveness metrics.
@@ -146,11 +239,14 @@ class ProjectEffectivenessMetrics(BaseModel):
     project_name: str
     effectiveness_score: float  # 0-100
     trend: str  # improving, stable, declining
+    score_delta: float = 0.0  # Изменение оценки относительно предыдущего периода
     total_commits: int
     active_contributors: int
     after_hours_percentage: float
     weekend_percentage: float
     churn_rate: float
+    components: Dict[str, float] = {}  # commit_activity, team_engagement, work_life_balance, code_quality
+    previous_period: Optional[EffectivenessPeriodMetrics] = None
     has_alert: bool
     alert_message: Optional[str] = None
     alert_severity: Optional[str] = None
@@ -158,6 +254,16 @@ class ProjectEffectivenessMetrics(BaseModel):
     period_end: datetime
 
 
+class PortfolioEffectivenessResponse(BaseModel):
+    """Метрики эффективности для множества проектов / Portfolio effectiveness metrics"""
+    projects: List[ProjectEffectivenessMetrics]
+    total_count: int
+    skip: int
+    limit: int
+    period_start: datetime
+    period_end: datetime
+
+
 class EmployeeCareMetrics(BaseModel):
     """Метрика заботы о сотрудниках / Employee care metrics"""
     project_id: int
@@ -219,7 +325,9 @@ class TechnicalDebtAnalysis(BaseModel):
     Новое ТЗ: Анализируются ТОЛЬКО TODO комментарии из diff коммитов.
     """
     project_id: int
-    todo_count: int
+    todo_count: int  # Чистое изменение: добавлено минус удалено
+    todo_added: int = 0
+    todo_removed: int = 0
     todo_trend: str  # up, down, stable
     technical_debt_score: float  # 0-100, lower is better
     recommendations: List[str]
@@ -227,6 +335,25 @@ class TechnicalDebtAnalysis(BaseModel):
     period_end: datetime
 
 
+class TimeseriesPoint(BaseModel):
+    """Значение метрики за один интервал / Metric value for one bucket"""
+    period_start: datetime
+    period_end: datetime
+    value: float
+    total_commits: int
+    active_contributors: int
+    components: Dict[str, float] = {}
+
+
+class MetricTimeseries(BaseModel):
+    """Временной ряд метрики проекта для графиков / Bucketed project metric time series"""
+    project_id: int
+    project_name: str
+    metric: str  # effectiveness, employee_care, technical_debt, active_contributors, commits
+    bucket: str  # day, week, month
+    points: List[TimeseriesPoint]
+
+
 class BottleneckAnalysis(BaseModel):
     team_id: Optional[int] = None
     project_id: Optional[int] = None
@@ -258,3 +385,40 @@ class PRsNeedingAttentionResponse(BaseModel):
     project_id: int
     prs: List[PRNeedingAttention]
     total_count: int
+
+
+class MetricsCacheStats(BaseModel):
+    """Статистика кэша результатов метрик / Metric result cache statistics"""
+    enabled: bool
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
+
+
+class RequestProfileEntry(BaseModel):
+    """Строка отчёта профилирования / Profile report line (function or allocation site)"""
+    location: str
+    calls: Optional[int] = None  # cpu
+    own_ms: Optional[float] = None  # cpu
+    cumulative_ms: Optional[float] = None  # cpu
+    size_kb: Optional[float] = None  # mem
+    allocations: Optional[int] = None  # mem
+
+
+class RequestProfileReport(BaseModel):
+    """Отчёт профилирования запроса / On-demand request profile report"""
+    id: str
+    mode: str  # cpu, mem
+    method: str
+    path: str
+    query: str
+    status_code: int
+    created_at: datetime
+    duration_ms: float
+    peak_kb: Optional[float] = None  # mem
+    note: Optional[str] = None  # Ограничения измерения (параллельные запросы)
+    entries: List[RequestProfileEntry]
@@ -0,0 +1,51 @@
+"""
+Асинхронные версии сервисов метрик.
+Async counterparts of the metric services for the async API path.
+
+Каждый публичный метод сервиса, принимающий сессию первым аргументом,
+получает асинхронного двойника с тем же именем, принимающего AsyncSession.
+Вызов выполняется через AsyncSession.run_sync: тот же синхронный код ORM
+работает поверх асинхронного соединения, поэтому логика метрик существует
+в одном экземпляре, а обработчик не занимает поток, пока ждёт базу данных.
+"""
+import functools
+import inspect
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.instrumentation import service_call
+from app.services.commit_stats_service import CommitStatsService
+from app.services.project_bottleneck_service import ProjectBottleneckService
+from app.services.project_effectiveness_service import ProjectEffectivenessService
+from app.services.project_technical_debt_service import ProjectTechnicalDebtService
+from app.services.project_timeseries_service import ProjectTimeseriesService
+
+
+def _async_method(method):
+    @functools.wraps(method)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        with service_call(method.__qualname__):
+            return await db.run_sync(method, *args, **kwargs)
+    return staticmethod(wrapper)
+
+
+def async_service(service: type) -> type:
+    """Построить класс с асинхронными версиями методов сервиса, работающих с БД."""
+    methods = {}
+    for name, value in vars(service).items():
+        if name.startswith("_") or not isinstance(value, staticmethod):
+            continue
+        parameters = list(inspect.signature(value.__func__).parameters)
+        if parameters and parameters[0] == "db":
+            methods[name] = _async_method(value.__func__)
+    return type(f"Async{service.__name__}", (), {
+        "__doc__": f"Асинхронные версии методов {service.__name__}.",
+        **methods,
+    })
+
+
+AsyncCommitStatsService = async_service(CommitStatsService)
+AsyncProjectBottleneckService = async_service(ProjectBottleneckService)
+AsyncProjectEffectivenessService = async_service(ProjectEffectivenessService)
+AsyncProjectTechnicalDebtService = async_service(ProjectTechnicalDebtService)
+AsyncProjectTimeseriesService = async_service(ProjectTimeseriesService)
@@ -0,0 +1,232 @@
+"""
+Сервис пакетной загрузки данных проекта.
+Service for idempotent bulk ingestion of commits, PRs, reviews and tasks.
+
+Записи загружаются пачками: одна пачка - один executemany
+INSERT ... ON CONFLICT(external_id) DO NOTHING и один коммит транзакции,
+поэтому повторная загрузка тех же данных безопасна, а объём памяти
+ограничен размером пачки, а не всего потока.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from dataclasses import dataclass
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.models import Commit, CodeReview, Project, ProjectMember, PullRequest, Task
+from app.schemas.schemas import CommitIngest, CodeReviewIngest, PullRequestIngest, TaskIngest
+from app.services.churn_service import ChurnService
+from app.services.commit_stats_service import CommitStatsService
+
+
+@dataclass(frozen=True)
+class _IngestKind:
+    """Описание типа загружаемых записей."""
+    schema: type
+    model: type
+    build_row: Callable
+
+
+def _commit_row(project_id: int, record: CommitIngest, members: Dict[str, int], _) -> Dict:
+    hour = record.committed_at.hour
+    return {
+        "external_id": record.external_id,
+        "project_id": project_id,
+        "author_id": members.get(record.author_email),
+        "message": record.message,
+        "author_email": record.author_email,
+        "author_name": record.author_name,
+        "committed_at": record.committed_at,
+        "files_changed": record.files_changed,
+        "insertions": record.insertions,
+        "deletions": record.deletions,
+        "has_tests": record.has_tests,
+        "test_coverage_delta": record.test_coverage_delta,
+        "todo_count": record.todo_count,
+        "todo_removed": record.todo_removed,
+        "is_churn": record.is_churn,
+        "churn_days": record.churn_days,
+        # Те же правила рабочего времени, что и у поставщиков данных
+        "is_after_hours": (
+            record.is_after_hours if record.is_after_hours is not None else hour < 9 or hour > 18
+        ),
+        "is_weekend": (
+            record.is_weekend if record.is_weekend is not None else record.committed_at.weekday() >= 5
+        ),
+    }
+
+
+def _pull_request_row(project_id: int, record: PullRequestIngest, members: Dict[str, int], _) -> Dict:
+    row = record.model_dump(exclude={"author_email"})
+    row["project_id"] = project_id
+    row["author_id"] = members.get(record.author_email)
+    return row
+
+
+def _review_row(project_id: int, record: CodeReviewIngest, members: Dict[str, int], pr_ids) -> Dict:
+    by_external_id, known_ids = pr_ids
+    if record.pull_request_external_id is not None:
+        pull_request_id = by_external_id.get(record.pull_request_external_id)
+    else:
+        pull_request_id = record.pull_request_id if record.pull_request_id in known_ids else None
+    if pull_request_id is None:
+        raise ValueError("pull request not found in project")
+    row = record.model_dump(exclude={"pull_request_external_id", "reviewer_email"})
+    row["pull_request_id"] = pull_request_id
+    row["reviewer_id"] = members.get(record.reviewer_email)
+    return row
+
+
+def _task_row(project_id: int, record: TaskIngest, members: Dict[str, int], _) -> Dict:
+    row = record.model_dump(exclude={"assignee_email"})
+    row["project_id"] = project_id
+    row["assignee_id"] = members.get(record.assignee_email)
+    return row
+
+
+INGEST_KINDS = {
+    "commits": _IngestKind(CommitIngest, Commit, _commit_row),
+    "pull_requests": _IngestKind(PullRequestIngest, PullRequest, _pull_request_row),
+    "reviews": _IngestKind(CodeReviewIngest, CodeReview, _review_row),
+    "tasks": _IngestKind(TaskIngest, Task, _task_row),
+}
+
+
+def _error_message(exc: Exception) -> str:
+    """Короткое описание ошибки разбора строки."""
+    if isinstance(exc, ValidationError):
+        error = exc.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        return f"{location}: {error['msg']}" if location else error["msg"]
+    return str(exc)
+
+
+class BulkIngestService:
+    """Сервис для пакетной идемпотентной загрузки записей проекта."""
+
+    @staticmethod
+    def load_member_ids(db: Session, project_id: int) -> Dict[str, int]:
+        """Соответствие email → ID участника проекта (загружается один раз на поток)."""
+        return dict(db.query(ProjectMember.email, ProjectMember.id).filter(
+            ProjectMember.project_id == project_id
+        ).all())
+
+    @staticmethod
+    def _pull_request_ids(
+        db: Session,
+        project_id: int,
+        records: List[CodeReviewIngest]
+    ) -> Tuple[Dict[str, int], set]:
+        """Найти PR проекта, на которые ссылаются ревью пачки (по внешнему и внутреннему ID)."""
+        external_ids = {r.pull_request_external_id for r in records if r.pull_request_external_id}
+        ids = {r.pull_request_id for r in records if r.pull_request_external_id is None and r.pull_request_id}
+        if not external_ids and not ids:
+            return {}, set()
+        query = db.query(PullRequest.external_id, PullRequest.id).filter(
+            PullRequest.project_id == project_id
+        )
+        if external_ids and ids:
+            query = query.filter(PullRequest.external_id.in_(external_ids) | PullRequest.id.in_(ids))
+        elif external_ids:
+            query = query.filter(PullRequest.external_id.in_(external_ids))
+        else:
+            query = query.filter(PullRequest.id.in_(ids))
+        by_external_id = dict(query.all())
+        return by_external_id, set(by_external_id.values())
+
+    @staticmethod
+    def bump_data_version(db: Session, project_id: int) -> None:
+        """Увеличить версию данных проекта (ETag метрик); коммит выполняет вызывающий код."""
+        db.query(Project).filter(Project.id == project_id).update(
+            {Project.data_version: Project.data_version + 1}, synchronize_session=False
+        )
+
+    @staticmethod
+    def ingest_batch(
+        db: Session,
+        project_id: int,
+        kind: str,
+        items: Iterable[Union[bytes, str, Dict, BaseModel]],
+        members: Optional[Dict[str, int]] = None,
+        first_line: int = 1
+    ) -> Dict:
+        """
+        Загрузить одну пачку записей в одной транзакции.
+        Ingest one batch of records with a single executemany and commit.
+
+        Элементы - строки NDJSON, словари или уже провалидированные схемы.
+        Строки, не прошедшие валидацию, отклоняются без прерывания пачки.
+        Записи с уже существующим external_id пропускаются (ON CONFLICT DO NOTHING),
+        дневная сводка коммитов и индекс изменений файлов (churn) обновляются
+        только для новых коммитов. Если вставлена хотя бы одна запись, версия
+        данных проекта увеличивается в той же транзакции.
+
+        Returns:
+            Счётчики пачки: received, inserted, duplicates, rejected и errors
+            (номер строки и сообщение для отклонённых записей).
+        """
+        spec = INGEST_KINDS[kind]
+        if members is None:
+            members = BulkIngestService.load_member_ids(db, project_id)
+
+        result = {"received": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "errors": []}
+        records: List[Tuple[int, BaseModel]] = []
+        for line_number, item in enumerate(items, start=first_line):
+            if isinstance(item, (bytes, str)) and not item.strip():
+                continue
+            result["received"] += 1
+            try:
+                if isinstance(item, spec.schema):
+                    record = item
+                elif isinstance(item, (bytes, str)):
+                    record = spec.schema.model_validate_json(item)
+                else:
+                    record = spec.schema.model_validate(item)
+            except ValueError as exc:
+                result["rejected"] += 1
+                result["errors"].append({"line": line_number, "message": _error_message(exc)})
+                continue
+            records.append((line_number, record))
+
+        context = (
+            BulkIngestService._pull_request_ids(db, project_id, [r for _, r in records])
+            if kind == "reviews" else None
+        )
+
+        # Первая запись с данным external_id в пачке выигрывает
+        rows: Dict[str, Dict] = {}
+        for line_number, record in records:
+            if record.external_id in rows:
+                result["duplicates"] += 1
+                continue
+            try:
+                rows[record.external_id] = spec.build_row(project_id, record, members, context)
+            except ValueError as exc:
+                result["rejected"] += 1
+                result["errors"].append({"line": line_number, "message": str(exc)})
+
+        if rows:
+            # RETURNING отдаёт только действительно вставленные строки
+            table = spec.model.__table__
+            inserted = set(db.execute(
+                sqlite_insert(table).on_conflict_do_nothing(
+                    index_elements=["external_id"]
+                ).returning(table.c.external_id),
+                list(rows.values())
+            ).scalars())
+            result["inserted"] = len(inserted)
+            result["duplicates"] += len(rows) - len(inserted)
+            if kind == "commits" and inserted:
+                new_rows = [rows[external_id] for external_id in inserted]
+                # Churn считается по индексу файлов до обновления дневной сводки
+                files: Dict[str, List[str]] = {}
+                for _, record in records:
+                    if record.files and record.external_id in inserted:
+                        files.setdefault(record.external_id, record.files)
+                if files:
+                    ChurnService.apply_commits(db, project_id, new_rows, files)
+                CommitStatsService.apply_commits(db, new_rows)
+            if inserted:
+                BulkIngestService.bump_data_version(db, project_id)
+            db.commit()
+
+        return result
@@ -0,0 +1,137 @@
+"""
+Сервис определения code churn по индексу изменений файлов.
+Service for churn detection backed by a per-file modification index.
+
+Для каждого проекта хранится последнее изменение каждого файла
+(file_modifications: время, автор, SHA). Новые коммиты сверяются с индексом
+в хронологическом порядке: коммит считается churn, если меняет файл,
+изменённый не более CHURN_WINDOW_DAYS дней назад. Индекс обновляется
+инкрементально, поэтому стоимость загрузки пропорциональна числу новых коммитов.
+"""
+from typing import Dict, List, Optional, Sequence
+from datetime import timedelta
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import Commit, FileModification
+
+
+# Ограничение числа параметров в IN (...) при загрузке индекса
+_PATH_CHUNK_SIZE = 500
+
+
+class ChurnService:
+    """Сервис для вычисления churn коммитов и поддержки индекса изменений файлов."""
+
+    @staticmethod
+    def _load_index(db: Session, project_id: int, paths: Sequence[str]) -> Dict[str, List]:
+        """Записи индекса для путей: путь → [время, автор, SHA]."""
+        index = {}
+        for i in range(0, len(paths), _PATH_CHUNK_SIZE):
+            rows = db.query(
+                FileModification.path,
+                FileModification.last_modified_at,
+                FileModification.last_author_email,
+                FileModification.last_commit_sha
+            ).filter(
+                FileModification.project_id == project_id,
+                FileModification.path.in_(paths[i:i + _PATH_CHUNK_SIZE])
+            )
+            for path, modified_at, author_email, sha in rows:
+                index[path] = [modified_at, author_email, sha]
+        return index
+
+    @staticmethod
+    def apply_commits(
+        db: Session,
+        project_id: int,
+        commits: List[Dict],
+        files: Dict[str, Sequence[str]],
+        window_days: Optional[int] = None
+    ) -> int:
+        """
+        Вычислить churn новых коммитов и обновить индекс изменений файлов.
+        Flag churn for newly stored commits and update the file index.
+
+        Args:
+            commits: Строки только что вставленных коммитов (словари);
+                is_churn и churn_days в них заменяются вычисленными значениями.
+            files: Пути изменённых файлов по external_id коммита. Коммиты
+                без списка файлов не изменяются.
+            window_days: Окно churn (по умолчанию CHURN_WINDOW_DAYS).
+
+        Файл коммита, который старше записи индекса (загрузка не в
+        хронологическом порядке), пропускается: индекс хранит только последнее
+        изменение, поэтому такой файл не даёт churn и не сдвигает индекс.
+        Коммит транзакции выполняет вызывающий код.
+
+        Returns:
+            Количество коммитов, отмеченных как churn.
+        """
+        commits = sorted(
+            (commit for commit in commits if files.get(commit["external_id"])),
+            key=lambda commit: commit["committed_at"]
+        )
+        if not commits:
+            return 0
+        window = timedelta(days=window_days or settings.CHURN_WINDOW_DAYS)
+
+        paths = sorted({path for commit in commits for path in files[commit["external_id"]]})
+        index = ChurnService._load_index(db, project_id, paths)
+        changed = set()
+        churned = 0
+        for commit in commits:
+            committed_at = commit["committed_at"]
+            churn_days = None
+            for path in set(files[commit["external_id"]]):
+                entry = index.get(path)
+                if entry is not None and entry[0] > committed_at:
+                    continue
+                if entry is not None and committed_at - entry[0] <= window:
+                    days = (committed_at - entry[0]).days
+                    churn_days = days if churn_days is None else min(churn_days, days)
+                index[path] = [committed_at, commit["author_email"], commit["external_id"]]
+                changed.add(path)
+            commit["is_churn"] = churn_days is not None
+            commit["churn_days"] = churn_days
+            churned += commit["is_churn"]
+
+        if changed:
+            stmt = sqlite_insert(FileModification.__table__)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["project_id", "path"],
+                    set_={
+                        "last_modified_at": stmt.excluded.last_modified_at,
+                        "last_author_email": stmt.excluded.last_author_email,
+                        "last_commit_sha": stmt.excluded.last_commit_sha,
+                    }
+                ),
+                [
+                    {
+                        "project_id": project_id,
+                        "path": path,
+                        "last_modified_at": index[path][0],
+                        "last_author_email": index[path][1],
+                        "last_commit_sha": index[path][2],
+                    }
+                    for path in sorted(changed)
+                ]
+            )
+
+        commits_table = Commit.__table__
+        db.execute(
+            commits_table.update()
+            .where(commits_table.c.external_id == bindparam("b_external_id"))
+            .values(is_churn=bindparam("b_is_churn"), churn_days=bindparam("b_churn_days")),
+            [
+                {
+                    "b_external_id": commit["external_id"],
+                    "b_is_churn": commit["is_churn"],
+                    "b_churn_days": commit["churn_days"],
+                }
+                for commit in commits
+            ]
+        )
+        return churned
@@ -0,0 +1,375 @@
+"""
+Сервис агрегированной статистики коммитов.
+Service for aggregated commit statistics.
+
+Статистика за период собирается из дневной сводки commit_daily_stats
+(полные дни) и из сырых коммитов только для неполных граничных дней,
+поэтому запрос за год стоит ~365 × число авторов строк вместо всех коммитов,
+а результат совпадает с подсчётом по таблице commits.
+"""
+from typing import Dict, Iterable, List, Tuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, distinct, func, literal, or_, select, union_all
+from app.models.models import Commit, CommitDailyStats, ProjectMember
+
+
+# Поля дневной сводки и соответствующие значения одного коммита
+_ROLLUP_FIELDS = (
+    "commit_count",
+    "insertions",
+    "deletions",
+    "after_hours_count",
+    "weekend_count",
+    "churn_count",
+    "todo_count",
+    "todo_removed_count",
+)
+
+# Счётчики периода без коммитов
+_EMPTY_TOTALS = {
+    "total_commits": 0,
+    "active_contributors": 0,
+    "insertions": 0,
+    "deletions": 0,
+    "after_hours_commits": 0,
+    "weekend_commits": 0,
+    "churn_commits": 0,
+    "todo_count": 0,
+    "todo_removed": 0,
+}
+
+
+def _commit_value(commit, name: str):
+    """Получить значение поля коммита (ORM-объект или словарь)."""
+    if isinstance(commit, dict):
+        return commit.get(name)
+    return getattr(commit, name)
+
+
+def _commit_increments(commit) -> Tuple[int, ...]:
+    """Вклад одного коммита в поля дневной сводки."""
+    return (
+        1,
+        _commit_value(commit, "insertions") or 0,
+        _commit_value(commit, "deletions") or 0,
+        1 if _commit_value(commit, "is_after_hours") else 0,
+        1 if _commit_value(commit, "is_weekend") else 0,
+        1 if _commit_value(commit, "is_churn") else 0,
+        _commit_value(commit, "todo_count") or 0,
+        _commit_value(commit, "todo_removed") or 0,
+    )
+
+
+def _day_start(value: datetime) -> datetime:
+    """Начало дня для момента времени."""
+    return datetime.combine(value.date(), time.min)
+
+
+def _first_full_day(value: datetime) -> datetime:
+    """Начало первого полного дня, который начинается не раньше value."""
+    day = _day_start(value)
+    return day if day == value else day + timedelta(days=1)
+
+
+class CommitStatsService:
+    """Сервис для поддержки дневной сводки и агрегации статистики коммитов."""
+
+    @staticmethod
+    def apply_commits(db: Session, commits: Iterable) -> int:
+        """
+        Инкрементально обновить дневную сводку для новых коммитов.
+        Incrementally update the daily rollup for newly ingested commits.
+
+        Принимает ORM-объекты Commit или словари с теми же полями.
+        Коммиты без project_id или author_id в сводку не попадают
+        (метрики считаются только по коммитам участников проекта).
+        Вызывается в той же транзакции, что и сохранение коммитов.
+
+        Returns:
+            Количество затронутых строк сводки.
+        """
+        increments: Dict[Tuple[int, int, date], List[int]] = {}
+        for commit in commits:
+            project_id = _commit_value(commit, "project_id")
+            author_id = _commit_value(commit, "author_id")
+            if project_id is None or author_id is None:
+                continue
+            key = (project_id, author_id, _commit_value(commit, "committed_at").date())
+            totals = increments.setdefault(key, [0] * len(_ROLLUP_FIELDS))
+            for i, value in enumerate(_commit_increments(commit)):
+                totals[i] += value
+
+        if not increments:
+            return 0
+
+        # Загрузить существующие строки сводки одним запросом на проект
+        existing = {}
+        by_project: Dict[int, List[Tuple[int, date]]] = {}
+        for project_id, author_id, day in increments:
+            by_project.setdefault(project_id, []).append((author_id, day))
+        for project_id, keys in by_project.items():
+            days = [day for _, day in keys]
+            rows = db.query(CommitDailyStats).filter(
+                CommitDailyStats.project_id == project_id,
+                CommitDailyStats.day.between(min(days), max(days)),
+                CommitDailyStats.author_id.in_({author_id for author_id, _ in keys})
+            ).all()
+            for row in rows:
+                existing[(row.project_id, row.author_id, row.day)] = row
+
+        for key, totals in increments.items():
+            row = existing.get(key)
+            if row is None:
+                project_id, author_id, day = key
+                row = CommitDailyStats(project_id=project_id, author_id=author_id, day=day)
+                for field in _ROLLUP_FIELDS:
+                    setattr(row, field, 0)
+                db.add(row)
+            for field, value in zip(_ROLLUP_FIELDS, totals):
+                setattr(row, field, getattr(row, field) + value)
+
+        return len(increments)
+
+    @staticmethod
+    def rebuild(db: Session, project_id: int = None) -> None:
+        """
+        Пересчитать дневную сводку из таблицы commits.
+        Rebuild the daily rollup from the commits table.
+
+        Используется для начального заполнения и восстановления сводки.
+        Если project_id не указан, пересчитываются все проекты.
+        """
+        delete_query = db.query(CommitDailyStats)
+        if project_id is not None:
+            delete_query = delete_query.filter(CommitDailyStats.project_id == project_id)
+        delete_query.delete(synchronize_session=False)
+
+        day = func.date(Commit.committed_at)
+        source = select(
+            Commit.project_id,
+            Commit.author_id,
+            day,
+            func.count(Commit.id),
+            func.sum(func.coalesce(Commit.insertions, 0)),
+            func.sum(func.coalesce(Commit.deletions, 0)),
+            func.sum(case((Commit.is_after_hours.is_(True), 1), else_=0)),
+            func.sum(case((Commit.is_weekend.is_(True), 1), else_=0)),
+            func.sum(case((Commit.is_churn.is_(True), 1), else_=0)),
+            func.sum(func.coalesce(Commit.todo_count, 0)),
+            func.sum(func.coalesce(Commit.todo_removed, 0)),
+        ).where(
+            Commit.project_id.isnot(None),
+            Commit.author_id.isnot(None)
+        ).group_by(Commit.project_id, Commit.author_id, day)
+        if project_id is not None:
+            source = source.where(Commit.project_id == project_id)
+
+        db.execute(CommitDailyStats.__table__.insert().from_select(
+            ["project_id", "author_id", "day", *_ROLLUP_FIELDS], source
+        ))
+
+    @staticmethod
+    def _bucketed_source(project_ids: List[int], boundaries: List[datetime]):
+        """
+        Построить подзапрос со строками статистики за [boundaries[0], boundaries[-1]],
+        размеченными номером интервала (колонка bucket).
+
+        Интервал i - это [boundaries[i], boundaries[i + 1]), последний интервал
+        включает boundaries[-1]. Весь диапазон читается одним проходом: полные
+        дни, целиком лежащие в одном интервале, берутся из дневной сводки, а дни,
+        содержащие границу интервала, - из сырых коммитов (по индексу
+        (project_id, committed_at)).
+        """
+        period_start, period_end = boundaries[0], boundaries[-1]
+        inner = boundaries[1:-1]
+        first_full_day = _first_full_day(period_start)
+        last_day_start = _day_start(period_end)
+
+        # Дни с невыровненной границей интервала и неполные края периода
+        boundary_days = {_day_start(b) for b in boundaries[:-1] if _day_start(b) != b}
+        boundary_days.add(last_day_start)
+        raw_ranges = []
+        for day in sorted(boundary_days):
+            low = max(day, period_start)
+            if day == last_day_start:
+                raw_ranges.append(and_(Commit.committed_at >= low, Commit.committed_at <= period_end))
+            else:
+                raw_ranges.append(and_(Commit.committed_at >= low, Commit.committed_at < day + timedelta(days=1)))
+
+        raw_bucket = case(
+            *[(Commit.committed_at >= b, i) for i, b in reversed(list(enumerate(inner, start=1)))],
+            else_=0
+        ) if inner else literal(0)
+        raw = select(
+            Commit.project_id.label("project_id"),
+            raw_bucket.label("bucket"),
+            Commit.author_id.label("author_id"),
+            literal(1).label("commit_count"),
+            func.coalesce(Commit.insertions, 0).label("insertions"),
+            func.coalesce(Commit.deletions, 0).label("deletions"),
+            case((Commit.is_after_hours.is_(True), 1), else_=0).label("after_hours_count"),
+            case((Commit.is_weekend.is_(True), 1), else_=0).label("weekend_count"),
+            case((Commit.is_churn.is_(True), 1), else_=0).label("churn_count"),
+            func.coalesce(Commit.todo_count, 0).label("todo_count"),
+            func.coalesce(Commit.todo_removed, 0).label("todo_removed_count"),
+        ).where(
+            Commit.project_id.in_(project_ids),
+            Commit.author_id.isnot(None),
+            or_(*raw_ranges)
+        )
+        if first_full_day >= last_day_start:
+            # Период внутри одного-двух неполных дней - только сырые коммиты
+            return raw.subquery()
+
+        # День из сводки попадает в интервал i, если начинается не раньше его границы
+        rollup_bucket = case(
+            *[
+                (CommitDailyStats.day >= _first_full_day(b).date(), i)
+                for i, b in reversed(list(enumerate(inner, start=1)))
+            ],
+            else_=0
+        ) if inner else literal(0)
+        rollup = select(
+            CommitDailyStats.project_id.label("project_id"),
+            rollup_bucket.label("bucket"),
+            CommitDailyStats.author_id,
+            *[getattr(CommitDailyStats, field) for field in _ROLLUP_FIELDS]
+        ).where(
+            CommitDailyStats.project_id.in_(project_ids),
+            CommitDailyStats.day >= first_full_day.date(),
+            CommitDailyStats.day < last_day_start.date(),
+            CommitDailyStats.day.notin_([day.date() for day in boundary_days])
+        )
+        return union_all(rollup, raw).subquery()
+
+    @staticmethod
+    def _period_source(project_ids: List[int], period_start: datetime, period_end: datetime):
+        """
+        Построить подзапрос со строками статистики за период [period_start, period_end].
+        """
+        return CommitStatsService._bucketed_source(project_ids, [period_start, period_end])
+
+    @staticmethod
+    def bucket_totals_by_project(
+        db: Session,
+        project_ids: List[int],
+        boundaries: List[datetime]
+    ) -> Dict[int, List[Dict[str, int]]]:
+        """
+        Агрегировать статистику коммитов по последовательным интервалам.
+        Aggregate commit statistics per consecutive window in a single scan.
+
+        Интервалы задаются границами boundaries (см. _bucketed_source);
+        агрегация выполняется одним GROUP BY project_id, bucket.
+
+        Returns:
+            Для каждого проекта - список счётчиков по интервалам.
+        """
+        buckets = len(boundaries) - 1
+        totals = {
+            project_id: [dict(_EMPTY_TOTALS) for _ in range(buckets)]
+            for project_id in project_ids
+        }
+        if not project_ids:
+            return totals
+
+        source = CommitStatsService._bucketed_source(project_ids, boundaries)
+        rows = db.execute(select(
+            source.c.project_id,
+            source.c.bucket,
+            func.sum(source.c.commit_count),
+            func.count(distinct(source.c.author_id)),
+            func.sum(source.c.insertions),
+            func.sum(source.c.deletions),
+            func.sum(source.c.after_hours_count),
+            func.sum(source.c.weekend_count),
+            func.sum(source.c.churn_count),
+            func.sum(source.c.todo_count),
+            func.sum(source.c.todo_removed_count),
+        ).group_by(source.c.project_id, source.c.bucket)).all()
+
+        for (project_id, bucket, total_commits, active_contributors, insertions, deletions,
+             after_hours, weekend, churn, todo, todo_removed) in rows:
+            totals[project_id][bucket] = {
+                "total_commits": int(total_commits or 0),
+                "active_contributors": active_contributors or 0,
+                "insertions": int(insertions or 0),
+                "deletions": int(deletions or 0),
+                "after_hours_commits": int(after_hours or 0),
+                "weekend_commits": int(weekend or 0),
+                "churn_commits": int(churn or 0),
+                "todo_count": int(todo or 0),
+                "todo_removed": int(todo_removed or 0),
+            }
+        return totals
+
+    @staticmethod
+    def period_totals_by_project(
+        db: Session,
+        project_ids: List[int],
+        period_start: datetime,
+        period_end: datetime
+    ) -> Dict[int, Dict[str, int]]:
+        """
+        Агрегировать статистику коммитов за период для нескольких проектов.
+        Aggregate commit statistics for several projects with one GROUP BY project_id.
+
+        Для проектов без коммитов возвращаются нулевые счётчики.
+        """
+        totals = CommitStatsService.bucket_totals_by_project(
+            db, project_ids, [period_start, period_end]
+        )
+        return {project_id: buckets[0] for project_id, buckets in totals.items()}
+
+    @staticmethod
+    def period_totals(
+        db: Session,
+        project_id: int,
+        period_start: datetime,
+        period_end: datetime
+    ) -> Dict[str, int]:
+        """
+        Агрегировать статистику коммитов участников проекта за период.
+        Aggregate project member commit statistics for the period.
+
+        Возвращает одну строку со счётчиками вместо загрузки коммитов в память.
+        """
+        return CommitStatsService.period_totals_by_project(
+            db, [project_id], period_start, period_end
+        )[project_id]
+
+    @staticmethod
+    def author_totals(
+        db: Session,
+        project_id: int,
+        period_start: datetime,
+        period_end: datetime
+    ) -> List[Dict]:
+        """
+        Статистика коммитов по каждому автору проекта за период.
+        Per-author commit statistics for the period.
+        """
+        source = CommitStatsService._period_source([project_id], period_start, period_end)
+        rows = db.execute(select(
+            source.c.author_id,
+            ProjectMember.name,
+            ProjectMember.email,
+            func.sum(source.c.commit_count),
+            func.sum(source.c.insertions + source.c.deletions),
+        ).join(
+            ProjectMember, ProjectMember.id == source.c.author_id
+        ).group_by(
+            source.c.author_id, ProjectMember.name, ProjectMember.email
+        )).all()
+
+        return [
+            {
+                "author_id": author_id,
+                "author_name": author_name,
+                "author_email": author_email,
+                "commit_count": int(commit_count or 0),
+                "lines_changed": int(lines_changed or 0),
+            }
+            for author_id, author_name, author_email, commit_count, lines_changed in rows
+        ]
@@ -3,6 +3,7 @@
 
 Этот пакет содержит различные поставщики данных, которые можно легко заменять:
 - MockDataProvider: Генерирует mock-данные для демонстрации (текущая реализация)
+- GitRepositoryProvider: Читает коммиты из локального клона Git-репозитория
 - T1DataProvider: Реальная интеграция с T1 Сфера.Код (будет реализовано)
 - GitHubDataProvider: Интеграция с GitHub (будет реализовано)
 - GitLabDataProvider: Интеграция с GitLab (будет реализовано)
@@ -10,6 +11,7 @@
 
 from .base_provider import BaseDataProvider
 from .mock_provider import MockDataProvider
+from .git_provider import GitRepositoryProvider
 from .provider_factory import DataProviderFactory
 
-__all__ = ['BaseDataProvider', 'MockDataProvider', 'DataProviderFactory']
+__all__ = ['BaseDataProvider', 'MockDataProvider', 'GitRepositoryProvider', 'DataProviderFactory']
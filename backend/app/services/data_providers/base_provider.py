@@ -6,14 +6,22 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import List, Dict, Iterable, Optional
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
+from app.core.cache import metrics_cache
+from app.core.config import settings
+from app.models.models import PullRequest
+from app.services.bulk_ingest_service import BulkIngestService
+
 
 class BaseDataProvider(ABC):
     """Базовый интерфейс для всех поставщиков данных."""
     
+    # Размер пачки при сохранении записей (None - BULK_INGEST_BATCH_SIZE)
+    ingest_batch_size: Optional[int] = None
+    
     @abstractmethod
     def fetch_commits(
         self,
@@ -37,7 +45,10 @@ class BaseDataProvider(ABC):
         - deletions: int
         - has_tests: bool
         - test_coverage_delta: float (опционально)
-        - todo_count: int
+        - todo_count: int (добавлено маркеров TODO/FIXME/HACK)
+        - todo_removed: int (удалено маркеров, опционально)
+        - files: List[str] (опционально, пути изменённых файлов; если указаны,
+          is_churn и churn_days вычисляются при загрузке по индексу файлов)
         - is_churn: bool
         - churn_days: int (опционально)
         - is_after_hours: bool
@@ -87,6 +98,7 @@ class BaseDataProvider(ABC):
         Получить данные о code review из источника данных.
         
         Возвращает список словарей ревью со следующей структурой:
+        - external_id: str
         - pull_request_id: int
         - reviewer_email: str
         - state: str (approved, changes_requested, commented)
@@ -127,7 +139,46 @@ class BaseDataProvider(ABC):
         """
         pass
     
-    @abstractmethod
+    def store_records(
+        self,
+        db: Session,
+        project_id: int,
+        kind: str,
+        records: Iterable[Dict],
+        members: Optional[Dict[str, int]] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Сохранить записи поставщика пачками через Core bulk insert.
+        
+        Авторы/ревьюеры/исполнители определяются по email через одну заранее
+        загруженную карту email → ID участника проекта (без запроса на запись).
+        Записи с уже существующим external_id пропускаются.
+        
+        Args:
+            kind: Тип записей ('commits', 'pull_requests', 'reviews', 'tasks').
+            records: Словари в формате fetch_* (см. выше).
+            members: Карта email → ID участника; загружается, если не передана.
+            batch_size: Размер пачки (по умолчанию ingest_batch_size).
+        
+        Returns:
+            Количество вставленных записей.
+        """
+        if members is None:
+            members = BulkIngestService.load_member_ids(db, project_id)
+        batch_size = batch_size or self.ingest_batch_size or settings.BULK_INGEST_BATCH_SIZE
+        
+        inserted = 0
+        batch: List[Dict] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                inserted += BulkIngestService.ingest_batch(db, project_id, kind, batch, members)["inserted"]
+                batch = []
+        if batch:
+            inserted += BulkIngestService.ingest_batch(db, project_id, kind, batch, members)["inserted"]
+        return inserted
+    
     def populate_data(
         self,
         db: Session,
@@ -140,7 +191,8 @@ class BaseDataProvider(ABC):
         Заполнить базу данных данными из источника.
         
         Это высокоуровневый метод, который координирует получение и сохранение
-        всех типов данных (коммиты, PR, ревью, задачи).
+        всех типов данных (коммиты, PR, ревью, задачи) через store_records.
+        Поставщикам достаточно реализовать методы fetch_*.
         
         Возвращает словарь с количеством созданных записей:
         - commits_created: int
@@ -149,4 +201,51 @@ class BaseDataProvider(ABC):
         - tasks_created: int
         - message: str
         """
-        pass
+        # По умолчанию последние 30 дней, если не указано
+        if not period_end:
+            period_end = datetime.utcnow()
+        if not period_start:
+            period_start = period_end - timedelta(days=30)
+        
+        members = BulkIngestService.load_member_ids(db, project_id)
+        
+        commits_created = self.store_records(
+            db, project_id, "commits",
+            self.fetch_commits(db, team_id, project_id, period_start, period_end),
+            members
+        )
+        
+        prs_data = self.fetch_pull_requests(db, team_id, project_id, period_start, period_end)
+        prs_created = self.store_records(db, project_id, "pull_requests", prs_data, members)
+        
+        # Ревью запрашиваются для PR, уже сохранённых в базе
+        pr_external_ids = [pr['external_id'] for pr in prs_data]
+        pr_ids = []
+        for i in range(0, len(pr_external_ids), settings.BULK_INGEST_BATCH_SIZE):
+            pr_ids.extend(pr_id for (pr_id,) in db.query(PullRequest.id).filter(
+                PullRequest.project_id == project_id,
+                PullRequest.external_id.in_(pr_external_ids[i:i + settings.BULK_INGEST_BATCH_SIZE])
+            ))
+        reviews_created = self.store_records(
+            db, project_id, "reviews",
+            self.fetch_code_reviews(db, pr_ids, team_id) if pr_ids else [],
+            members
+        )
+        
+        tasks_created = self.store_records(
+            db, project_id, "tasks",
+            self.fetch_tasks(db, team_id, project_id, period_start, period_end),
+            members
+        )
+        
+        # Новые данные проекта делают кэшированные метрики устаревшими
+        if commits_created or prs_created or reviews_created or tasks_created:
+            metrics_cache.invalidate_project(project_id)
+        
+        return {
+            "commits_created": commits_created,
+            "pull_requests_created": prs_created,
+            "reviews_created": reviews_created,
+            "tasks_created": tasks_created,
+            "message": "Данные успешно загружены"
+        }
@@ -0,0 +1,326 @@
+"""
+Поставщик данных из локального Git-репозитория.
+
+Читает историю локального клона через `git log --numstat -p`. Вывод git
+разбирается построчно по мере чтения из канала (без буферизации всего вывода),
+поэтому память не зависит от размера истории. Повторная синхронизация
+читает только коммиты после Project.last_synced_sha.
+"""
+
+import re
+import subprocess
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+
+from .base_provider import BaseDataProvider
+from app.core.cache import metrics_cache
+from app.models.models import Project, ProjectMember
+from app.services.bulk_ingest_service import BulkIngestService
+
+
+# Разделители записей и полей в формате вывода git log
+RECORD_SEPARATOR = "\x1e"
+FIELD_SEPARATOR = "\x1f"
+LOG_FORMAT = RECORD_SEPARATOR + FIELD_SEPARATOR.join(["%H", "%an", "%ae", "%aI", "%s"])
+
+# Пути, изменение которых считается изменением тестов
+TEST_PATH_PATTERN = re.compile(
+    r"(^|/)(tests?|__tests__|spec)/"
+    r"|(^|/)test_[^/]*$"
+    r"|_test\.[^/]+$"
+    r"|\.(test|spec)\.[^/]+$"
+    r"|Tests?\.[^/.]+$"
+)
+
+# Маркеры технического долга в строках diff
+TODO_PATTERN = re.compile(r"\b(?:TODO|FIXME|HACK)\b")
+
+# Переименование в numstat: "old => new" или "dir/{old => new}/file"
+RENAME_PATTERN = re.compile(r"\{([^{}]*) => ([^{}]*)\}")
+
+
+def _current_path(path: str) -> str:
+    """Путь файла после переименования (numstat показывает оба пути)."""
+    if " => " not in path:
+        return path
+    if "{" in path:
+        return RENAME_PATTERN.sub(lambda match: match.group(2), path).replace("//", "/")
+    return path.split(" => ", 1)[1]
+
+
+def count_todo_markers(line: str) -> int:
+    """Количество маркеров TODO/FIXME/HACK в строке."""
+    return len(TODO_PATTERN.findall(line))
+
+
+def parse_git_log(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Инкрементально разобрать вывод `git log --numstat [-p -U0] --format=LOG_FORMAT`.
+    Parse git log output line by line, yielding one commit dict at a time.
+
+    Время коммита берётся из даты автора: committed_at хранится в UTC,
+    а признаки is_after_hours / is_weekend считаются по локальному времени автора.
+    Пути изменённых файлов (files) используются для вычисления churn при загрузке.
+    Если вывод содержит patch, маркеры TODO в добавленных и удалённых строках
+    хунков подсчитываются в том же проходе (todo_count и todo_removed).
+    """
+    commit: Optional[Dict] = None
+    in_patch = False
+    in_hunk = False
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith(RECORD_SEPARATOR):
+            if commit is not None:
+                yield commit
+            sha, name, email, authored, subject = line[1:].split(FIELD_SEPARATOR, 4)
+            local_time = datetime.fromisoformat(authored)
+            commit = {
+                'external_id': sha,
+                'author_email': email,
+                'author_name': name,
+                'message': subject,
+                'committed_at': local_time.astimezone(timezone.utc).replace(tzinfo=None),
+                'files_changed': 0,
+                'insertions': 0,
+                'deletions': 0,
+                'has_tests': False,
+                'todo_count': 0,
+                'todo_removed': 0,
+                'files': [],
+                'is_after_hours': local_time.hour < 9 or local_time.hour > 18,
+                'is_weekend': local_time.weekday() >= 5,
+            }
+            in_patch = in_hunk = False
+        elif commit is None or not line:
+            continue
+        elif in_patch:
+            # Заголовки файла ("---", "+++", "index ...") идут до первого хунка
+            if line.startswith("diff --git "):
+                in_hunk = False
+            elif line.startswith("@@"):
+                in_hunk = True
+            elif in_hunk:
+                if line[0] == "+":
+                    commit['todo_count'] += count_todo_markers(line)
+                elif line[0] == "-":
+                    commit['todo_removed'] += count_todo_markers(line)
+        elif line.startswith("diff --git "):
+            in_patch = True
+        else:
+            # Строка numstat: "<добавлено>\t<удалено>\t<путь>", для бинарных файлов "-"
+            added, deleted, path = line.split("\t", 2)
+            path = _current_path(path)
+            commit['files_changed'] += 1
+            commit['files'].append(path)
+            commit['insertions'] += int(added) if added != "-" else 0
+            commit['deletions'] += int(deleted) if deleted != "-" else 0
+            if not commit['has_tests'] and TEST_PATH_PATTERN.search(path):
+                commit['has_tests'] = True
+    if commit is not None:
+        yield commit
+
+
+class GitRepositoryProvider(BaseDataProvider):
+    """
+    Поставщик данных, читающий коммиты из локального клона репозитория.
+
+    Путь к клону берётся из Project.repository_path (или передаётся в конструктор).
+    Git-репозиторий содержит только коммиты, поэтому PR, ревью и задачи
+    не загружаются. Авторы, которых ещё нет среди участников проекта,
+    добавляются автоматически при загрузке.
+    """
+
+    def __init__(self, repository_path: Optional[str] = None, git_binary: str = "git"):
+        self.repository_path = repository_path
+        self.git_binary = git_binary
+
+    def _resolve_path(self, project: Project) -> str:
+        path = self.repository_path or project.repository_path
+        if not path:
+            raise ValueError(f"У проекта {project.id} не задан repository_path")
+        return path
+
+    def _git(self, path: str, *args: str) -> subprocess.CompletedProcess:
+        """Выполнить короткую команду git и вернуть результат."""
+        return subprocess.run(
+            [self.git_binary, "-C", path, *args],
+            capture_output=True, text=True
+        )
+
+    def _head(self, path: str) -> Optional[str]:
+        """
+        SHA текущего HEAD или None для пустого репозитория.
+
+        Raises:
+            ValueError: Если путь не является Git-репозиторием.
+        """
+        result = self._git(path, "rev-parse", "--verify", "--quiet", "HEAD")
+        if result.returncode != 0:
+            check = self._git(path, "rev-parse", "--git-dir")
+            if check.returncode != 0:
+                raise ValueError(f"{path} не является Git-репозиторием: {check.stderr.strip()}")
+        return result.stdout.strip() or None
+
+    def _revision_range(self, path: str, head: str, last_synced_sha: Optional[str]) -> str:
+        """
+        Диапазон ревизий для чтения: только новые коммиты после последней синхронизации.
+
+        Если последний загруженный коммит больше не является предком HEAD
+        (например, после force push), история читается целиком; уже загруженные
+        коммиты пропускаются по external_id.
+        """
+        if last_synced_sha and self._git(
+            path, "merge-base", "--is-ancestor", last_synced_sha, head
+        ).returncode == 0:
+            return f"{last_synced_sha}..{head}"
+        return head
+
+    def plan_sync(self, project: Project) -> Tuple[str, Optional[str], Optional[str]]:
+        """
+        Определить, что нужно прочитать для синхронизации проекта.
+
+        Returns:
+            (путь к клону, HEAD, диапазон ревизий); диапазон равен None,
+            если репозиторий пуст или уже синхронизирован.
+        """
+        path = self._resolve_path(project)
+        head = self._head(path)
+        if head is None or head == project.last_synced_sha:
+            return path, head, None
+        return path, head, self._revision_range(path, head, project.last_synced_sha)
+
+    def stream_log(
+        self,
+        path: str,
+        revision_range: str,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Читать коммиты диапазона из канала `git log` по мере разбора.
+
+        Процесс git завершается, если генератор закрыт до конца истории.
+
+        Raises:
+            RuntimeError: Если git завершился с ошибкой.
+        """
+        args = [
+            # --reverse: индекс изменений файлов (churn) обновляется в хронологическом порядке
+            # -p -U0: хунки без контекстных строк только для подсчёта маркеров TODO
+            self.git_binary, "-C", path, "log", "--reverse", "--no-merges", "--numstat",
+            "-p", "-U0", "--no-ext-diff", "--no-color", f"--format={LOG_FORMAT}",
+        ]
+        if period_start:
+            args.append(f"--since={period_start.isoformat()}")
+        if period_end:
+            args.append(f"--until={period_end.isoformat()}")
+        args.append(revision_range)
+
+        process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace"
+        )
+        try:
+            yield from parse_git_log(process.stdout)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise RuntimeError(f"git log завершился с ошибкой: {stderr.strip()}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+    def fetch_commits(
+        self,
+        db: Session,
+        team_id: int,
+        project_id: int,
+        period_start: Optional[datetime],
+        period_end: Optional[datetime]
+    ) -> Iterator[Dict]:
+        """Читать коммиты проекта после последней синхронизации (генератор)."""
+        project = db.query(Project).filter(Project.id == project_id).one()
+        path, _, revision_range = self.plan_sync(project)
+        if revision_range is None:
+            return iter(())
+        return self.stream_log(path, revision_range, period_start, period_end)
+
+    def fetch_pull_requests(self, db, team_id, project_id, period_start, period_end) -> List[Dict]:
+        """Git-репозиторий не содержит PR."""
+        return []
+
+    def fetch_code_reviews(self, db, pull_request_ids, team_id) -> List[Dict]:
+        """Git-репозиторий не содержит ревью."""
+        return []
+
+    def fetch_tasks(self, db, team_id, project_id, period_start, period_end) -> List[Dict]:
+        """Git-репозиторий не содержит задач."""
+        return []
+
+    @staticmethod
+    def register_authors(
+        db: Session,
+        project_id: int,
+        commits: Iterable[Dict],
+        members: Dict[str, int]
+    ) -> Iterator[Dict]:
+        """
+        Добавить в проект авторов, которых ещё нет среди участников.
+
+        Карта members дополняется до того, как коммит попадёт в пачку,
+        поэтому author_id определяется без дополнительных запросов.
+        """
+        for commit in commits:
+            email = commit['author_email']
+            if email not in members:
+                member = ProjectMember(project_id=project_id, email=email, name=commit['author_name'])
+                db.add(member)
+                db.flush()
+                members[email] = member.id
+            yield commit
+
+    def populate_data(
+        self,
+        db: Session,
+        team_id: int,
+        project_id: int,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Синхронизировать коммиты локального клона с базой данных.
+
+        Без периода читается вся история после last_synced_sha; по окончании
+        загрузки last_synced_sha сдвигается на прочитанный HEAD. Если задан
+        период, коммиты вне его не загружаются и при следующей синхронизации
+        прочитаны не будут.
+        """
+        project = db.query(Project).filter(Project.id == project_id).one()
+        path, head, revision_range = self.plan_sync(project)
+        commits_created = 0
+
+        if revision_range is not None:
+            members = BulkIngestService.load_member_ids(db, project_id)
+            commits = self.stream_log(path, revision_range, period_start, period_end)
+            commits_created = self.store_records(
+                db, project_id, "commits",
+                self.register_authors(db, project_id, commits, members),
+                members
+            )
+            project.last_synced_sha = head
+            db.commit()
+
+        if commits_created:
+            metrics_cache.invalidate_project(project_id)
+
+        return {
+            "commits_created": commits_created,
+            "pull_requests_created": 0,
+            "reviews_created": 0,
+            "tasks_created": 0,
+            "last_synced_sha": head,
+            "message": "Данные успешно загружены"
+        }
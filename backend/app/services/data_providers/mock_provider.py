@@ -6,16 +6,17 @@ Mock-поставщик данных для целей демонстрации.
 при готовности к продакшену.
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict
 from datetime import datetime, timedelta
 import random
 from sqlalchemy.orm import Session
 
 from .base_provider import BaseDataProvider
-from app.models.models import (
-    Project, ProjectMember, Commit, PullRequest,
-    CodeReview, Task
-)
+from app.models.models import ProjectMember, PullRequest
+
+
+# Файлы mock-репозитория
+MOCK_FILES = [f"src/module_{i}.py" for i in range(20)] + [f"tests/test_module_{i}.py" for i in range(10)]
 
 
 class MockDataProvider(BaseDataProvider):
@@ -25,8 +26,14 @@ class MockDataProvider(BaseDataProvider):
     Симулирует данные из системы Git-репозитория, такой как T1 Сфера.Код,
     GitHub или GitLab. Структура данных соответствует тому, что поступало бы
     из реального API, что упрощает замену этого поставщика на реальный.
+    Сохранение данных выполняет BaseDataProvider.populate_data.
     """
     
+    @staticmethod
+    def _project_members(db: Session, project_id: int) -> List[ProjectMember]:
+        """Участники проекта, от имени которых генерируются данные."""
+        return db.query(ProjectMember).filter(ProjectMember.project_id == project_id).all()
+    
     def fetch_commits(
         self,
         db: Session,
@@ -36,8 +43,8 @@ class MockDataProvider(BaseDataProvider):
         period_end: datetime
     ) -> List[Dict]:
         """Генерировать mock-данные коммитов."""
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team or not team.members:
+        members = self._project_members(db, project_id)
+        if not members:
             return []
         
         commits = []
@@ -45,7 +52,7 @@ class MockDataProvider(BaseDataProvider):
         count = min(50, days_range * 2)  # ~2 коммита в день в среднем
         
         for i in range(count):
-            member = random.choice(team.members)
+            member = random.choice(members)
             commit_date = period_start + timedelta(
                 seconds=random.randint(0, int((period_end - period_start).total_seconds()))
             )
@@ -54,10 +61,11 @@ class MockDataProvider(BaseDataProvider):
             has_tests = random.random() > 0.4  # 60% имеют тесты
             test_coverage_delta = random.uniform(-2, 5) if has_tests else random.uniform(-5, 0)
             todo_count = random.choice([0, 0, 0, 1, 2, 3])  # В большинстве коммитов нет TODO
+            todo_removed = random.choice([0, 0, 0, 0, 1, 2])
             
-            # Симуляция code churn (20% коммитов изменяют недавно измененный код)
-            is_churn = random.random() > 0.8
-            churn_days = random.randint(1, 7) if is_churn else None
+            # Файлы выбираются из небольшого набора, поэтому часть коммитов
+            # меняет недавно изменённые файлы; churn вычисляется при загрузке
+            files = random.sample(MOCK_FILES, random.randint(1, 4))
             
             # Симуляция work-life balance
             hour = commit_date.hour
@@ -71,14 +79,14 @@ class MockDataProvider(BaseDataProvider):
                 'author_name': member.name,
                 'message': f"Mock commit {i}: {random.choice(['Fix bug', 'Add feature', 'Refactor', 'Update tests', 'TODO: Optimize performance'])}",
                 'committed_at': commit_date,
-                'files_changed': random.randint(1, 10),
+                'files_changed': len(files),
+                'files': files,
                 'insertions': random.randint(10, 200),
                 'deletions': random.randint(5, 100),
                 'has_tests': has_tests,
                 'test_coverage_delta': test_coverage_delta,
                 'todo_count': todo_count,
-                'is_churn': is_churn,
-                'churn_days': churn_days,
+                'todo_removed': todo_removed,
                 'is_after_hours': is_after_hours,
                 'is_weekend': is_weekend
             })
@@ -94,8 +102,8 @@ class MockDataProvider(BaseDataProvider):
         period_end: datetime
     ) -> List[Dict]:
         """Генерировать mock-данные pull request."""
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team or not team.members:
+        members = self._project_members(db, project_id)
+        if not members:
             return []
         
         prs = []
@@ -103,7 +111,7 @@ class MockDataProvider(BaseDataProvider):
         count = min(20, days_range // 2)  # ~1 PR каждые 2 дня
         
         for i in range(count):
-            member = random.choice(team.members)
+            member = random.choice(members)
             created = period_start + timedelta(
                 seconds=random.randint(0, int((period_end - period_start).total_seconds()))
             )
@@ -143,8 +151,11 @@ class MockDataProvider(BaseDataProvider):
         team_id: int
     ) -> List[Dict]:
         """Генерировать mock-данные code review."""
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team or not team.members:
+        # Ревьюеры - участники проектов, к которым относятся PR
+        members = db.query(ProjectMember).join(
+            PullRequest, PullRequest.project_id == ProjectMember.project_id
+        ).filter(PullRequest.id.in_(pull_request_ids)).distinct().all()
+        if not members:
             return []
         
         reviews = []
@@ -153,8 +164,8 @@ class MockDataProvider(BaseDataProvider):
             # Каждый PR получает 1-3 ревью
             num_reviews = random.randint(1, 3)
             
-            for _ in range(num_reviews):
-                reviewer = random.choice(team.members)
+            for n in range(num_reviews):
+                reviewer = random.choice(members)
                 state = random.choice(["approved", "approved", "changes_requested", "commented"])
                 
                 comments_count = random.randint(0, 12)
@@ -163,6 +174,7 @@ class MockDataProvider(BaseDataProvider):
                 todo_comments = random.randint(0, 3) if random.random() > 0.7 else 0
                 
                 reviews.append({
+                    'external_id': f"mock_review_{pr_id}_{n}_{random.randint(1000, 9999)}",
                     'pull_request_id': pr_id,
                     'reviewer_email': reviewer.email,
                     'state': state,
@@ -183,8 +195,8 @@ class MockDataProvider(BaseDataProvider):
         period_end: datetime
     ) -> List[Dict]:
         """Генерировать mock-данные задач с информацией об узких местах."""
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team or not team.members:
+        members = self._project_members(db, project_id)
+        if not members:
             return []
         
         tasks = []
@@ -192,7 +204,7 @@ class MockDataProvider(BaseDataProvider):
         count = min(30, days_range)  # ~1 задача в день
         
         for i in range(count):
-            member = random.choice(team.members)
+            member = random.choice(members)
             created = period_start + timedelta(
                 seconds=random.randint(0, int((period_end - period_start).total_seconds()))
             )
@@ -235,147 +247,3 @@ class MockDataProvider(BaseDataProvider):
             })
         
         return tasks
-    
-    def populate_data(
-        self,
-        db: Session,
-        team_id: int,
-        project_id: int,
-        period_start: Optional[datetime] = None,
-        period_end: Optional[datetime] = None
-    ) -> Dict:
-        """
-        Заполнить базу данных mock-данными за указанный период.
-        
-        Симулирует получение данных из реальной системы Git-репозитория.
-        """
-        # По умолчанию последние 30 дней, если не указано
-        if not period_end:
-            period_end = datetime.utcnow()
-        if not period_start:
-            period_start = period_end - timedelta(days=30)
-        
-        # Получить mock-данные
-        commits_data = self.fetch_commits(db, team_id, project_id, period_start, period_end)
-        prs_data = self.fetch_pull_requests(db, team_id, project_id, period_start, period_end)
-        tasks_data = self.fetch_tasks(db, team_id, project_id, period_start, period_end)
-        
-        # Сохранить коммиты в базе данных
-        commits_created = []
-        for commit_data in commits_data:
-            # Найти автора по email
-            author = db.query(ProjectMember).filter(
-                ProjectMember.email == commit_data['author_email']
-            ).first()
-            
-            commit = Commit(
-                external_id=commit_data['external_id'],
-                author_id=author.id if author else None,
-                message=commit_data['message'],
-                author_email=commit_data['author_email'],
-                author_name=commit_data['author_name'],
-                committed_at=commit_data['committed_at'],
-                files_changed=commit_data['files_changed'],
-                insertions=commit_data['insertions'],
-                deletions=commit_data['deletions'],
-                has_tests=commit_data['has_tests'],
-                test_coverage_delta=commit_data['test_coverage_delta'],
-                todo_count=commit_data['todo_count'],
-                is_churn=commit_data['is_churn'],
-                churn_days=commit_data['churn_days'],
-                is_after_hours=commit_data['is_after_hours'],
-                is_weekend=commit_data['is_weekend']
-            )
-            db.add(commit)
-            commits_created.append(commit)
-        
-        db.commit()
-        
-        # Сохранить pull request в базе данных
-        prs_created = []
-        for pr_data in prs_data:
-            author = db.query(ProjectMember).filter(
-                ProjectMember.email == pr_data['author_email']
-            ).first()
-            
-            pr = PullRequest(
-                external_id=pr_data['external_id'],
-                project_id=pr_data['project_id'],
-                author_id=author.id if author else None,
-                title=pr_data['title'],
-                description=pr_data['description'],
-                state=pr_data['state'],
-                created_at=pr_data['created_at'],
-                updated_at=pr_data['updated_at'],
-                merged_at=pr_data['merged_at'],
-                time_to_first_review=pr_data['time_to_first_review'],
-                time_to_merge=pr_data['time_to_merge'],
-                review_cycles=pr_data['review_cycles'],
-                lines_added=pr_data['lines_added'],
-                lines_deleted=pr_data['lines_deleted'],
-                files_changed=pr_data['files_changed']
-            )
-            db.add(pr)
-            prs_created.append(pr)
-        
-        db.commit()
-        
-        # Сохранить code review
-        pr_ids = [pr.id for pr in prs_created]
-        reviews_data = self.fetch_code_reviews(db, pr_ids, team_id)
-        reviews_created = []
-        
-        for review_data in reviews_data:
-            reviewer = db.query(ProjectMember).filter(
-                ProjectMember.email == review_data['reviewer_email']
-            ).first()
-            
-            review = CodeReview(
-                pull_request_id=review_data['pull_request_id'],
-                reviewer_id=reviewer.id if reviewer else None,
-                state=review_data['state'],
-                created_at=review_data['created_at'],
-                comments_count=review_data['comments_count'],
-                critical_comments=review_data['critical_comments'],
-                todo_comments=review_data['todo_comments']
-            )
-            db.add(review)
-            reviews_created.append(review)
-        
-        db.commit()
-        
-        # Сохранить задачи
-        tasks_created = []
-        for task_data in tasks_data:
-            assignee = db.query(ProjectMember).filter(
-                ProjectMember.email == task_data['assignee_email']
-            ).first()
-            
-            task = Task(
-                external_id=task_data['external_id'],
-                project_id=task_data['project_id'],
-                assignee_id=assignee.id if assignee else None,
-                title=task_data['title'],
-                description=task_data['description'],
-                state=task_data['state'],
-                priority=task_data['priority'],
-                created_at=task_data['created_at'],
-                started_at=task_data['started_at'],
-                completed_at=task_data['completed_at'],
-                time_in_todo=task_data['time_in_todo'],
-                time_in_development=task_data['time_in_development'],
-                time_in_review=task_data['time_in_review'],
-                time_in_testing=task_data['time_in_testing']
-            )
-            db.add(task)
-            tasks_created.append(task)
-        
-        db.commit()
-        
-        return {
-            "commits_created": len(commits_created),
-            "pull_requests_created": len(prs_created),
-            "reviews_created": len(reviews_created),
-            "tasks_created": len(tasks_created),
-            "message": "Mock-данные успешно сгенерированы"
-        }
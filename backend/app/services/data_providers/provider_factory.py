@@ -7,6 +7,7 @@
 from typing import Optional
 from .base_provider import BaseDataProvider
 from .mock_provider import MockDataProvider
+from .git_provider import GitRepositoryProvider
 
 
 class DataProviderFactory:
@@ -20,6 +21,7 @@ class DataProviderFactory:
     # Реестр доступных поставщиков
     _providers = {
         'mock': MockDataProvider,
+        'git': GitRepositoryProvider,
         # Будущие поставщики могут быть зарегистрированы здесь:
         # 't1': T1DataProvider,
         # 'github': GitHubDataProvider,
@@ -35,7 +37,7 @@ class DataProviderFactory:
         Создать и вернуть экземпляр поставщика данных.
         
         Args:
-            provider_type: Тип создаваемого поставщика ('mock', 't1', 'github', 'gitlab')
+            provider_type: Тип создаваемого поставщика ('mock', 'git', 't1', 'github', 'gitlab')
                           Если None, использует поставщика по умолчанию.
         
         Returns:
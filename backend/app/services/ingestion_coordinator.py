@@ -0,0 +1,236 @@
+"""
+Параллельная синхронизация многих Git-репозиториев.
+Parallel multi-repository ingestion with a single database writer.
+
+Разбор `git log` (CPU-bound) выполняется в пуле процессов, по одному
+репозиторию на задачу. Рабочие процессы не обращаются к базе: разобранные
+коммиты отправляются пачками в ограниченную очередь, а единственный писатель
+в основном процессе сохраняет их через BulkIngestService. SQLite видит одного
+писателя, а размер очереди ограничивает память при медленной записи.
+"""
+import logging
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import metrics_cache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import Project
+from app.services.bulk_ingest_service import BulkIngestService
+from app.services.data_providers.git_provider import GitRepositoryProvider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RepositorySyncResult:
+    """Итог синхронизации одного репозитория."""
+    project_id: int
+    name: str
+    status: str = "pending"  # ok, up_to_date, failed
+    head: Optional[str] = None
+    commits_parsed: int = 0
+    commits_inserted: int = 0
+    parse_seconds: float = 0.0
+    write_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class _SyncTask:
+    """Задание рабочему процессу: разобрать диапазон ревизий репозитория."""
+    project_id: int
+    path: str
+    revision_range: str
+
+
+# Очередь результатов рабочего процесса (задаётся инициализатором пула)
+_results_queue = None
+
+
+def _init_worker(results_queue) -> None:
+    global _results_queue
+    _results_queue = results_queue
+
+
+def _parse_repository(task: _SyncTask, git_binary: str, chunk_size: int) -> None:
+    """
+    Разобрать историю репозитория и отправить коммиты писателю пачками.
+
+    Сообщения очереди: ("rows", project_id, коммиты),
+    затем ("done" | "failed", project_id, разобрано, секунды, ошибка).
+    """
+    started = time.perf_counter()
+    parsed = 0
+    try:
+        provider = GitRepositoryProvider(git_binary=git_binary)
+        chunk: List[Dict] = []
+        for commit in provider.stream_log(task.path, task.revision_range):
+            chunk.append(commit)
+            if len(chunk) >= chunk_size:
+                _results_queue.put(("rows", task.project_id, chunk))
+                parsed += len(chunk)
+                chunk = []
+        if chunk:
+            _results_queue.put(("rows", task.project_id, chunk))
+            parsed += len(chunk)
+    except Exception as exc:
+        _results_queue.put((
+            "failed", task.project_id, parsed, time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+        ))
+        return
+    _results_queue.put(("done", task.project_id, parsed, time.perf_counter() - started, None))
+
+
+class IngestionCoordinator:
+    """Синхронизация репозиториев проектов: разбор в пуле процессов, запись одним писателем."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        git_binary: str = "git",
+        progress: Optional[Callable[[RepositorySyncResult], None]] = None
+    ):
+        self.session_factory = session_factory
+        self.max_workers = max_workers or settings.INGEST_MAX_WORKERS
+        self.chunk_size = chunk_size or settings.BULK_INGEST_BATCH_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.provider = GitRepositoryProvider(git_binary=git_binary)
+        self.progress = progress
+
+    def _plan(
+        self,
+        db: Session,
+        project_ids: Optional[Sequence[int]]
+    ) -> Tuple[List[_SyncTask], Dict[int, RepositorySyncResult]]:
+        """Определить диапазоны ревизий; недоступные и синхронизированные репозитории завершаются сразу."""
+        query = db.query(Project).filter(Project.repository_path.isnot(None))
+        if project_ids:
+            query = query.filter(Project.id.in_(project_ids))
+
+        tasks: List[_SyncTask] = []
+        results: Dict[int, RepositorySyncResult] = {}
+        for project in query.order_by(Project.id):
+            result = results[project.id] = RepositorySyncResult(project.id, project.name)
+            try:
+                path, result.head, revision_range = self.provider.plan_sync(project)
+            except ValueError as exc:
+                self._finish(result, "failed", str(exc))
+                continue
+            if revision_range is None:
+                self._finish(result, "up_to_date")
+            else:
+                tasks.append(_SyncTask(project.id, path, revision_range))
+        return tasks, results
+
+    def _finish(self, result: RepositorySyncResult, status: str, error: Optional[str] = None) -> None:
+        result.status = status
+        result.error = error
+        if status == "failed":
+            logger.warning("Синхронизация проекта %d не удалась: %s", result.project_id, error)
+        if self.progress:
+            self.progress(result)
+
+    def _write_rows(
+        self,
+        db: Session,
+        result: RepositorySyncResult,
+        commits: List[Dict],
+        members: Dict[str, int]
+    ) -> None:
+        started = time.perf_counter()
+        result.commits_inserted += self.provider.store_records(
+            db, result.project_id, "commits",
+            self.provider.register_authors(db, result.project_id, commits, members),
+            members, self.chunk_size
+        )
+        result.write_seconds += time.perf_counter() - started
+
+    def _complete(self, db: Session, result: RepositorySyncResult) -> None:
+        """Сдвинуть last_synced_sha после записи всех коммитов репозитория."""
+        started = time.perf_counter()
+        db.query(Project).filter(Project.id == result.project_id).update(
+            {Project.last_synced_sha: result.head}, synchronize_session=False
+        )
+        db.commit()
+        result.write_seconds += time.perf_counter() - started
+        if result.commits_inserted:
+            metrics_cache.invalidate_project(result.project_id)
+        self._finish(result, "ok")
+
+    def run(self, project_ids: Optional[Sequence[int]] = None) -> List[RepositorySyncResult]:
+        """
+        Синхронизировать репозитории всех проектов с repository_path (или только project_ids).
+
+        Ошибка одного репозитория не прерывает остальные: его last_synced_sha
+        не сдвигается, уже записанные коммиты пропускаются при повторе.
+
+        Returns:
+            Итоги по каждому репозиторию в порядке ID проекта.
+        """
+        db = self.session_factory()
+        try:
+            tasks, results = self._plan(db, project_ids)
+            if tasks:
+                self._run_tasks(db, tasks, results)
+            return list(results.values())
+        finally:
+            db.close()
+
+    def _run_tasks(self, db: Session, tasks: List[_SyncTask], results: Dict[int, RepositorySyncResult]) -> None:
+        results_queue = multiprocessing.Queue(maxsize=self.queue_size)
+        pending = {task.project_id for task in tasks}
+        members: Dict[int, Dict[str, int]] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(tasks)),
+            initializer=_init_worker,
+            initargs=(results_queue,)
+        ) as pool:
+            futures = {
+                pool.submit(_parse_repository, task, self.provider.git_binary, self.chunk_size): task.project_id
+                for task in tasks
+            }
+            while pending:
+                try:
+                    message = results_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # Процесс, упавший без сообщения (например, BrokenProcessPool)
+                    for future, project_id in futures.items():
+                        if project_id in pending and future.done() and future.exception():
+                            pending.discard(project_id)
+                            self._finish(results[project_id], "failed", repr(future.exception()))
+                    continue
+
+                kind, project_id = message[0], message[1]
+                result = results[project_id]
+                if kind == "rows":
+                    # После ошибки записи остальные пачки репозитория пропускаются,
+                    # но очередь продолжает читаться до итогового сообщения процесса
+                    if result.error is not None:
+                        continue
+                    try:
+                        if project_id not in members:
+                            members[project_id] = BulkIngestService.load_member_ids(db, project_id)
+                        self._write_rows(db, result, message[2], members[project_id])
+                    except Exception as exc:
+                        db.rollback()
+                        result.error = f"{type(exc).__name__}: {exc}"
+                    continue
+
+                _, _, result.commits_parsed, result.parse_seconds, error = message
+                pending.discard(project_id)
+                if kind == "failed" or result.error is not None:
+                    self._finish(result, "failed", result.error or error)
+                else:
+                    self._complete(db, result)
+        results_queue.close()
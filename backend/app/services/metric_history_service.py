@@ -0,0 +1,205 @@
+"""
+Сервис истории снимков метрик.
+Service for deduplicated, compacted metric snapshot history.
+
+Снимок метрики хранится одной строкой на ключ (проект, метрика, длина периода,
+интервал истории): повторные расчёты в пределах часа обновляют строку (upsert),
+а не добавляют новую. Задача компактизации прореживает старые снимки
+(hourly → daily → weekly), оставляя последний снимок каждого интервала,
+и удаляет недельные снимки старше срока хранения.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import ProjectMetric, TechnicalDebtMetric
+
+
+# Интервалы истории от мелкого к крупному
+GRANULARITIES = ("hourly", "daily", "weekly")
+
+# Колонки ключа снимка (без granularity и bucket_start) для каждой модели
+_SNAPSHOT_KEYS = {
+    ProjectMetric: ("project_id", "metric_type", "period_days"),
+    TechnicalDebtMetric: ("project_id", "period_days"),
+}
+
+
+def align_bucket(moment: datetime, granularity: str) -> datetime:
+    """Начало интервала истории (часа, дня или недели с понедельника) для момента времени."""
+    if granularity == "hourly":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day_start = datetime.combine(moment.date(), time.min)
+    if granularity == "daily":
+        return day_start
+    if granularity == "weekly":
+        return day_start - timedelta(days=day_start.weekday())
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def _key_columns(model) -> Tuple[str, ...]:
+    return _SNAPSHOT_KEYS[model] + ("granularity", "bucket_start")
+
+
+def _snapshot_row(snapshot) -> Dict:
+    """Значения колонок несохранённого снимка (без id)."""
+    table = type(snapshot).__table__
+    return {
+        column.key: getattr(snapshot, column.key)
+        for column in table.columns
+        if column.key != "id"
+    }
+
+
+class MetricHistoryService:
+    """Сервис для дедупликации и компактизации снимков метрик."""
+
+    @staticmethod
+    def snapshot_key(period_start: datetime, period_end: datetime) -> Dict:
+        """
+        Поля ключа нового снимка за период [period_start, period_end].
+
+        Новые снимки пишутся с почасовой гранулярностью по моменту period_end.
+        """
+        return {
+            "period_days": round((period_end - period_start).total_seconds() / 86400),
+            "granularity": "hourly",
+            "bucket_start": align_bucket(period_end, "hourly"),
+        }
+
+    @staticmethod
+    def _upsert_rows(db: Session, model, rows: List[Dict]) -> None:
+        """INSERT ... ON CONFLICT DO UPDATE по уникальному ключу снимка."""
+        if not rows:
+            return
+        key_columns = _key_columns(model)
+        stmt = sqlite_insert(model.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={
+                name: stmt.excluded[name]
+                for name in rows[0]
+                if name not in key_columns
+            }
+        )
+        db.execute(stmt)
+
+    @staticmethod
+    def upsert_snapshots(db: Session, snapshots: Iterable) -> int:
+        """
+        Сохранить снимки, заменяя существующие с тем же ключом.
+        Upsert snapshots by their (project, metric, period, bucket) key.
+
+        Принимает несохранённые объекты ProjectMetric и TechnicalDebtMetric.
+        Из нескольких снимков с одним ключом сохраняется последний.
+        Коммит выполняет вызывающий код.
+
+        Returns:
+            Количество записанных строк.
+        """
+        by_model: Dict[type, Dict[Tuple, Dict]] = {}
+        for snapshot in snapshots:
+            model = type(snapshot)
+            row = _snapshot_row(snapshot)
+            key = tuple(row[name] for name in _key_columns(model))
+            by_model.setdefault(model, {})[key] = row
+
+        written = 0
+        for model, rows in by_model.items():
+            MetricHistoryService._upsert_rows(db, model, list(rows.values()))
+            written += len(rows)
+        return written
+
+    @staticmethod
+    def save_snapshot(db: Session, snapshot):
+        """
+        Сохранить один снимок (upsert) и вернуть сохранённую строку.
+        """
+        model = type(snapshot)
+        MetricHistoryService.upsert_snapshots(db, [snapshot])
+        db.commit()
+        return db.query(model).filter_by(**{
+            name: getattr(snapshot, name) for name in _key_columns(model)
+        }).one()
+
+    @staticmethod
+    def _downsample(db: Session, model, source: str, target: str, cutoff: datetime) -> int:
+        """
+        Заменить снимки гранулярности source старше cutoff последним снимком
+        каждого интервала target.
+
+        Компактизируются только целые интервалы target, поэтому повторный
+        запуск не смешивает уже свёрнутые интервалы с новыми снимками.
+
+        Returns:
+            Количество удалённых снимков source.
+        """
+        cutoff = align_bucket(cutoff, target)
+        table = model.__table__
+        group_columns = _SNAPSHOT_KEYS[model]
+        source_filter = (
+            table.c.granularity == source,
+            table.c.bucket_start < cutoff,
+        )
+
+        # Строки упорядочены так, что последняя в группе - самый свежий снимок
+        latest: Dict[Tuple, Dict] = {}
+        result = db.execute(
+            select(table).where(*source_filter).order_by(table.c.bucket_start, table.c.id)
+        ).mappings()
+        removed = 0
+        for row in result:
+            removed += 1
+            bucket = align_bucket(row["bucket_start"], target)
+            key = tuple(row[name] for name in group_columns) + (bucket,)
+            values = {name: value for name, value in row.items() if name != "id"}
+            values["granularity"] = target
+            values["bucket_start"] = bucket
+            latest[key] = values
+
+        if not removed:
+            return 0
+
+        db.execute(table.delete().where(*source_filter))
+        rows = list(latest.values())
+        batch_size = settings.METRIC_HISTORY_COMPACTION_BATCH_SIZE
+        for i in range(0, len(rows), batch_size):
+            MetricHistoryService._upsert_rows(db, model, rows[i:i + batch_size])
+        return removed
+
+    @staticmethod
+    def compact(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Прорядить и очистить историю снимков согласно политике хранения.
+        Downsample old snapshots (hourly → daily → weekly) and expire weekly ones.
+
+        Сроки хранения задаются в настройках METRIC_HISTORY_*_RETENTION_DAYS;
+        значение 0 для недельных снимков означает бессрочное хранение.
+
+        Returns:
+            Количество обработанных строк по каждому шагу.
+        """
+        now = now or datetime.utcnow()
+        stats = {"hourly_to_daily": 0, "daily_to_weekly": 0, "weekly_expired": 0}
+        hourly_cutoff = now - timedelta(days=settings.METRIC_HISTORY_HOURLY_RETENTION_DAYS)
+        daily_cutoff = now - timedelta(days=settings.METRIC_HISTORY_DAILY_RETENTION_DAYS)
+        weekly_days = settings.METRIC_HISTORY_WEEKLY_RETENTION_DAYS
+
+        for model in _SNAPSHOT_KEYS:
+            stats["hourly_to_daily"] += MetricHistoryService._downsample(
+                db, model, "hourly", "daily", hourly_cutoff
+            )
+            stats["daily_to_weekly"] += MetricHistoryService._downsample(
+                db, model, "daily", "weekly", daily_cutoff
+            )
+            if weekly_days > 0:
+                table = model.__table__
+                stats["weekly_expired"] += db.execute(table.delete().where(
+                    table.c.granularity == "weekly",
+                    table.c.bucket_start < now - timedelta(days=weekly_days)
+                )).rowcount
+
+        db.commit()
+        return stats
@@ -0,0 +1,157 @@
+"""
+Фоновая запись снимков метрик (write-behind).
+Background write-behind persistence of metric snapshots.
+
+GET-обработчики метрик не выполняют INSERT+COMMIT сами: снимки ставятся
+в ограниченную очередь, а отдельный поток записывает их пачками - много
+снимков в одной транзакции. Задержка чтения больше не включает fsync,
+а читатели SQLite не выстраиваются за блокировкой записи.
+Снимки с одинаковым ключом заменяют друг друга (см. MetricHistoryService).
+"""
+import logging
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.metric_history_service import MetricHistoryService
+
+logger = logging.getLogger(__name__)
+
+
+class MetricSnapshotWriter:
+    """Пакетная запись снимков метрик в отдельном потоке."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def enqueue(self, snapshot) -> bool:
+        """
+        Поставить снимок (несохранённый ORM-объект) в очередь на запись.
+
+        Не блокирует запрос: при переполненной очереди снимок отбрасывается.
+
+        Returns:
+            True, если снимок принят в очередь.
+        """
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Очередь снимков метрик переполнена, снимок отброшен")
+            return False
+        self.enqueued += 1
+        return True
+
+    def _take_batch(self, timeout: Optional[float]) -> List:
+        """Забрать из очереди до batch_size снимков, ожидая первый не дольше timeout."""
+        try:
+            first = self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List) -> None:
+        """Записать пачку снимков одной транзакцией (upsert по ключу снимка)."""
+        db = self.session_factory()
+        try:
+            MetricHistoryService.upsert_snapshots(db, batch)
+            db.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception:
+            db.rollback()
+            self.failed += len(batch)
+            logger.exception("Не удалось записать %d снимков метрик", len(batch))
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        """
+        Синхронно записать всё, что сейчас находится в очереди.
+
+        Returns:
+            Количество обработанных снимков.
+        """
+        processed = 0
+        with self._write_lock:
+            while True:
+                batch = self._take_batch(timeout=None)
+                if not batch:
+                    return processed
+                self._write(batch)
+                processed += len(batch)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            with self._write_lock:
+                batch = self._take_batch(timeout=self.flush_interval)
+                if batch:
+                    self._write(batch)
+        self.flush()
+
+    def start(self) -> None:
+        """Запустить фоновый поток записи."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="metric-snapshot-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Остановить поток, дописав все снимки из очереди."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        """Счётчики очереди снимков."""
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+snapshot_writer = MetricSnapshotWriter(
+    max_queue_size=settings.METRIC_SNAPSHOT_QUEUE_SIZE,
+    batch_size=settings.METRIC_SNAPSHOT_BATCH_SIZE,
+    flush_interval=settings.METRIC_SNAPSHOT_FLUSH_INTERVAL_SECONDS,
+)
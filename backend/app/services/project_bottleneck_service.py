@@ -3,8 +3,9 @@
 Service for analyzing project workflow bottlenecks.
 """
 from typing import Dict, Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from app.models.models import Project, Task, PullRequest, CodeReview
 
 
@@ -161,31 +162,32 @@ class ProjectBottleneckService:
         if not project:
             return None
         
-        # Получить все открытые PR проекта
-        open_prs = db.query(PullRequest).filter(
-            PullRequest.project_id == project_id,
-            PullRequest.state == "open"
-        ).all()
+        now = datetime.utcnow()
         
-        if not open_prs:
-            return []
+        # Время первого ревью PR (MIN по индексу (pull_request_id, created_at))
+        first_review_at = select(func.min(CodeReview.created_at)).where(
+            CodeReview.pull_request_id == PullRequest.id
+        ).correlate(PullRequest).scalar_subquery().label("first_review_at")
         
-        pr_list = []
-        now = datetime.utcnow()
+        # Если есть хотя бы одно ревью, считаем время с первого ревью,
+        # иначе - с момента создания PR
+        review_started_at = func.coalesce(first_review_at, PullRequest.created_at)
         
-        for pr in open_prs:
-            # Найти первое ревью для PR
-            first_review = db.query(CodeReview).filter(
-                CodeReview.pull_request_id == pr.id
-            ).order_by(CodeReview.created_at.asc()).first()
-            
-            # Если есть хотя бы одно ревью, считаем время с первого ревью
-            # Иначе считаем время с момента создания PR
-            if first_review:
-                time_in_review_hours = (now - first_review.created_at).total_seconds() / 3600
-            else:
-                # PR создан, но ещё не получил ревью - считаем с момента создания
-                time_in_review_hours = (now - pr.created_at).total_seconds() / 3600
+        # Открытые PR проекта, которые на ревью не меньше min_hours_in_review,
+        # отсортированные по времени в ревью (убывание), затем по времени создания (убывание)
+        rows = db.query(PullRequest, first_review_at).filter(
+            PullRequest.project_id == project_id,
+            PullRequest.state == "open",
+            review_started_at <= now - timedelta(hours=min_hours_in_review)
+        ).order_by(
+            review_started_at.asc(),
+            PullRequest.created_at.desc()
+        ).limit(limit).all()
+        
+        pr_list = []
+        for pr, first_review in rows:
+            started_at = first_review or pr.created_at
+            time_in_review_hours = (now - started_at).total_seconds() / 3600
             
             # Определить визуальный индикатор
             if time_in_review_hours < 24:
@@ -195,22 +197,16 @@ class ProjectBottleneckService:
             else:
                 indicator = "🌩️"  # Больше 4 дней
             
-            # Фильтровать только PR, которые на ревью больше min_hours_in_review
-            if time_in_review_hours >= min_hours_in_review:
-                pr_list.append({
-                    "pr_id": pr.id,
-                    "external_id": pr.external_id,
-                    "title": pr.title,
-                    "author_id": pr.author_id,
-                    "created_at": pr.created_at,
-                    "time_in_review_hours": round(time_in_review_hours, 1),
-                    "indicator": indicator,
-                    "has_reviews": first_review is not None,
-                    "review_cycles": pr.review_cycles
-                })
-        
-        # Отсортировать по времени в ревью (убывание), затем по времени создания (убывание)
-        pr_list.sort(key=lambda x: (-x["time_in_review_hours"], -x["created_at"].timestamp()))
-        
-        # Вернуть только первые limit записей
-        return pr_list[:limit]
+            pr_list.append({
+                "pr_id": pr.id,
+                "external_id": pr.external_id,
+                "title": pr.title,
+                "author_id": pr.author_id,
+                "created_at": pr.created_at,
+                "time_in_review_hours": round(time_in_review_hours, 1),
+                "indicator": indicator,
+                "has_reviews": first_review is not None,
+                "review_cycles": pr.review_cycles
+            })
+        
+        return pr_list
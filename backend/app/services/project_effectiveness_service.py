@@ -11,10 +11,16 @@ from typing import Dict, Optional, List
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.models.models import Project, ProjectMember, Commit, ProjectMetric
+from app.models.models import Project, ProjectMember, ProjectMetric
+from app.services.metric_history_service import MetricHistoryService
+from app.services.commit_stats_service import CommitStatsService
 import json
 
 
+# Изменение оценки (в баллах), начиная с которого тренд не считается стабильным
+TREND_THRESHOLD = 5.0
+
+
 class ProjectEffectivenessService:
     """Сервис для расчёта общей оценки эффективности проекта."""
 
@@ -36,15 +42,12 @@ class ProjectEffectivenessService:
         if not project:
             return None
         
-        member_ids = [member.id for member in project.members]
-        
-        # Получить все коммиты за период
-        commits = db.query(Commit).filter(
-            Commit.author_id.in_(member_ids),
-            Commit.committed_at.between(period_start, period_end)
-        ).all()
+        # Подсчитать коммиты и уникальных авторов за период
+        stats = CommitStatsService.period_totals(
+            db, project_id, period_start, period_end
+        )
         
-        if not commits:
+        if not stats["total_commits"]:
             return {
                 "project_id": project_id,
                 "project_name": project.name,
@@ -54,14 +57,8 @@ class ProjectEffectivenessService:
                 "period_end": period_end,
             }
         
-        # Подсчитать уникальных авторов
-        unique_authors = set()
-        for commit in commits:
-            if commit.author_id:
-                unique_authors.add(commit.author_id)
-        
-        active_contributors = len(unique_authors)
-        total_commits = len(commits)
+        active_contributors = stats["active_contributors"]
+        total_commits = stats["total_commits"]
         
         return {
             "project_id": project_id,
@@ -91,45 +88,32 @@ class ProjectEffectivenessService:
         if not project:
             return None
         
-        member_ids = [member.id for member in project.members]
-        
-        # Получить все коммиты за период, сгруппированные по автору
-        commit_counts = db.query(
-            Commit.author_id,
-            func.count(Commit.id).label('commit_count'),
-            func.sum(Commit.insertions + Commit.deletions).label('lines_changed')
-        ).filter(
-            Commit.author_id.in_(member_ids),
-            Commit.committed_at.between(period_start, period_end)
-        ).group_by(Commit.author_id).all()
-        
-        # Получить информацию об участниках
-        members = db.query(ProjectMember).filter(ProjectMember.id.in_(member_ids)).all()
-        member_map = {m.id: m for m in members}
+        # Получить статистику коммитов за период по каждому автору
+        author_stats = CommitStatsService.author_totals(db, project_id, period_start, period_end)
         
         # Сформировать список участников с метриками
         contributors = []
-        for author_id, commit_count, lines_changed in commit_counts:
-            member = member_map.get(author_id)
-            if member:
-                # Определить уровень экспертности на основе количества коммитов
-                if commit_count >= 50:
-                    expertise_level = "expert"
-                elif commit_count >= 20:
-                    expertise_level = "advanced"
-                elif commit_count >= 5:
-                    expertise_level = "intermediate"
-                else:
-                    expertise_level = "beginner"
-                
-                contributors.append({
-                    "author_id": author_id,
-                    "author_name": member.name,
-                    "author_email": member.email,
-                    "commit_count": commit_count,
-                    "lines_changed": int(lines_changed) if lines_changed else 0,
-                    "expertise_level": expertise_level
-                })
+        for stats in author_stats:
+            commit_count = stats["commit_count"]
+            
+            # Определить уровень экспертности на основе количества коммитов
+            if commit_count >= 50:
+                expertise_level = "expert"
+            elif commit_count >= 20:
+                expertise_level = "advanced"
+            elif commit_count >= 5:
+                expertise_level = "intermediate"
+            else:
+                expertise_level = "beginner"
+            
+            contributors.append({
+                "author_id": stats["author_id"],
+                "author_name": stats["author_name"],
+                "author_email": stats["author_email"],
+                "commit_count": commit_count,
+                "lines_changed": stats["lines_changed"],
+                "expertise_level": expertise_level
+            })
         
         # Сортировать по количеству коммитов (убывание)
         contributors.sort(key=lambda x: x["commit_count"], reverse=True)
@@ -155,121 +139,229 @@ class ProjectEffectivenessService:
         Calculate comprehensive project effectiveness score.
         
         Новое ТЗ: Оценка основана только на данных коммитов (без PR и задач).
+        Тренд сравнивает оценку с предыдущим периодом той же длины; оба окна
+        агрегируются одним запросом по [period_start - период, period_end].
         """
         project = db.query(Project).filter(Project.id == project_id).first()
         if not project:
             return None
         
-        # Получить участников проекта
-        member_ids = [member.id for member in project.members]
+        # Размер команды проекта
+        team_size = db.query(func.count(ProjectMember.id)).filter(
+            ProjectMember.project_id == project_id
+        ).scalar() or 0
+        
+        # Агрегировать коммиты участников проекта за предыдущий и текущий периоды
+        previous_start = period_start - (period_end - period_start)
+        previous_stats, stats = CommitStatsService.bucket_totals_by_project(
+            db, [project_id], [previous_start, period_start, period_end]
+        )[project_id]
+        
+        return ProjectEffectivenessService.score_effectiveness(
+            project_id, project.name, stats, team_size, period_start, period_end,
+            previous_stats=previous_stats
+        )
+
+    @staticmethod
+    def score_effectiveness(
+        project_id: int,
+        project_name: str,
+        stats: Dict[str, int],
+        team_size: int,
+        period_start: datetime,
+        period_end: datetime,
+        previous_stats: Optional[Dict[str, int]] = None
+    ) -> Dict:
+        """
+        Рассчитать оценку эффективности по агрегированной статистике коммитов.
+        Score project effectiveness from aggregated commit statistics.
+        
+        Общие правила оценки для одного проекта и для портфеля проектов.
+        Если передана статистика предыдущего периода той же длины, тренд
+        определяется по изменению оценки, а в ответ добавляются компоненты
+        оценки предыдущего периода.
+        """
+        current = ProjectEffectivenessService.score_window(stats, team_size)
+        previous = None
+        trend = "stable"
+        score_delta = 0.0
+        if previous_stats is not None:
+            previous = ProjectEffectivenessService.score_window(previous_stats, team_size)
+            previous["period_start"] = period_start - (period_end - period_start)
+            previous["period_end"] = period_start
+            # Без коммитов в предыдущем периоде сравнивать не с чем
+            if previous["total_commits"]:
+                score_delta = round(current["effectiveness_score"] - previous["effectiveness_score"], 2)
+                if score_delta >= TREND_THRESHOLD:
+                    trend = "improving"
+                elif score_delta <= -TREND_THRESHOLD:
+                    trend = "declining"
+        
+        # Проверить на алерты
+        has_alert = False
+        alert_message = None
+        alert_severity = None
         
-        # Получить коммиты участников проекта
-        commits = db.query(Commit).filter(
-            Commit.author_id.in_(member_ids),
-            Commit.committed_at.between(period_start, period_end)
-        ).all()
+        if not current["total_commits"]:
+            pass  # Нет коммитов за период - оценивать нечего
+        elif current["effectiveness_score"] < 40:
+            has_alert = True
+            alert_message = "Эффективность проекта ниже целевого уровня. Проверьте активность команды."
+            alert_severity = "critical"
+        elif current["effectiveness_score"] < 60:
+            has_alert = True
+            alert_message = "Эффективность проекта может быть улучшена. Рассмотрите оптимизацию процессов."
+            alert_severity = "warning"
+        elif current["after_hours_percentage"] > 30:
+            has_alert = True
+            alert_message = "Обнаружена высокая активность вне рабочего времени. Возможны переработки в команде."
+            alert_severity = "warning"
+        elif current["weekend_percentage"] > 20:
+            has_alert = True
+            alert_message = "Обнаружена высокая активность в выходные дни. Проверьте нагрузку на команду."
+            alert_severity = "warning"
+        elif current["churn_rate"] > 25:
+            has_alert = True
+            alert_message = "Высокий уровень переписывания кода. Возможны проблемы с качеством или планированием."
+            alert_severity = "warning"
         
-        if not commits:
+        return {
+            "project_id": project_id,
+            "project_name": project_name,
+            **current,
+            "trend": trend,
+            "score_delta": score_delta,
+            "previous_period": previous,
+            "has_alert": has_alert,
+            "alert_message": alert_message,
+            "alert_severity": alert_severity,
+            "period_start": period_start,
+            "period_end": period_end,
+        }
+
+    @staticmethod
+    def score_window(stats: Dict[str, int], team_size: int) -> Dict:
+        """
+        Оценка эффективности и её компоненты для статистики одного периода.
+        Score effectiveness (0-100) and its components from aggregated commit statistics.
+        """
+        if not stats["total_commits"]:
             return {
-                "project_id": project_id,
-                "project_name": project.name,
                 "effectiveness_score": 0.0,
-                "trend": "stable",
                 "total_commits": 0,
                 "active_contributors": 0,
                 "after_hours_percentage": 0.0,
                 "weekend_percentage": 0.0,
-                "has_alert": False,
-                "alert_message": None,
-                "alert_severity": None,
-                "period_start": period_start,
-                "period_end": period_end,
+                "churn_rate": 0.0,
+                "components": {
+                    "commit_activity": 0.0,
+                    "team_engagement": 0.0,
+                    "work_life_balance": 0.0,
+                    "code_quality": 0.0,
+                },
             }
         
         # Рассчитать метрики
-        total_commits = len(commits)
-        active_contributors = len(set(c.author_id for c in commits if c.author_id))
+        total_commits = stats["total_commits"]
+        active_contributors = stats["active_contributors"]
         
         # Метрики work-life balance
-        after_hours_commits = [c for c in commits if c.is_after_hours]
-        weekend_commits = [c for c in commits if c.is_weekend]
-        after_hours_percentage = (len(after_hours_commits) / total_commits * 100) if total_commits > 0 else 0
-        weekend_percentage = (len(weekend_commits) / total_commits * 100) if total_commits > 0 else 0
+        after_hours_percentage = (stats["after_hours_commits"] / total_commits * 100) if total_commits > 0 else 0
+        weekend_percentage = (stats["weekend_commits"] / total_commits * 100) if total_commits > 0 else 0
         
         # Метрики code churn
-        churn_commits = [c for c in commits if c.is_churn]
-        churn_rate = (len(churn_commits) / total_commits * 100) if total_commits > 0 else 0
+        churn_rate = (stats["churn_commits"] / total_commits * 100) if total_commits > 0 else 0
         
         # Рассчитать оценку эффективности (0-100)
         # Чем выше, тем лучше
-        score_components = []
         
         # 1. Активность коммитов (макс 30 баллов)
-        commit_score = min(30, (total_commits / max(len(member_ids), 1)) * 6) if member_ids else 0
-        score_components.append(commit_score)
+        commit_score = min(30, (total_commits / max(team_size, 1)) * 6) if team_size else 0
         
         # 2. Вовлеченность команды (макс 30 баллов)
-        collab_score = (active_contributors / max(len(member_ids), 1)) * 30 if member_ids else 0
-        score_components.append(collab_score)
+        collab_score = (active_contributors / max(team_size, 1)) * 30 if team_size else 0
         
         # 3. Work-life balance (макс 20 баллов) - штраф за переработки
         if after_hours_percentage > 30 or weekend_percentage > 20:
             work_life_score = max(0, 20 - (after_hours_percentage / 10))
         else:
             work_life_score = 20
-        score_components.append(work_life_score)
         
         # 4. Качество кода (макс 20 баллов) - штраф за высокий churn
         if churn_rate > 25:
             quality_score = max(0, 20 - (churn_rate / 10))
         else:
             quality_score = 20
-        score_components.append(quality_score)
-        
-        effectiveness_score = sum(score_components)
-        
-        # Определить тренд (упрощенно - сравнить с предыдущим периодом)
-        trend = "stable"
         
-        # Проверить на алерты
-        has_alert = False
-        alert_message = None
-        alert_severity = None
-        
-        if effectiveness_score < 40:
-            has_alert = True
-            alert_message = "Эффективность проекта ниже целевого уровня. Проверьте активность команды."
-            alert_severity = "critical"
-        elif effectiveness_score < 60:
-            has_alert = True
-            alert_message = "Эффективность проекта может быть улучшена. Рассмотрите оптимизацию процессов."
-            alert_severity = "warning"
-        elif after_hours_percentage > 30:
-            has_alert = True
-            alert_message = "Обнаружена высокая активность вне рабочего времени. Возможны переработки в команде."
-            alert_severity = "warning"
-        elif weekend_percentage > 20:
-            has_alert = True
-            alert_message = "Обнаружена высокая активность в выходные дни. Проверьте нагрузку на команду."
-            alert_severity = "warning"
-        elif churn_rate > 25:
-            has_alert = True
-            alert_message = "Высокий уровень переписывания кода. Возможны проблемы с качеством или планированием."
-            alert_severity = "warning"
+        effectiveness_score = commit_score + collab_score + work_life_score + quality_score
         
         return {
-            "project_id": project_id,
-            "project_name": project.name,
             "effectiveness_score": round(effectiveness_score, 2),
-            "trend": trend,
             "total_commits": total_commits,
             "active_contributors": active_contributors,
             "after_hours_percentage": round(after_hours_percentage, 2),
             "weekend_percentage": round(weekend_percentage, 2),
             "churn_rate": round(churn_rate, 2),
-            "has_alert": has_alert,
-            "alert_message": alert_message,
-            "alert_severity": alert_severity,
+            "components": {
+                "commit_activity": round(commit_score, 2),
+                "team_engagement": round(collab_score, 2),
+                "work_life_balance": round(work_life_score, 2),
+                "code_quality": round(quality_score, 2),
+            },
+        }
+
+    @staticmethod
+    def calculate_portfolio_effectiveness(
+        db: Session,
+        period_start: datetime,
+        period_end: datetime,
+        project_ids: Optional[List[int]] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Dict:
+        """
+        Рассчитать оценку эффективности для множества проектов.
+        Calculate effectiveness scores for many projects at once.
+        
+        Статистика коммитов (текущий и предыдущий периоды) и размеры команд
+        считаются одним GROUP BY project_id для всей страницы проектов,
+        вместо отдельного запроса на каждый проект.
+        Если project_ids не указан, берутся все проекты с пагинацией.
+        """
+        query = db.query(Project.id, Project.name)
+        if project_ids is not None:
+            query = query.filter(Project.id.in_(project_ids))
+        total_count = query.count()
+        projects = query.order_by(Project.id).offset(skip).limit(limit).all()
+        page_ids = [project_id for project_id, _ in projects]
+        
+        team_sizes = dict(db.query(
+            ProjectMember.project_id, func.count(ProjectMember.id)
+        ).filter(
+            ProjectMember.project_id.in_(page_ids)
+        ).group_by(ProjectMember.project_id).all()) if page_ids else {}
+        
+        previous_start = period_start - (period_end - period_start)
+        stats_by_project = CommitStatsService.bucket_totals_by_project(
+            db, page_ids, [previous_start, period_start, period_end]
+        )
+        
+        return {
+            "projects": [
+                ProjectEffectivenessService.score_effectiveness(
+                    project_id,
+                    project_name,
+                    stats_by_project[project_id][1],
+                    team_sizes.get(project_id, 0),
+                    period_start,
+                    period_end,
+                    previous_stats=stats_by_project[project_id][0]
+                )
+                for project_id, project_name in projects
+            ],
+            "total_count": total_count,
+            "skip": skip,
+            "limit": limit,
             "period_start": period_start,
             "period_end": period_end,
         }
@@ -292,33 +384,71 @@ class ProjectEffectivenessService:
         if not project:
             return None
         
-        member_ids = [member.id for member in project.members]
-        
-        # Получить все коммиты участников
-        commits = db.query(Commit).filter(
-            Commit.author_id.in_(member_ids),
-            Commit.committed_at.between(period_start, period_end)
-        ).all()
+        # Агрегировать коммиты участников
+        stats = CommitStatsService.period_totals(
+            db, project_id, period_start, period_end
+        )
+        care = ProjectEffectivenessService.score_employee_care(stats)
         
-        if not commits:
+        if not stats["total_commits"]:
             return {
                 "project_id": project_id,
                 "project_name": project.name,
-                "employee_care_score": 100.0,
-                "after_hours_percentage": 0.0,
-                "weekend_percentage": 0.0,
-                "status": "excellent",
+                **care,
                 "recommendations": [],
                 "period_start": period_start,
                 "period_end": period_end,
             }
         
-        total_commits = len(commits)
-        after_hours_commits = [c for c in commits if c.is_after_hours]
-        weekend_commits = [c for c in commits if c.is_weekend]
+        total_commits = stats["total_commits"]
+        after_hours_percentage = (stats["after_hours_commits"] / total_commits * 100)
+        weekend_percentage = (stats["weekend_commits"] / total_commits * 100)
+        
+        # Сформировать рекомендации
+        recommendations = []
+        if after_hours_percentage > 30:
+            recommendations.append("Критический уровень активности после рабочего времени. Необходимо пересмотреть планирование и нагрузку на команду.")
+        elif after_hours_percentage > 20:
+            recommendations.append("Высокий уровень активности после рабочего времени. Рекомендуется проверить распределение задач.")
+        elif after_hours_percentage > 10:
+            recommendations.append("Умеренная активность после рабочего времени. Следите за балансом работы и отдыха.")
+        
+        if weekend_percentage > 20:
+            recommendations.append("Критический уровень работы в выходные. Необходимо срочно пересмотреть процессы.")
+        elif weekend_percentage > 10:
+            recommendations.append("Высокая активность в выходные дни. Рассмотрите перераспределение нагрузки.")
+        elif weekend_percentage > 5:
+            recommendations.append("Есть работа в выходные. Убедитесь, что это не систематическая проблема.")
+        
+        if not recommendations:
+            recommendations.append("Отличный баланс работы и жизни! Продолжайте поддерживать здоровую рабочую культуру.")
+        
+        return {
+            "project_id": project_id,
+            "project_name": project.name,
+            **care,
+            "recommendations": recommendations,
+            "period_start": period_start,
+            "period_end": period_end,
+        }
+
+    @staticmethod
+    def score_employee_care(stats: Dict[str, int]) -> Dict:
+        """
+        Оценка заботы о сотрудниках по агрегированной статистике коммитов.
+        Score employee care (0-100, higher is better) from aggregated commit statistics.
+        """
+        total_commits = stats["total_commits"]
+        if not total_commits:
+            return {
+                "employee_care_score": 100.0,
+                "after_hours_percentage": 0.0,
+                "weekend_percentage": 0.0,
+                "status": "excellent",
+            }
         
-        after_hours_percentage = (len(after_hours_commits) / total_commits * 100)
-        weekend_percentage = (len(weekend_commits) / total_commits * 100)
+        after_hours_percentage = (stats["after_hours_commits"] / total_commits * 100)
+        weekend_percentage = (stats["weekend_commits"] / total_commits * 100)
         
         # Рассчитать оценку заботы о сотрудниках (0-100)
         # 100 - отлично (нет переработок), 0 - критично (постоянные переработки)
@@ -344,37 +474,42 @@ class ProjectEffectivenessService:
         else:
             status = "critical"
         
-        # Сформировать рекомендации
-        recommendations = []
-        if after_hours_percentage > 30:
-            recommendations.append("Критический уровень активности после рабочего времени. Необходимо пересмотреть планирование и нагрузку на команду.")
-        elif after_hours_percentage > 20:
-            recommendations.append("Высокий уровень активности после рабочего времени. Рекомендуется проверить распределение задач.")
-        elif after_hours_percentage > 10:
-            recommendations.append("Умеренная активность после рабочего времени. Следите за балансом работы и отдыха.")
-        
-        if weekend_percentage > 20:
-            recommendations.append("Критический уровень работы в выходные. Необходимо срочно пересмотреть процессы.")
-        elif weekend_percentage > 10:
-            recommendations.append("Высокая активность в выходные дни. Рассмотрите перераспределение нагрузки.")
-        elif weekend_percentage > 5:
-            recommendations.append("Есть работа в выходные. Убедитесь, что это не систематическая проблема.")
-        
-        if not recommendations:
-            recommendations.append("Отличный баланс работы и жизни! Продолжайте поддерживать здоровую рабочую культуру.")
-        
         return {
-            "project_id": project_id,
-            "project_name": project.name,
             "employee_care_score": round(care_score, 2),
             "after_hours_percentage": round(after_hours_percentage, 2),
             "weekend_percentage": round(weekend_percentage, 2),
             "status": status,
-            "recommendations": recommendations,
-            "period_start": period_start,
-            "period_end": period_end,
         }
 
+    @staticmethod
+    def build_project_metric(
+        project_id: int,
+        metric_type: str,
+        metric_data: Dict,
+        score: float,
+        trend: str,
+        period_start: datetime,
+        period_end: datetime,
+        has_alert: bool = False,
+        alert_message: str = None,
+        alert_severity: str = None
+    ) -> ProjectMetric:
+        """Создать (не сохраняя) снимок метрики проекта."""
+        return ProjectMetric(
+            project_id=project_id,
+            metric_type=metric_type,
+            metric_value=json.dumps(metric_data, default=str),
+            score=score,
+            trend=trend,
+            period_start=period_start,
+            period_end=period_end,
+            calculated_at=datetime.utcnow(),
+            has_alert=has_alert,
+            alert_message=alert_message,
+            alert_severity=alert_severity,
+            **MetricHistoryService.snapshot_key(period_start, period_end)
+        )
+
     @staticmethod
     def save_project_metric(
         db: Session,
@@ -389,11 +524,11 @@ class ProjectEffectivenessService:
         alert_message: str = None,
         alert_severity: str = None
     ) -> ProjectMetric:
-        """Сохранить метрику проекта в базу данных."""
-        metric = ProjectMetric(
+        """Сохранить метрику проекта в базу данных (заменяя снимок того же часа)."""
+        metric = ProjectEffectivenessService.build_project_metric(
             project_id=project_id,
             metric_type=metric_type,
-            metric_value=json.dumps(metric_data, default=str),
+            metric_data=metric_data,
             score=score,
             trend=trend,
             period_start=period_start,
@@ -402,7 +537,4 @@ class ProjectEffectivenessService:
             alert_message=alert_message,
             alert_severity=alert_severity
         )
-        db.add(metric)
-        db.commit()
-        db.refresh(metric)
-        return metric
+        return MetricHistoryService.save_snapshot(db, metric)
@@ -8,7 +8,9 @@ Service for analyzing project technical debt.
 from typing import Dict, List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from app.models.models import Project, ProjectMember, Commit, TechnicalDebtMetric
+from app.models.models import Project, TechnicalDebtMetric
+from app.services.metric_history_service import MetricHistoryService
+from app.services.commit_stats_service import CommitStatsService
 import json
 
 
@@ -33,18 +35,15 @@ class ProjectTechnicalDebtService:
         if not project:
             return None
         
-        member_ids = [member.id for member in project.members]
+        # Агрегировать коммиты участников проекта за период
+        stats = CommitStatsService.period_totals(db, project_id, period_start, period_end)
         
-        # Получить коммиты за период
-        commits = db.query(Commit).filter(
-            Commit.author_id.in_(member_ids),
-            Commit.committed_at.between(period_start, period_end)
-        ).all()
-        
-        if not commits:
+        if not stats["total_commits"]:
             return {
                 "project_id": project_id,
                 "todo_count": 0,
+                "todo_added": 0,
+                "todo_removed": 0,
                 "todo_trend": "stable",
                 "technical_debt_score": 0.0,
                 "recommendations": ["Нет коммитов за указанный период для анализа."],
@@ -52,30 +51,19 @@ class ProjectTechnicalDebtService:
                 "period_end": period_end,
             }
         
-        # Подсчитать TODO в коде из коммитов
-        todo_count = sum(c.todo_count for c in commits)
-        
-        # Определить тренд TODO
-        # Упрощенная логика: сравниваем с пороговыми значениями
-        if todo_count > 50:
-            todo_trend = "up"  # Растет
-        elif todo_count < 10:
-            todo_trend = "down"  # Снижается
-        else:
-            todo_trend = "stable"  # Стабильно
-        
-        # Рассчитать оценку технического долга (0-100, меньше лучше)
-        # Оценка основана ТОЛЬКО на количестве TODO
-        # 0 TODO = 0 баллов долга (отлично)
-        # 100 TODO = 50 баллов долга
-        # 200+ TODO = 100 баллов долга (критично)
-        technical_debt_score = min(100, (todo_count / 200) * 100)
+        score = ProjectTechnicalDebtService.score_technical_debt(stats)
+        todo_added = score["todo_added"]
+        todo_removed = score["todo_removed"]
+        todo_count = score["todo_count"]
+        todo_trend = score["todo_trend"]
         
         # Сформировать рекомендации
         recommendations = []
         
-        if todo_count == 0:
+        if todo_added == 0 and todo_removed == 0:
             recommendations.append("✓ Отлично! Нет TODO комментариев в коммитах.")
+        elif todo_count <= 0:
+            recommendations.append("✓ TODO удаляются не медленнее, чем добавляются.")
         elif todo_count <= 10:
             recommendations.append("✓ Низкий уровень TODO. Продолжайте в том же духе!")
         elif todo_count <= 30:
@@ -95,24 +83,56 @@ class ProjectTechnicalDebtService:
         
         return {
             "project_id": project_id,
-            "todo_count": todo_count,
-            "todo_trend": todo_trend,
-            "technical_debt_score": round(technical_debt_score, 2),
+            **score,
             "recommendations": recommendations,
             "period_start": period_start,
             "period_end": period_end,
         }
 
     @staticmethod
-    def save_technical_debt_metric(
-        db: Session,
+    def score_technical_debt(stats: Dict[str, int]) -> Dict:
+        """
+        Оценка технического долга по агрегированной статистике коммитов.
+        Score technical debt (0-100, lower is better) from aggregated commit statistics.
+        """
+        # Маркеры TODO/FIXME/HACK, добавленные и удалённые в diff коммитов за период;
+        # долг определяется чистым изменением
+        todo_added = stats["todo_count"]
+        todo_removed = stats["todo_removed"]
+        todo_count = todo_added - todo_removed
+        
+        # Определить тренд TODO по знаку чистого изменения
+        if todo_count > 0:
+            todo_trend = "up"  # Растет
+        elif todo_count < 0:
+            todo_trend = "down"  # Снижается
+        else:
+            todo_trend = "stable"  # Стабильно
+        
+        # Рассчитать оценку технического долга (0-100, меньше лучше)
+        # Оценка основана ТОЛЬКО на чистом приросте TODO
+        # 0 TODO (или больше удалено, чем добавлено) = 0 баллов долга (отлично)
+        # 100 TODO = 50 баллов долга
+        # 200+ TODO = 100 баллов долга (критично)
+        technical_debt_score = min(100, (max(todo_count, 0) / 200) * 100)
+        
+        return {
+            "todo_count": todo_count,
+            "todo_added": todo_added,
+            "todo_removed": todo_removed,
+            "todo_trend": todo_trend,
+            "technical_debt_score": round(technical_debt_score, 2),
+        }
+
+    @staticmethod
+    def build_technical_debt_metric(
         project_id: int,
         metrics: Dict,
         period_start: datetime,
         period_end: datetime
     ) -> TechnicalDebtMetric:
-        """Сохранить метрику технического долга в базу данных."""
-        metric = TechnicalDebtMetric(
+        """Создать (не сохраняя) снимок метрики технического долга."""
+        return TechnicalDebtMetric(
             project_id=project_id,
             test_coverage=None,  # Больше не используется в новом ТЗ
             test_coverage_trend=None,  # Больше не используется в новом ТЗ
@@ -121,9 +141,20 @@ class ProjectTechnicalDebtService:
             review_comment_density=None,  # Больше не используется в новом ТЗ
             measured_at=datetime.utcnow(),
             period_start=period_start,
-            period_end=period_end
+            period_end=period_end,
+            **MetricHistoryService.snapshot_key(period_start, period_end)
+        )
+
+    @staticmethod
+    def save_technical_debt_metric(
+        db: Session,
+        project_id: int,
+        metrics: Dict,
+        period_start: datetime,
+        period_end: datetime
+    ) -> TechnicalDebtMetric:
+        """Сохранить метрику технического долга в базу данных (заменяя снимок того же часа)."""
+        metric = ProjectTechnicalDebtService.build_technical_debt_metric(
+            project_id, metrics, period_start, period_end
         )
-        db.add(metric)
-        db.commit()
-        db.refresh(metric)
-        return metric
+        return MetricHistoryService.save_snapshot(db, metric)
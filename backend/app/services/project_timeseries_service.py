@@ -0,0 +1,142 @@
+"""
+Сервис временных рядов метрик проекта для графиков.
+Service for bucketed metric time series.
+
+Ряд из N интервалов (день, неделя с понедельника или календарный месяц)
+строится одним GROUP BY по номеру интервала (CommitStatsService.bucket_totals_by_project)
+вместо N отдельных расчётов за перекрывающиеся периоды. Значения в каждой
+точке считаются теми же функциями оценки, что и эндпоинты одного периода.
+Последний интервал - текущий, он заканчивается моментом запроса.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import Project, ProjectMember
+from app.services.commit_stats_service import CommitStatsService
+from app.services.metric_history_service import align_bucket
+from app.services.project_effectiveness_service import ProjectEffectivenessService
+from app.services.project_technical_debt_service import ProjectTechnicalDebtService
+
+
+TIMESERIES_METRICS = ("effectiveness", "employee_care", "technical_debt", "active_contributors", "commits")
+TIMESERIES_BUCKETS = ("day", "week", "month")
+
+
+def _bucket_start(moment: datetime, bucket: str) -> datetime:
+    """Начало интервала (дня, недели с понедельника или месяца), содержащего момент."""
+    if bucket == "day":
+        return align_bucket(moment, "daily")
+    if bucket == "week":
+        return align_bucket(moment, "weekly")
+    if bucket == "month":
+        return align_bucket(moment, "daily").replace(day=1)
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+
+def _previous_start(start: datetime, bucket: str) -> datetime:
+    """Начало интервала, предшествующего интервалу, начинающемуся в start."""
+    if bucket == "day":
+        return start - timedelta(days=1)
+    if bucket == "week":
+        return start - timedelta(days=7)
+    return (start - timedelta(days=1)).replace(day=1)
+
+
+def bucket_boundaries(bucket: str, periods: int, now: datetime) -> List[datetime]:
+    """Границы periods последовательных интервалов; последний заканчивается в now."""
+    starts = [_bucket_start(now, bucket)]
+    for _ in range(periods - 1):
+        starts.append(_previous_start(starts[-1], bucket))
+    return starts[::-1] + [now]
+
+
+def _point_value(metric: str, stats: Dict[str, int], team_size: int) -> Dict:
+    """Значение метрики и её компоненты для статистики одного интервала."""
+    if metric == "effectiveness":
+        window = ProjectEffectivenessService.score_window(stats, team_size)
+        return {"value": window["effectiveness_score"], "components": window["components"]}
+    if metric == "employee_care":
+        care = ProjectEffectivenessService.score_employee_care(stats)
+        return {
+            "value": care["employee_care_score"],
+            "components": {
+                "after_hours_percentage": care["after_hours_percentage"],
+                "weekend_percentage": care["weekend_percentage"],
+            },
+        }
+    if metric == "technical_debt":
+        debt = ProjectTechnicalDebtService.score_technical_debt(stats)
+        return {
+            "value": debt["technical_debt_score"],
+            "components": {
+                "todo_count": float(debt["todo_count"]),
+                "todo_added": float(debt["todo_added"]),
+                "todo_removed": float(debt["todo_removed"]),
+            },
+        }
+    if metric == "active_contributors":
+        contributors = stats["active_contributors"]
+        return {
+            "value": float(contributors),
+            "components": {
+                "avg_commits_per_contributor": round(stats["total_commits"] / contributors, 2) if contributors else 0.0,
+            },
+        }
+    if metric == "commits":
+        return {
+            "value": float(stats["total_commits"]),
+            "components": {
+                "insertions": float(stats["insertions"]),
+                "deletions": float(stats["deletions"]),
+            },
+        }
+    raise ValueError(f"Unknown metric: {metric}")
+
+
+class ProjectTimeseriesService:
+    """Сервис для расчёта метрик проекта по последовательным интервалам."""
+
+    @staticmethod
+    def calculate_timeseries(
+        db: Session,
+        project_id: int,
+        metric: str,
+        bucket: str,
+        periods: int,
+        now: Optional[datetime] = None
+    ) -> Optional[Dict]:
+        """
+        Рассчитать временной ряд метрики проекта.
+        Calculate a metric for each of the last `periods` buckets with one aggregate query.
+        """
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return None
+        
+        # Размер команды проекта (как в расчёте эффективности за период)
+        team_size = db.query(func.count(ProjectMember.id)).filter(
+            ProjectMember.project_id == project_id
+        ).scalar() or 0
+        
+        boundaries = bucket_boundaries(bucket, periods, now or datetime.utcnow())
+        stats_by_bucket = CommitStatsService.bucket_totals_by_project(
+            db, [project_id], boundaries
+        )[project_id]
+        
+        return {
+            "project_id": project_id,
+            "project_name": project.name,
+            "metric": metric,
+            "bucket": bucket,
+            "points": [
+                {
+                    "period_start": boundaries[i],
+                    "period_end": boundaries[i + 1],
+                    "total_commits": stats["total_commits"],
+                    "active_contributors": stats["active_contributors"],
+                    **_point_value(metric, stats, team_size),
+                }
+                for i, stats in enumerate(stats_by_bucket)
+            ],
+        }
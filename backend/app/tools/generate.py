@@ -0,0 +1,454 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+Reproducible synthetic dataset generator for load testing.
+
+Генерирует проекты, участников, коммиты, PR, ревью и задачи с реалистичными
+распределениями:
+- размер проектов и активность авторов подчиняются степенному закону (Zipf);
+- время коммитов и PR следует суточному и недельному ритму;
+- переписывание кода (churn) сосредоточено во всплесках по несколько дней;
+- длительности этапов PR, ревью и задач распределены логнормально.
+
+Генерация векторизована (NumPy), запись выполняется пачками executemany
+(генератор рассчитан на SQLite, как и DATABASE_URL по умолчанию).
+Одинаковые --seed и --end-date дают одинаковый набор данных.
+
+Пример:
+    python -m app.tools.generate --projects 1000 --commits 10_000_000 --seed 42
+"""
+import argparse
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = None
+
+from app.core.config import settings
+from app.db.migrations import run_migrations
+from app.db.session import Base
+from app.models.models import CodeReview, Commit, Project, ProjectMember, PullRequest, Task
+from app.services.commit_stats_service import CommitStatsService
+
+
+# Относительная активность по часам суток (UTC) и дням недели (пн..вс)
+HOUR_WEIGHTS = (
+    0.5, 0.3, 0.2, 0.15, 0.15, 0.2, 0.4, 0.9, 2.0, 4.5, 6.5, 7.0,
+    5.5, 5.0, 6.5, 7.0, 6.5, 5.5, 4.0, 2.5, 1.8, 1.5, 1.2, 0.8,
+)
+WEEKDAY_WEIGHTS = (1.0, 1.05, 1.0, 0.95, 0.8, 0.12, 0.08)
+
+MESSAGE_VERBS = ("Fix", "Add", "Refactor", "Update", "Remove", "Optimize", "Document", "Test")
+MESSAGE_AREAS = (
+    "authentication", "API handlers", "database layer", "metrics", "UI components",
+    "build pipeline", "caching", "error handling", "configuration", "dependencies",
+)
+ROLES = ("Developer", "Developer", "Developer", "Senior Developer", "Tech Lead", "QA Engineer")
+TASK_PRIORITIES = ("low", "medium", "high", "critical")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise SystemExit(
+            "Для генератора нужен NumPy: pip install -r requirements-dev.txt"
+        )
+
+
+@dataclass
+class GeneratorConfig:
+    """Параметры генерации набора данных."""
+    projects: int = 10
+    commits: int = 100_000
+    seed: int = 42
+    days: int = 365
+    end_date: date = field(default_factory=lambda: datetime.utcnow().date())
+    mean_team_size: float = 8.0
+    commits_per_pr: float = 8.0
+    commits_per_task: float = 5.0
+    project_skew: float = 1.1  # Показатель Zipf для размеров проектов
+    author_skew: float = 1.2  # Показатель Zipf для активности авторов
+    batch_size: int = 5000
+
+
+def _to_list(values, start: int, end: int) -> list:
+    """
+    Срез значений колонки в виде списка значений DB-API (NaN/NaT → None).
+
+    Даты передаются строками в формате хранения DateTime SQLAlchemy для SQLite,
+    чтобы не тратить время на обработку параметров по строкам.
+    """
+    if not isinstance(values, np.ndarray):
+        return [values] * (end - start)
+    chunk = values[start:end]
+    if chunk.dtype.kind == "M":
+        text = np.char.replace(np.datetime_as_string(chunk, unit="us"), "T", " ").astype(object)
+        text[np.isnat(chunk)] = None
+        return text.tolist()
+    if chunk.dtype.kind == "f":
+        return [None if v != v else v for v in chunk.tolist()]
+    return chunk.tolist()
+
+
+class DatasetGenerator:
+    """Генератор синтетического набора данных в базу по engine."""
+
+    def __init__(self, config: GeneratorConfig, engine: Engine):
+        _require_numpy()
+        self.config = config
+        self.engine = engine
+        self.rng = np.random.default_rng(config.seed)
+        self.end = datetime.combine(config.end_date, datetime.min.time())
+        self.start = self.end - timedelta(days=config.days)
+        self.end64 = np.datetime64(self.end, "s")
+        self.start64 = np.datetime64(self.start, "s")
+
+        weekdays = (self.start.weekday() + np.arange(config.days)) % 7
+        day_weights = np.asarray(WEEKDAY_WEIGHTS)[weekdays]
+        self.day_p = day_weights / day_weights.sum()
+        hour_weights = np.asarray(HOUR_WEIGHTS)
+        self.hour_p = hour_weights / hour_weights.sum()
+
+        self.counts = {"projects": 0, "members": 0, "commits": 0,
+                       "pull_requests": 0, "reviews": 0, "tasks": 0}
+        self._next_id: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------ helpers
+
+    def _zipf_weights(self, n: int, exponent: float) -> "np.ndarray":
+        """Веса степенного распределения в случайном порядке."""
+        weights = 1.0 / np.arange(1, n + 1) ** exponent
+        return self.rng.permutation(weights / weights.sum())
+
+    def _timestamps(self, n: int):
+        """Моменты времени с недельным и суточным ритмом (и индексы дней)."""
+        days = self.rng.choice(self.config.days, size=n, p=self.day_p)
+        hours = self.rng.choice(24, size=n, p=self.hour_p)
+        seconds = days * 86400 + hours * 3600 + self.rng.integers(0, 3600, size=n)
+        return self.start64 + seconds.astype("timedelta64[s]"), days
+
+    @staticmethod
+    def _add_hours(moments, hours):
+        return moments + np.round(hours * 3600).astype("timedelta64[s]")
+
+    def _allocate_ids(self, table, count: int) -> "np.ndarray":
+        """Выделить диапазон явных ID (нужны для связей PR → ревью без RETURNING)."""
+        first = self._next_id[table.name]
+        self._next_id[table.name] = first + count
+        return np.arange(first, first + count)
+
+    def _insert(self, conn: Connection, table, columns: Dict[str, object], count: int) -> None:
+        """Записать колонки пачками executemany напрямую через DB-API."""
+        names = list(columns)
+        sql = (
+            f"INSERT INTO {table.name} ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+        for start in range(0, count, self.config.batch_size):
+            end = min(start + self.config.batch_size, count)
+            values = [_to_list(columns[name], start, end) for name in names]
+            conn.exec_driver_sql(sql, list(zip(*values)))
+
+    # --------------------------------------------------------------- generation
+
+    def run(self) -> Dict[str, int]:
+        """Сгенерировать и записать весь набор данных."""
+        config = self.config
+        prefix = f"synthetic-{config.seed}-"
+        with self.engine.connect() as conn:
+            if conn.execute(select(Project.id).where(
+                Project.external_id.like(f"{prefix}%")
+            ).limit(1)).first():
+                raise SystemExit(f"Набор данных с seed={config.seed} уже есть в базе")
+            for model in (Project, ProjectMember, Commit, PullRequest, CodeReview, Task):
+                table = model.__table__
+                self._next_id[table.name] = (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+        project_commits = self.rng.multinomial(config.commits, self._zipf_weights(config.projects, config.project_skew))
+        # Большие проекты - большие команды (с разбросом)
+        relative_size = project_commits / max(project_commits.mean(), 1)
+        team_sizes = np.clip(np.round(
+            config.mean_team_size * relative_size ** 0.35 * self.rng.lognormal(0, 0.3, config.projects)
+        ), 2, 500).astype(int)
+
+        for index in range(config.projects):
+            with self.engine.begin() as conn:
+                self._generate_project(conn, prefix, index, int(project_commits[index]), int(team_sizes[index]))
+
+        # Дневная сводка пересчитывается одним INSERT ... SELECT
+        with Session(bind=self.engine) as db:
+            CommitStatsService.rebuild(db)
+            db.commit()
+        return self.counts
+
+    def _generate_project(self, conn: Connection, prefix: str, index: int, n_commits: int, team_size: int) -> None:
+        project_id = int(self._allocate_ids(Project.__table__, 1)[0])
+        conn.execute(Project.__table__.insert(), [{
+            "id": project_id,
+            "external_id": f"{prefix}{index:05d}",
+            "name": f"Synthetic Project {index + 1}",
+            "description": f"Synthetic load-test project (seed {self.config.seed})",
+            "created_at": self.start,
+            "updated_at": self.end,
+        }])
+
+        member_ids = self._allocate_ids(ProjectMember.__table__, team_size)
+        emails = np.array([f"dev{j}.p{index}@synthetic.example" for j in range(team_size)], dtype=object)
+        names = np.array([f"Developer {j + 1} (P{index + 1})" for j in range(team_size)], dtype=object)
+        self._insert(conn, ProjectMember.__table__, {
+            "id": member_ids,
+            "project_id": project_id,
+            "external_id": np.array([f"{prefix}{index:05d}-u{j}" for j in range(team_size)], dtype=object),
+            "email": emails,
+            "name": names,
+            "role": np.asarray(ROLES, dtype=object)[self.rng.integers(0, len(ROLES), team_size)],
+            "joined_at": self.start64,
+        }, team_size)
+        author_p = self._zipf_weights(team_size, self.config.author_skew)
+
+        self._generate_commits(conn, index, project_id, n_commits, member_ids, emails, names, author_p)
+        pr_ids, pr_authors, pr_first_review, pr_cycles, pr_merged = self._generate_pull_requests(
+            conn, prefix, index, project_id, n_commits, member_ids, author_p
+        )
+        self._generate_reviews(conn, prefix, index, pr_ids, pr_authors, pr_first_review, pr_cycles, pr_merged, member_ids)
+        self._generate_tasks(conn, prefix, index, project_id, n_commits, member_ids, author_p)
+
+        self.counts["projects"] += 1
+        self.counts["members"] += team_size
+
+    def _generate_commits(self, conn, index, project_id, n, member_ids, emails, names, author_p) -> None:
+        rng = self.rng
+        committed_at, day_index = self._timestamps(n)
+        order = np.argsort(committed_at, kind="stable")
+        committed_at, day_index = committed_at[order], day_index[order]
+        authors = rng.choice(len(member_ids), size=n, p=author_p)
+
+        hour = (committed_at - committed_at.astype("datetime64[D]")).astype("timedelta64[h]").astype(int)
+        weekday = (committed_at.astype("datetime64[D]").astype(int) + 3) % 7  # 1970-01-01 - четверг
+
+        # Всплески churn: несколько окон по 3-10 дней с повышенной долей переписывания
+        burst_days = np.zeros(self.config.days, dtype=bool)
+        bursts = rng.poisson(self.config.days / 60) + 1
+        for start, length in zip(
+            rng.integers(0, self.config.days, bursts), rng.integers(3, 11, bursts)
+        ):
+            burst_days[start:start + length] = True
+        is_churn = rng.random(n) < np.where(burst_days[day_index], 0.45, 0.08)
+
+        insertions = np.minimum(rng.lognormal(3.5, 1.2, n).astype(int) + 1, 5000)
+        has_tests = rng.random(n) < 0.55
+        messages = np.char.add(
+            np.char.add(np.asarray(MESSAGE_VERBS)[rng.integers(0, len(MESSAGE_VERBS), n)], " "),
+            np.asarray(MESSAGE_AREAS)[rng.integers(0, len(MESSAGE_AREAS), n)]
+        ).astype(object)
+
+        self._insert(conn, Commit.__table__, {
+            "id": self._allocate_ids(Commit.__table__, n),
+            "external_id": np.array([
+                f"{self.config.seed:08x}{index:08x}{i:024x}" for i in range(n)
+            ], dtype=object),
+            "project_id": project_id,
+            "author_id": member_ids[authors],
+            "message": messages,
+            "author_email": emails[authors],
+            "author_name": names[authors],
+            "committed_at": committed_at,
+            "files_changed": np.minimum(rng.geometric(0.35, n), 100),
+            "insertions": insertions,
+            "deletions": (insertions * rng.beta(2, 3, n)).astype(int),
+            "has_tests": has_tests,
+            "test_coverage_delta": np.round(
+                np.where(has_tests, rng.normal(1.5, 1.5, n), rng.normal(-1.0, 1.0, n)), 2
+            ),
+            "todo_count": rng.poisson(0.25, n),
+            "todo_removed": rng.poisson(0.2, n),
+            "is_churn": is_churn,
+            "churn_days": np.where(is_churn, rng.integers(1, 8, n), np.nan),
+            "is_after_hours": (hour < 9) | (hour > 18),
+            "is_weekend": weekday >= 5,
+        }, n)
+        self.counts["commits"] += n
+
+    def _generate_pull_requests(self, conn, prefix, index, project_id, n_commits, member_ids, author_p):
+        rng = self.rng
+        n = int(rng.poisson(n_commits / self.config.commits_per_pr))
+        created_at, _ = self._timestamps(n)
+        authors = rng.choice(len(member_ids), size=n, p=author_p)
+        first_review = rng.lognormal(np.log(6), 1.0, n)
+        time_to_merge = first_review + rng.lognormal(np.log(18), 1.0, n)
+        cycles = 1 + rng.poisson(0.7, n)
+
+        finished_at = self._add_hours(created_at, time_to_merge)
+        reviewed = self._add_hours(created_at, first_review) <= self.end64
+        outcome = rng.random(n)
+        finished = finished_at <= self.end64
+        merged = finished & (outcome < 0.8)
+        closed = finished & ~merged & (outcome < 0.9)
+        state = np.where(merged, "merged", np.where(closed, "closed", "open")).astype(object)
+        nat = np.datetime64("NaT", "s")
+        updated_at = np.where(
+            merged | closed, finished_at,
+            np.minimum(self._add_hours(created_at, first_review), self.end64)
+        )
+        lines_added = rng.lognormal(4.5, 1.1, n).astype(int) + 1
+
+        ids = self._allocate_ids(PullRequest.__table__, n)
+        self._insert(conn, PullRequest.__table__, {
+            "id": ids,
+            "external_id": np.array([f"{prefix}{index:05d}-pr{i}" for i in range(n)], dtype=object),
+            "project_id": project_id,
+            "author_id": member_ids[authors],
+            "title": np.array([f"PR #{i + 1}" for i in range(n)], dtype=object),
+            "description": None,
+            "state": state,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "merged_at": np.where(merged, finished_at, nat),
+            "closed_at": np.where(closed, finished_at, nat),
+            "time_to_first_review": np.where(reviewed, np.round(first_review, 2), np.nan),
+            "time_to_merge": np.where(merged, np.round(time_to_merge, 2), np.nan),
+            "review_cycles": np.where(reviewed, cycles, 0),
+            "lines_added": lines_added,
+            "lines_deleted": (lines_added * rng.beta(2, 4, n)).astype(int),
+            "files_changed": np.minimum(rng.geometric(0.15, n), 200),
+        }, n)
+        self.counts["pull_requests"] += n
+        first_review_at = np.where(reviewed, self._add_hours(created_at, first_review), nat)
+        return ids, authors, first_review_at, np.where(reviewed, cycles, 0), merged
+
+    def _generate_reviews(self, conn, prefix, index, pr_ids, pr_authors, first_review_at, cycles, merged, member_ids) -> None:
+        rng = self.rng
+        pr_index = np.repeat(np.arange(len(pr_ids)), cycles)
+        n = len(pr_index)
+        if n == 0:
+            return
+        # Номер ревью внутри PR и накопленные интервалы между циклами
+        group_start = np.repeat(np.cumsum(cycles) - cycles, cycles)
+        position = np.arange(n) - group_start
+        gaps = np.where(position == 0, 0.0, rng.lognormal(np.log(8), 0.8, n))
+        cumulative = np.cumsum(gaps)
+        offsets = cumulative - cumulative[group_start]
+        created_at = self._add_hours(first_review_at[pr_index], offsets)
+        keep = created_at <= self.end64
+        pr_index, position, created_at = pr_index[keep], position[keep], created_at[keep]
+        n = len(pr_index)
+
+        team_size = len(member_ids)
+        reviewers = (pr_authors[pr_index] + 1 + rng.integers(0, max(team_size - 1, 1), n)) % team_size
+        last = position == cycles[pr_index] - 1
+        state = np.where(
+            last & merged[pr_index], "approved",
+            np.where(rng.random(n) < 0.6, "changes_requested", "commented")
+        ).astype(object)
+        comments = rng.poisson(3, n)
+
+        self._insert(conn, CodeReview.__table__, {
+            "id": self._allocate_ids(CodeReview.__table__, n),
+            "external_id": np.array([
+                f"{prefix}{index:05d}-r{p}-{c}" for p, c in zip(pr_index.tolist(), position.tolist())
+            ], dtype=object),
+            "pull_request_id": pr_ids[pr_index],
+            "reviewer_id": member_ids[reviewers],
+            "state": state,
+            "created_at": created_at,
+            "comments_count": comments,
+            "critical_comments": rng.binomial(comments, 0.15),
+            "todo_comments": rng.poisson(0.2, n),
+        }, n)
+        self.counts["reviews"] += n
+
+    def _generate_tasks(self, conn, prefix, index, project_id, n_commits, member_ids, author_p) -> None:
+        rng = self.rng
+        n = int(rng.poisson(n_commits / self.config.commits_per_task))
+        created_at, _ = self._timestamps(n)
+        stages = {
+            "time_in_todo": rng.lognormal(np.log(24), 1.0, n),
+            "time_in_development": rng.lognormal(np.log(40), 0.8, n),
+            "time_in_review": rng.lognormal(np.log(16), 1.1, n),  # Длинный хвост - узкое место
+            "time_in_testing": rng.lognormal(np.log(8), 0.9, n),
+        }
+        # Моменты окончания этапов
+        stage_end = np.cumsum(np.vstack(list(stages.values())), axis=0)
+        reached = self._add_hours(created_at[None, :], stage_end) <= self.end64
+        started = reached[0]
+        state = np.select(
+            [reached[3], reached[1], started],
+            ["done", "in_review", "in_progress"],
+            default="todo"
+        ).astype(object)
+        nat = np.datetime64("NaT", "s")
+
+        columns = {
+            "id": self._allocate_ids(Task.__table__, n),
+            "external_id": np.array([f"{prefix}{index:05d}-t{i}" for i in range(n)], dtype=object),
+            "project_id": project_id,
+            "assignee_id": member_ids[rng.choice(len(member_ids), size=n, p=author_p)],
+            "title": np.array([f"Task #{i + 1}" for i in range(n)], dtype=object),
+            "description": None,
+            "state": state,
+            "priority": np.asarray(TASK_PRIORITIES, dtype=object)[
+                rng.choice(len(TASK_PRIORITIES), size=n, p=(0.2, 0.45, 0.25, 0.1))
+            ],
+            "created_at": created_at,
+            "started_at": np.where(started, self._add_hours(created_at, stage_end[0]), nat),
+            "completed_at": np.where(reached[3], self._add_hours(created_at, stage_end[3]), nat),
+        }
+        # Длительность этапа известна только для пройденных этапов
+        for stage, (name, hours) in enumerate(stages.items()):
+            columns[name] = np.where(reached[stage], np.round(hours, 2), np.nan)
+        self._insert(conn, Task.__table__, columns, n)
+        self.counts["tasks"] += n
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate a reproducible synthetic Git-Komet dataset for load testing."
+    )
+    parser.add_argument("--projects", type=int, default=10, help="number of projects")
+    parser.add_argument("--commits", type=int, default=100_000, help="total number of commits")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--days", type=int, default=365, help="history length in days")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None,
+                        help="last day of history, YYYY-MM-DD (default: today, UTC)")
+    parser.add_argument("--team-size", type=float, default=8.0, help="mean team size")
+    parser.add_argument("--commits-per-pr", type=float, default=8.0)
+    parser.add_argument("--commits-per-task", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT batch")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    config = GeneratorConfig(
+        projects=args.projects,
+        commits=args.commits,
+        seed=args.seed,
+        days=args.days,
+        mean_team_size=args.team_size,
+        commits_per_pr=args.commits_per_pr,
+        commits_per_task=args.commits_per_task,
+        batch_size=args.batch_size,
+    )
+    if args.end_date:
+        config.end_date = args.end_date
+
+    engine = create_engine(args.database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    print(f"Generating {config.commits} commits in {config.projects} projects "
+          f"(seed={config.seed}, end date={config.end_date.isoformat()})...")
+    started = time.perf_counter()
+    counts = DatasetGenerator(config, engine).run()
+    elapsed = time.perf_counter() - started
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+    print(f"Done in {elapsed:.1f}s ({counts['commits'] / max(elapsed, 1e-9):.0f} commits/s)")
+
+
+if __name__ == "__main__":
+    main()
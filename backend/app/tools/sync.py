@@ -0,0 +1,69 @@
+"""
+Синхронизация локальных Git-репозиториев проектов.
+Sync the local git clones of all projects in parallel.
+
+Пример:
+    python -m app.tools.sync --workers 8
+    python -m app.tools.sync --project-id 3 --project-id 7
+"""
+import argparse
+import sys
+import time
+from typing import Optional, Sequence
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.migrations import run_migrations
+from app.db.session import Base
+from app.services.ingestion_coordinator import IngestionCoordinator, RepositorySyncResult
+
+
+def _print_progress(result: RepositorySyncResult) -> None:
+    line = (f"  [{result.status:>10}] #{result.project_id} {result.name}: "
+            f"{result.commits_inserted}/{result.commits_parsed} commits, "
+            f"parse {result.parse_seconds:.1f}s, write {result.write_seconds:.1f}s")
+    if result.error:
+        line += f" - {result.error}"
+    print(line, flush=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sync project git repositories into Git-Komet.")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_MAX_WORKERS,
+                        help="number of parser processes")
+    parser.add_argument("--project-id", type=int, action="append", dest="project_ids",
+                        help="sync only this project (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_INGEST_BATCH_SIZE,
+                        help="commits per parsed batch and INSERT")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    coordinator = IngestionCoordinator(
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        max_workers=args.workers,
+        chunk_size=args.batch_size,
+        progress=_print_progress,
+    )
+    print(f"Syncing repositories with {args.workers} workers...")
+    started = time.perf_counter()
+    results = coordinator.run(args.project_ids)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if r.status == "failed"]
+    print(f"Done in {elapsed:.1f}s: {len(results)} repositories, "
+          f"{sum(r.status == 'ok' for r in results)} synced, "
+          f"{sum(r.status == 'up_to_date' for r in results)} up to date, {len(failed)} failed, "
+          f"{sum(r.commits_inserted for r in results)} commits inserted")
+    for result in failed:
+        print(f"  failed #{result.project_id} {result.name}: {result.error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Запуск бенчмарков и сравнение с сохранёнными базовыми результатами.
+Run the benchmark matrix and fail on regressions against JSON baselines.
+
+Примеры:
+    python -m benchmarks.run --scales 1k-10p
+    python -m benchmarks.run --scales 100k-10p,100k-1000p --update-baseline
+    python -m benchmarks.run --scales all --threshold 0.2
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.suite import SCALES, run_suite
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Абсолютные допуски, чтобы шум на быстрых случаях не считался регрессией
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 64.0
+
+
+def compare(
+    baseline: Dict,
+    current: Dict,
+    threshold: float,
+    memory_threshold: Optional[float] = None
+) -> List[str]:
+    """
+    Сравнить результаты прогона с базовыми.
+
+    Регрессия фиксируется, если p95 или пиковая память выросли больше чем
+    на threshold (доля) и на абсолютный допуск, либо выросло число SQL-запросов
+    (число запросов детерминировано, поэтому допуска нет).
+
+    Returns:
+        Список описаний регрессий (пустой, если регрессий нет).
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    regressions = []
+    for name, base in baseline.get("cases", {}).items():
+        result = current.get("cases", {}).get(name)
+        if result is None:
+            continue
+        if (result["p95_ms"] > base["p95_ms"] * (1 + threshold)
+                and result["p95_ms"] - base["p95_ms"] > MIN_LATENCY_DELTA_MS):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms"
+            )
+        if result["queries"] > base["queries"]:
+            regressions.append(
+                f"{name}: queries {base['queries']} -> {result['queries']}"
+            )
+        if (result["peak_kb"] > base["peak_kb"] * (1 + memory_threshold)
+                and result["peak_kb"] - base["peak_kb"] > MIN_MEMORY_DELTA_KB):
+            regressions.append(
+                f"{name}: peak memory {base['peak_kb']:.1f} -> {result['peak_kb']:.1f} KB"
+            )
+    return regressions
+
+
+def _parse_scales(value: str) -> List[str]:
+    if value == "all":
+        return list(SCALES)
+    scales = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in scales if name not in SCALES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown scale(s): {', '.join(unknown)}; available: {', '.join(SCALES)}"
+        )
+    return scales
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Git-Komet endpoints and services")
+    parser.add_argument("--scales", type=_parse_scales, default=["1k-10p"],
+                        help=f"comma-separated scales or 'all' ({', '.join(SCALES)})")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative p95 growth before failing (0.25 = +25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="allowed relative peak memory growth (defaults to --threshold)")
+    parser.add_argument("--baseline-dir", type=Path, default=BASELINE_DIR)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for scale_name in args.scales:
+        print(f"[{scale_name}]")
+        result = run_suite(scale_name, args.seed, args.repeat, args.only)
+        result["recorded_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        result["python"] = platform.python_version()
+        result["machine"] = platform.machine()
+
+        baseline_path = args.baseline_dir / f"{scale_name}.json"
+        if args.update_baseline:
+            args.baseline_dir.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+            print(f"  baseline written to {baseline_path}")
+            continue
+        if not baseline_path.exists():
+            print(f"  no baseline at {baseline_path}; run with --update-baseline to record one")
+            continue
+
+        regressions = compare(
+            json.loads(baseline_path.read_text()), result, args.threshold, args.memory_threshold
+        )
+        for regression in regressions:
+            print(f"  REGRESSION {regression}")
+        if regressions:
+            failed = True
+        else:
+            print("  no regressions")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
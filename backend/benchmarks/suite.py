@@ -0,0 +1,332 @@
+"""
+Набор бенчмарков эндпоинтов и сервисов Git-Komet.
+Benchmark cases for the API endpoints and service methods.
+
+Каждый случай выполняется на синтетическом наборе данных заданного масштаба
+(см. SCALES; данные строит app.tools.generate и кэшируются на диске).
+Для каждого случая измеряются p50/p95 задержки, число SQL-запросов
+на вызов и пиковая память Python (tracemalloc, отдельный прогон).
+"""
+import itertools
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core.cache import metrics_cache
+from app.db.migrations import run_migrations
+from app.db.session import Base, get_async_read_db, get_db, get_read_db
+from app.main import app
+from app.models.models import Commit, Project
+from app.services.bulk_ingest_service import BulkIngestService
+from app.services.commit_export_service import CommitExportService
+from app.services.commit_stats_service import CommitStatsService
+from app.services.metric_snapshot_writer import snapshot_writer
+from app.services.project_bottleneck_service import ProjectBottleneckService
+from app.services.project_effectiveness_service import ProjectEffectivenessService
+from app.services.project_technical_debt_service import ProjectTechnicalDebtService
+from app.tools.generate import DatasetGenerator, GeneratorConfig
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Масштаб набора данных."""
+    commits: int
+    projects: int
+
+
+# Матрица масштабов: 1k / 100k / 1M коммитов × 10 / 1000 проектов
+SCALES: Dict[str, Scale] = {
+    f"{commits_label}-{projects}p": Scale(commits, projects)
+    for (commits_label, commits), projects in itertools.product(
+        (("1k", 1_000), ("100k", 100_000), ("1m", 1_000_000)), (10, 1000)
+    )
+}
+
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+
+
+@dataclass
+class BenchmarkCase:
+    """Один измеряемый вызов."""
+    name: str
+    run: Callable[[], object]
+    # Вызывается после каждого измерения (вне замера), например для сброса состояния
+    after: Optional[Callable[[], None]] = None
+
+
+def build_dataset(scale_name: str, seed: int, end_date: date) -> Path:
+    """
+    Построить (или переиспользовать) базу для масштаба.
+
+    Дата окончания истории входит в имя файла: эндпоинты считают периоды
+    от текущего момента, поэтому база пересоздаётся при смене дня.
+    К сохранённой базе применяются миграции, чтобы она соответствовала
+    текущей схеме после изменения моделей.
+    """
+    scale = SCALES[scale_name]
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"{scale_name}-seed{seed}-{end_date.isoformat()}.db"
+    if path.exists():
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        engine.dispose()
+        return path
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{tmp_path}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    DatasetGenerator(
+        GeneratorConfig(projects=scale.projects, commits=scale.commits, seed=seed, end_date=end_date),
+        engine
+    ).run()
+    engine.dispose()
+    tmp_path.rename(path)
+    return path
+
+
+class QueryCounter:
+    """Счётчик SQL-запросов, выполненных через engine (синхронные и асинхронные)."""
+
+    def __init__(self, *engines: Engine):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def measure(case: BenchmarkCase, counter: QueryCounter, repeat: int, warmup: int = 1) -> Dict:
+    """Измерить задержку, число запросов и пиковую память одного случая."""
+    for _ in range(warmup):
+        case.run()
+        if case.after:
+            case.after()
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        before = counter.count
+        started = time.perf_counter()
+        case.run()
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count - before)
+        if case.after:
+            case.after()
+
+    # tracemalloc замедляет выполнение, поэтому память меряется отдельным прогоном
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if case.after:
+        case.after()
+
+    timings.sort()
+    queries.sort()
+    return {
+        "p50_ms": round(_percentile(timings, 0.50), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "queries": queries[len(queries) // 2],
+        "peak_kb": round(peak / 1024, 1),
+        "repeat": repeat,
+    }
+
+
+def build_cases(session_factory: sessionmaker, project_id: int, project_ids: List[int]) -> List[BenchmarkCase]:
+    """Случаи для всех эндпоинтов metrics.py, repositories.py и export.py и методов сервисов."""
+    client = TestClient(app)
+    api = "/api/v1"
+    period_end = datetime.utcnow()
+    month = period_end - timedelta(days=30)
+    year = period_end - timedelta(days=365)
+    ids_param = ",".join(str(pid) for pid in project_ids[:50])
+
+    def get(url: str) -> Callable[[], object]:
+        def run():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url}: {response.status_code}"
+            return response
+        return run
+
+    def service(method: Callable, *args, **kwargs) -> Callable[[], object]:
+        def run():
+            db = session_factory()
+            try:
+                return method(db, *args, **kwargs)
+            finally:
+                db.close()
+        return run
+
+    created: List[int] = []
+
+    def create_project():
+        response = client.post(f"{api}/projects/", json={
+            "name": "Benchmark project",
+            "external_id": f"benchmark-{time.perf_counter_ns()}",
+        })
+        created.append(response.json()["id"])
+
+    def delete_project():
+        if not created:
+            create_project()
+        response = client.delete(f"{api}/projects/{created.pop()}")
+        assert response.status_code == 200
+
+    ingest_counter = itertools.count()
+
+    def ingest_commits():
+        batch = next(ingest_counter)
+        lines = [
+            (
+                f'{{"external_id": "benchmark-{time.time_ns()}-{batch}-{i}", "message": "bench", '
+                f'"author_email": "dev{i % 5}@bench.example", "author_name": "Bench", '
+                f'"committed_at": "{period_end.isoformat()}"}}'
+            )
+            for i in range(1000)
+        ]
+        return service(BulkIngestService.ingest_batch, project_id, "commits", lines)()
+
+    # Снимки метрик пишутся в базу бенчмарка вне замера
+    flush_snapshots = snapshot_writer.flush
+
+    return [
+        # metrics.py
+        BenchmarkCase("GET effectiveness (30d)", get(f"{api}/metrics/project/{project_id}/effectiveness"), flush_snapshots),
+        BenchmarkCase("GET effectiveness (365d)", get(f"{api}/metrics/project/{project_id}/effectiveness?period_days=365"), flush_snapshots),
+        BenchmarkCase("GET portfolio effectiveness", get(f"{api}/metrics/projects/effectiveness?limit=100")),
+        BenchmarkCase("GET portfolio effectiveness (ids)", get(f"{api}/metrics/projects/effectiveness?ids={ids_param}")),
+        BenchmarkCase("GET technical-debt", get(f"{api}/metrics/project/{project_id}/technical-debt"), flush_snapshots),
+        BenchmarkCase("GET employee-care", get(f"{api}/metrics/project/{project_id}/employee-care"), flush_snapshots),
+        BenchmarkCase("GET bottlenecks", get(f"{api}/metrics/project/{project_id}/bottlenecks")),
+        BenchmarkCase("GET prs-needing-attention", get(f"{api}/metrics/project/{project_id}/prs-needing-attention?limit=20")),
+        BenchmarkCase("GET active-contributors", get(f"{api}/metrics/project/{project_id}/active-contributors")),
+        BenchmarkCase("GET commits-per-person", get(f"{api}/metrics/project/{project_id}/commits-per-person")),
+        BenchmarkCase("GET timeseries (52 weeks)", get(f"{api}/metrics/project/{project_id}/timeseries?bucket=week&periods=52")),
+        BenchmarkCase("GET cache stats", get(f"{api}/metrics/cache/stats")),
+        # repositories.py
+        BenchmarkCase("GET projects", get(f"{api}/projects/?limit=100")),
+        BenchmarkCase("GET project", get(f"{api}/projects/{project_id}")),
+        BenchmarkCase("POST project", create_project),
+        BenchmarkCase("DELETE project", delete_project, create_project),
+        # export.py (требует pyarrow)
+        *([
+            BenchmarkCase("GET commits export (365d, parquet)",
+                          get(f"{api}/projects/{project_id}/commits/export?format=parquet&from={year.isoformat()}")),
+            BenchmarkCase("GET commits export (365d, arrow)",
+                          get(f"{api}/projects/{project_id}/commits/export?format=arrow&from={year.isoformat()}")),
+        ] if CommitExportService.available() else []),
+        # Сервисы
+        BenchmarkCase("ProjectEffectivenessService.calculate_effectiveness_score",
+                      service(ProjectEffectivenessService.calculate_effectiveness_score, project_id, month, period_end)),
+        BenchmarkCase("ProjectEffectivenessService.calculate_portfolio_effectiveness",
+                      service(ProjectEffectivenessService.calculate_portfolio_effectiveness, month, period_end)),
+        BenchmarkCase("ProjectEffectivenessService.calculate_active_contributors",
+                      service(ProjectEffectivenessService.calculate_active_contributors, project_id, month, period_end)),
+        BenchmarkCase("ProjectEffectivenessService.calculate_commits_per_person",
+                      service(ProjectEffectivenessService.calculate_commits_per_person, project_id, month, period_end)),
+        BenchmarkCase("ProjectEffectivenessService.calculate_employee_care_metric",
+                      service(ProjectEffectivenessService.calculate_employee_care_metric, project_id, month, period_end)),
+        BenchmarkCase("ProjectTechnicalDebtService.analyze_technical_debt",
+                      service(ProjectTechnicalDebtService.analyze_technical_debt, project_id, month, period_end)),
+        BenchmarkCase("ProjectBottleneckService.analyze_bottlenecks",
+                      service(ProjectBottleneckService.analyze_bottlenecks, project_id, month, period_end)),
+        BenchmarkCase("ProjectBottleneckService.get_prs_needing_attention",
+                      service(ProjectBottleneckService.get_prs_needing_attention, project_id, 0.0, 20)),
+        BenchmarkCase("CommitStatsService.period_totals (365d)",
+                      service(CommitStatsService.period_totals, project_id, year, period_end)),
+        BenchmarkCase("CommitStatsService.author_totals (365d)",
+                      service(CommitStatsService.author_totals, project_id, year, period_end)),
+        # Изменяет данные, поэтому выполняется последним
+        BenchmarkCase("BulkIngestService.ingest_batch (1000 commits)", ingest_commits),
+    ]
+
+
+def run_suite(scale_name: str, seed: int, repeat: int, only: Optional[str] = None) -> Dict:
+    """Построить данные масштаба, прогнать все случаи и вернуть результаты."""
+    end_date = datetime.utcnow().date()
+    path = build_dataset(scale_name, seed, end_date)
+    # Бенчмарк меняет данные (POST/DELETE/ingest), поэтому работает с копией
+    work_path = path.with_suffix(".run.db")
+    work_path.write_bytes(path.read_bytes())
+
+    engine = create_engine(f"sqlite:///{work_path}", connect_args={"check_same_thread": False})
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # TestClient запускает каждый запрос в своём event loop, поэтому соединения не переиспользуются
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{work_path}", poolclass=NullPool)
+    async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    counter = QueryCounter(engine, async_engine.sync_engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_read_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    previous_factory = snapshot_writer.session_factory
+    snapshot_writer.session_factory = session_factory
+    # Измеряется холодный расчёт, а не попадание в кэш
+    cache_enabled = metrics_cache.enabled
+    metrics_cache.enabled = False
+    try:
+        with session_factory() as db:
+            # Самый большой проект - худший случай для эндпоинтов одного проекта
+            project_id = db.query(Commit.project_id).group_by(Commit.project_id).order_by(
+                func.count(Commit.id).desc()
+            ).limit(1).scalar()
+            project_ids = [pid for (pid,) in db.query(Project.id).order_by(Project.id)]
+
+        results = {}
+        for case in build_cases(session_factory, project_id, project_ids):
+            if only and only.lower() not in case.name.lower():
+                continue
+            results[case.name] = measure(case, counter, repeat)
+            print(f"  {case.name:<65} p50 {results[case.name]['p50_ms']:>9.2f} ms  "
+                  f"p95 {results[case.name]['p95_ms']:>9.2f} ms  "
+                  f"{results[case.name]['queries']:>4} q  {results[case.name]['peak_kb']:>9.1f} KB")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        app.dependency_overrides.pop(get_async_read_db, None)
+        snapshot_writer.session_factory = previous_factory
+        metrics_cache.enabled = cache_enabled
+        engine.dispose()
+        async_engine.sync_engine.dispose()
+        work_path.unlink(missing_ok=True)
+
+    scale = SCALES[scale_name]
+    return {
+        "scale": scale_name,
+        "commits": scale.commits,
+        "projects": scale.projects,
+        "seed": seed,
+        "cases": results,
+    }
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""Downsample and expire old metric snapshots according to the retention policy."""
+
+from app.db.session import SessionLocal, init_db
+from app.services.metric_history_service import MetricHistoryService
+
+if __name__ == "__main__":
+    init_db()
+    db = SessionLocal()
+    try:
+        stats = MetricHistoryService.compact(db)
+    finally:
+        db.close()
+    print("Metric history compacted:")
+    for step, count in stats.items():
+        print(f"  {step}: {count}")
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 """Initialize the database with tables."""
 
-from app.db.session import init_db, engine
-from app.models.models import Base
+from app.db.session import init_db
 
 if __name__ == "__main__":
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    init_db()
     print("Database tables created successfully!")
@@ -10,6 +10,7 @@ from app.db.session import SessionLocal
 from app.models.models import (
     Project, ProjectMember, Commit, PullRequest, CodeReview, Task
 )
+from app.services.commit_stats_service import CommitStatsService
 
 
 def create_demo_project_1(db: Session):
@@ -59,6 +60,7 @@ def create_demo_project_1(db: Session):
     
     # Создать коммиты
     base_date = datetime.utcnow() - timedelta(days=30)
+    commits = []
     for i in range(120):
         days_offset = i * 0.25  # 4 коммита в день
         commit_date = base_date + timedelta(days=days_offset)
@@ -72,6 +74,7 @@ def create_demo_project_1(db: Session):
         
         commit = Commit(
             external_id=f"commit-web-{i}",
+            project_id=project.id,
             author_id=author.id,
             message=f"Feature: Implement {['analytics', 'dashboard', 'metrics', 'api'][i % 4]} functionality",
             author_email=author.email,
@@ -89,8 +92,10 @@ def create_demo_project_1(db: Session):
             is_weekend=is_weekend
         )
         db.add(commit)
+        commits.append(commit)
     
     db.flush()
+    CommitStatsService.apply_commits(db, commits)
     
     # Создать PR
     for i in range(25):
@@ -206,6 +211,7 @@ def create_demo_project_2(db: Session):
     
     # Создать коммиты (больше переработок и выходных)
     base_date = datetime.utcnow() - timedelta(days=30)
+    commits = []
     for i in range(80):
         days_offset = i * 0.375
         commit_date = base_date + timedelta(days=days_offset)
@@ -219,6 +225,7 @@ def create_demo_project_2(db: Session):
         
         commit = Commit(
             external_id=f"commit-legacy-{i}",
+            project_id=project.id,
             author_id=author.id,
             message=f"Refactor: Update {['database', 'api', 'ui', 'backend'][i % 4]} code",
             author_email=author.email,
@@ -236,8 +243,10 @@ def create_demo_project_2(db: Session):
             is_weekend=is_weekend
         )
         db.add(commit)
+        commits.append(commit)
     
     db.flush()
+    CommitStatsService.apply_commits(db, commits)
     
     # Создать PR (меньше, но с долгим ревью)
     for i in range(15):
@@ -367,6 +376,7 @@ def create_demo_project_3(db: Session):
     
     # Создать коммиты (активные, хороший баланс)
     base_date = datetime.utcnow() - timedelta(days=30)
+    commits = []
     for i in range(150):
         days_offset = i * 0.2
         commit_date = base_date + timedelta(days=days_offset)
@@ -380,6 +390,7 @@ def create_demo_project_3(db: Session):
         
         commit = Commit(
             external_id=f"commit-mobile-{i}",
+            project_id=project.id,
             author_id=author.id,
             message=f"Feature: Add {['auth', 'profile', 'feed', 'chat'][i % 4]} screen",
             author_email=author.email,
@@ -397,8 +408,10 @@ def create_demo_project_3(db: Session):
             is_weekend=is_weekend
         )
         db.add(commit)
+        commits.append(commit)
     
     db.flush()
+    CommitStatsService.apply_commits(db, commits)
     
     # Создать PR (быстрое ревью)
     for i in range(30):
@@ -1,14 +1,25 @@
+import json
 import pytest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.db.session import Base, get_db
+from app.db.session import Base, get_async_read_db, get_db, get_read_db
+from app.core.cache import metrics_cache
+from app.core.config import settings
+from app.models.models import Commit, CommitDailyStats, FileModification, ProjectMember
+from app.services.bulk_ingest_service import BulkIngestService
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient выполняет запросы в разных event loop, поэтому асинхронный пул отключён
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 def override_get_db():
@@ -19,7 +30,14 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_read_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_async_read_db] = override_get_async_read_db
 
 
 @pytest.fixture()
@@ -31,6 +49,7 @@ def test_db():
 
 @pytest.fixture()
 def client(test_db):
+    metrics_cache.clear()
     return TestClient(app)
 
 
@@ -49,6 +68,74 @@ def test_health_check(client):
     assert response.json()["status"] == "healthy"
 
 
+def test_project_metrics_are_cached(client):
+    """Test that repeated metric requests are served from the cache"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Cached Project",
+        "external_id": "cached-project"
+    }).json()
+    
+    first = client.get(f"/api/v1/metrics/project/{project['id']}/effectiveness")
+    second = client.get(f"/api/v1/metrics/project/{project['id']}/effectiveness")
+    assert first.status_code == 200
+    assert second.json() == first.json()
+    
+    stats = client.get("/api/v1/metrics/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    
+    # Удаление проекта инвалидирует его записи
+    client.delete(f"/api/v1/projects/{project['id']}")
+    response = client.get(f"/api/v1/metrics/project/{project['id']}/effectiveness")
+    assert response.status_code == 404
+
+
+
+def test_delete_project_removes_its_data(client):
+    """Test that deleting a project removes rows keyed by its (reusable) id"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Deleted Project",
+        "external_id": "deleted-project"
+    }).json()
+    lines = [
+        json.dumps({
+            "external_id": f"deleted-sha-{i}",
+            "message": "commit",
+            "author_email": "dev@test.com",
+            "author_name": "Dev",
+            "committed_at": (datetime.utcnow() - timedelta(days=i)).isoformat(),
+            "files": [f"src/file_{i}.py"],
+        })
+        for i in range(5)
+    ]
+    db = TestingSessionLocal()
+    try:
+        db.add(ProjectMember(project_id=project["id"], email="dev@test.com", name="Dev"))
+        db.commit()
+    finally:
+        db.close()
+    client.post(f"/api/v1/projects/{project['id']}/commits:bulk", content="\n".join(lines) + "\n")
+    url = "/api/v1/metrics/project/{}/effectiveness"
+    assert client.get(url.format(project["id"])).json()["total_commits"] == 5
+    
+    assert client.delete(f"/api/v1/projects/{project['id']}").status_code == 200
+    db = TestingSessionLocal()
+    try:
+        for model in (Commit, CommitDailyStats, FileModification):
+            assert db.query(model).filter(model.project_id == project["id"]).count() == 0
+    finally:
+        db.close()
+    
+    # SQLite выдаёт освободившийся ID новому проекту - он не должен унаследовать сводку
+    recreated = client.post("/api/v1/projects/", json={
+        "name": "Recreated Project",
+        "external_id": "recreated-project"
+    }).json()
+    assert recreated["id"] == project["id"]
+    metrics = client.get(url.format(recreated["id"])).json()
+    assert metrics["total_commits"] == 0
+    assert metrics["active_contributors"] == 0
+
 def test_create_repository(client):
     """Test creating a repository"""
     repo_data = {
@@ -89,3 +176,216 @@ def test_list_teams(client):
     response = client.get("/api/v1/teams")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+
+def test_bulk_ingest_commits_is_idempotent(client):
+    """Test streaming NDJSON commit ingestion with duplicate and invalid lines"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Bulk Project",
+        "external_id": "bulk-project"
+    }).json()
+    lines = [
+        json.dumps({
+            "external_id": f"sha-{i}",
+            "message": f"commit {i}",
+            "author_email": "dev@test.com",
+            "author_name": "Dev",
+            "committed_at": (datetime.utcnow() - timedelta(days=i % 10)).isoformat(),
+            "insertions": 10,
+        })
+        for i in range(25)
+    ]
+    body = "\n".join(lines + ["{not json", lines[0]]) + "\n"
+    
+    def chunks():
+        # Тело передаётся потоком частями, не совпадающими с границами строк
+        data = body.encode()
+        for i in range(0, len(data), 100):
+            yield data[i:i + 100]
+    
+    url = f"/api/v1/projects/{project['id']}/commits:bulk"
+    summary = client.post(url, content=chunks()).json()
+    assert summary["received"] == 27
+    assert summary["inserted"] == 25
+    assert summary["duplicates"] == 1
+    assert summary["rejected"] == 1
+    assert summary["errors"][0]["line"] == 26
+    
+    summary = client.post(url, content=body).json()
+    assert summary["inserted"] == 0
+    assert summary["duplicates"] == 26
+    
+    response = client.post("/api/v1/projects/999/commits:bulk", content=body)
+    assert response.status_code == 404
+
+
+def test_metric_conditional_get(client):
+    """Test ETag / If-None-Match on metric endpoints keyed on the project data version"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "ETag Project",
+        "external_id": "etag-project"
+    }).json()
+    url = f"/api/v1/metrics/project/{project['id']}/technical-debt"
+    
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+    # Другие параметры - другой ETag
+    assert client.get(url, params={"period_days": 7}, headers={"If-None-Match": etag}).status_code == 200
+    
+    # Загрузка новых данных увеличивает версию проекта
+    line = json.dumps({
+        "external_id": "etag-sha",
+        "message": "TODO: later",
+        "author_email": "dev@test.com",
+        "author_name": "Dev",
+        "committed_at": datetime.utcnow().isoformat(),
+    })
+    client.post(f"/api/v1/projects/{project['id']}/commits:bulk", content=line + "\n")
+    assert client.get(f"/api/v1/projects/{project['id']}").json()["data_version"] == 1
+    
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    
+    assert client.get("/api/v1/metrics/project/999/technical-debt").status_code == 404
+
+
+
+def test_metric_cache_follows_database_version(client):
+    """Test that data ingested by another process (no cache invalidation) is not served stale"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Other Process Project",
+        "external_id": "other-process-project"
+    }).json()
+    url = f"/api/v1/metrics/project/{project['id']}/technical-debt"
+    first = client.get(url)
+    assert first.json()["todo_added"] == 0
+    
+    # Загрузка в отдельной сессии без metrics_cache.invalidate_project, как в другом воркере
+    db = TestingSessionLocal()
+    try:
+        db.add(ProjectMember(project_id=project["id"], email="dev@test.com", name="Dev"))
+        db.commit()
+        BulkIngestService.ingest_batch(db, project["id"], "commits", [{
+            "external_id": "other-sha",
+            "message": "TODO x7",
+            "author_email": "dev@test.com",
+            "author_name": "Dev",
+            "committed_at": datetime.utcnow().isoformat(),
+            "todo_count": 7,
+        }])
+    finally:
+        db.close()
+    
+    response = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert response.headers["etag"] != first.headers["etag"]
+    assert response.json()["todo_added"] == 7
+
+def test_metric_timeseries(client):
+    """Test bucketed metric time series endpoint"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Series Project",
+        "external_id": "series-project"
+    }).json()
+    url = f"/api/v1/metrics/project/{project['id']}/timeseries"
+    
+    response = client.get(url, params={"metric": "commits", "bucket": "day", "periods": 7})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["bucket"] == "day"
+    assert len(data["points"]) == 7
+    assert all(point["value"] == 0 for point in data["points"])
+    
+    assert client.get(url, params={"metric": "unknown"}).status_code == 422
+    assert client.get("/api/v1/metrics/project/999/timeseries").status_code == 404
+
+
+def test_export_commits(client):
+    """Test Parquet/Arrow commit export endpoint"""
+    pa = pytest.importorskip("pyarrow")
+    project = client.post("/api/v1/projects/", json={
+        "name": "Export Project",
+        "external_id": "export-project"
+    }).json()
+    line = json.dumps({
+        "external_id": "export-sha",
+        "message": "export",
+        "author_email": "dev@test.com",
+        "author_name": "Dev",
+        "committed_at": datetime.utcnow().isoformat(),
+    })
+    client.post(f"/api/v1/projects/{project['id']}/commits:bulk", content=line + "\n")
+    
+    response = client.get(f"/api/v1/projects/{project['id']}/commits/export", params={"format": "arrow"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("external_id").to_pylist() == ["export-sha"]
+    
+    assert client.get(f"/api/v1/projects/{project['id']}/commits/export", params={"format": "csv"}).status_code == 422
+    assert client.get("/api/v1/projects/999/commits/export").status_code == 404
+
+
+def test_prometheus_metrics(client):
+    """Test the Prometheus instrumentation endpoint"""
+    project = client.post("/api/v1/projects/", json={
+        "name": "Instrumented Project",
+        "external_id": "instrumented-project"
+    }).json()
+    client.get(f"/api/v1/metrics/project/{project['id']}/effectiveness")
+    client.get(f"/api/v1/metrics/project/{project['id']}/effectiveness")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    route = "/api/v1/metrics/project/{project_id}/effectiveness"
+    assert f'gitkomet_http_requests_total{{method="GET",route="{route}",status="200"}}' in text
+    assert f'gitkomet_http_request_duration_seconds_count{{method="GET",route="{route}"}}' in text
+    assert f'gitkomet_db_queries_per_request_count{{route="{route}"}}' in text
+    assert 'gitkomet_service_call_duration_seconds_count{service="ProjectEffectivenessService.calculate_effectiveness_score"}' in text
+    # Подсчёт строк - диагностический режим, по умолчанию выключен
+    assert 'gitkomet_service_rows_materialized_count{' not in text
+    assert 'gitkomet_cache{cache="metrics",stat="hits"} 1' in text
+    assert "gitkomet_http_requests_in_flight 1" in text  # сам запрос /metrics
+
+
+def test_request_profiling(client, monkeypatch):
+    """Test ?profile=cpu|mem on metric endpoints and report retrieval by ID"""
+    monkeypatch.setattr(settings, "REQUEST_PROFILING_ENABLED", True)
+    project = client.post("/api/v1/projects/", json={
+        "name": "Profiled Project",
+        "external_id": "profiled-project"
+    }).json()
+    url = f"/api/v1/metrics/project/{project['id']}/effectiveness"
+    expected = client.get(url).json()
+    
+    response = client.get(url, params={"profile": "cpu"})
+    assert response.status_code == 200
+    assert response.json()["effectiveness_score"] == expected["effectiveness_score"]
+    report = client.get(f"/api/v1/metrics/profiles/{response.headers['x-profile-id']}").json()
+    assert report["mode"] == "cpu"
+    assert report["status_code"] == 200
+    # Кэш пропускается, поэтому в отчёте виден сам обработчик
+    assert any("get_project_effectiveness" in entry["location"] for entry in report["entries"])
+    
+    response = client.get(url, params={"profile": "mem"})
+    report = client.get(f"/api/v1/metrics/profiles/{response.headers['x-profile-id']}").json()
+    assert report["mode"] == "mem"
+    assert report["peak_kb"] > 0
+    assert report["entries"] and all(entry["size_kb"] > 0 for entry in report["entries"])
+    
+    assert client.get(url, params={"profile": "gpu"}).status_code == 422
+    assert client.get("/api/v1/metrics/profiles/unknown").status_code == 404
+    
+    # Выключено по умолчанию, даже при DEBUG: и параметр, и чтение отчётов
+    monkeypatch.setattr(settings, "REQUEST_PROFILING_ENABLED", False)
+    assert client.get(url, params={"profile": "cpu"}).status_code == 403
+    assert client.get(f"/api/v1/metrics/profiles/{response.headers['x-profile-id']}").status_code == 403
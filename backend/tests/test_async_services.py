@@ -0,0 +1,161 @@
+"""
+Тесты для асинхронного пути доступа к базе данных.
+Tests for the async database path used by metric endpoints.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.cache import MetricsCache, metrics_cache
+from app.db.session import Base, async_database_url, get_async_read_db
+from app.main import app
+from app.models.models import Commit, Project, ProjectMember
+from app.services.async_services import (
+    AsyncProjectTechnicalDebtService,
+    AsyncProjectEffectivenessService
+)
+from app.services.commit_stats_service import CommitStatsService
+from app.services.project_technical_debt_service import ProjectTechnicalDebtService
+
+
+def test_async_database_url():
+    """Тест выбора асинхронного драйвера по URL базы данных."""
+    assert async_database_url("sqlite:///./git_komet.db") == "sqlite+aiosqlite:///./git_komet.db"
+    assert async_database_url("postgresql://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    with pytest.raises(ValueError):
+        async_database_url("oracle://host/db")
+
+
+def test_async_wrappers_cover_db_methods():
+    """Тест: обёртки создаются только для методов, принимающих сессию."""
+    assert hasattr(AsyncProjectTechnicalDebtService, "analyze_technical_debt")
+    assert hasattr(AsyncProjectTechnicalDebtService, "save_technical_debt_metric")
+    assert not hasattr(AsyncProjectTechnicalDebtService, "build_technical_debt_metric")
+    assert hasattr(AsyncProjectEffectivenessService, "calculate_portfolio_effectiveness")
+
+
+def _seed_project(url: str, period_end: datetime) -> int:
+    """Создать проект с пятью коммитами (по 2 TODO) синхронной сессией."""
+    engine = create_engine(url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            project = Project(name="Async", external_id="async")
+            db.add(project)
+            db.flush()
+            author = ProjectMember(project_id=project.id, email="dev@example.com", name="Dev")
+            db.add(author)
+            db.flush()
+            db.add_all([
+                Commit(
+                    project_id=project.id, author_id=author.id, external_id=f"sha{i}", message="m",
+                    author_email="dev@example.com", author_name="Dev",
+                    committed_at=period_end - timedelta(days=i + 1), todo_count=2
+                )
+                for i in range(5)
+            ])
+            db.flush()
+            CommitStatsService.rebuild(db, project.id)
+            db.commit()
+            return project.id
+    finally:
+        engine.dispose()
+
+
+def test_async_service_matches_sync(tmp_path):
+    """Тест: асинхронный сервис возвращает тот же результат, что и синхронный."""
+    path = tmp_path / "async.db"
+    period_end = datetime.utcnow()
+    period_start = period_end - timedelta(days=30)
+    project_id = _seed_project(f"sqlite:///{path}", period_end)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            async with session_factory() as db:
+                cache = MetricsCache()
+
+                async def compute():
+                    return await AsyncProjectTechnicalDebtService.analyze_technical_debt(
+                        db=db, project_id=project_id, period_start=period_start, period_end=period_end
+                    )
+
+                analysis = await cache.get_or_compute_async(project_id, "technical_debt", 30, compute)
+                cached = await cache.get_or_compute_async(project_id, "technical_debt", 30, compute)
+                return analysis, cached, cache.stats()
+        finally:
+            await engine.dispose()
+
+    analysis, cached, stats = asyncio.run(scenario())
+
+    # Эталон - синхронная сессия на том же файле базы данных
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as db:
+        expected = ProjectTechnicalDebtService.analyze_technical_debt(db, project_id, period_start, period_end)
+    engine.dispose()
+
+    assert analysis == expected
+    assert analysis["todo_count"] == 10
+    assert cached is analysis
+    assert stats["hits"] == 1
+
+
+def test_slow_metric_does_not_block_health(tmp_path, monkeypatch):
+    """Тест: пока метрика ждёт базу данных, /health отвечает без задержки."""
+    path = tmp_path / "slow.db"
+    project_id = _seed_project(f"sqlite:///{path}", datetime.utcnow())
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_sleep(dbapi_connection, connection_record):
+        # Медленный запрос выполняется в потоке драйвера aiosqlite, как настоящий ввод-вывод
+        dbapi_connection.create_function("slow", 1, lambda seconds: time.sleep(seconds) or 0)
+
+    period_totals = CommitStatsService.period_totals
+
+    def slow_period_totals(db, *args, **kwargs):
+        db.execute(text("SELECT slow(0.5)"))
+        return period_totals(db, *args, **kwargs)
+
+    monkeypatch.setattr(CommitStatsService, "period_totals", staticmethod(slow_period_totals))
+
+    async def override_get_async_read_db():
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_read_db, override_get_async_read_db)
+    metrics_cache.clear()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            slow = asyncio.create_task(client.get(f"/api/v1/metrics/project/{project_id}/technical-debt"))
+            await asyncio.sleep(0.1)
+            health = await client.get("/health")
+            health_elapsed = time.perf_counter() - started
+            slow_done_before_health = slow.done()
+            metric = await slow
+            return health, health_elapsed, slow_done_before_health, metric, time.perf_counter() - started
+
+    try:
+        health, health_elapsed, slow_done_before_health, metric, metric_elapsed = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+        metrics_cache.clear()
+
+    assert health.status_code == 200
+    assert not slow_done_before_health
+    assert health_elapsed < 0.4
+    assert metric.status_code == 200
+    assert metric.json()["todo_count"] == 10
+    assert metric_elapsed >= 0.5
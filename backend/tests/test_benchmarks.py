@@ -0,0 +1,57 @@
+"""
+Тесты для сравнения результатов бенчмарков с базовыми.
+Tests for benchmark regression detection.
+"""
+from benchmarks.run import compare
+
+
+def case(p95_ms=10.0, queries=3, peak_kb=100.0):
+    return {"p50_ms": p95_ms, "p95_ms": p95_ms, "queries": queries, "peak_kb": peak_kb}
+
+
+class TestBenchmarkCompare:
+    """Тесты для порога регрессий."""
+
+    def test_within_threshold_passes(self):
+        baseline = {"cases": {"a": case(), "b": case(p95_ms=0.5)}}
+        # +20% задержки и рост на быстром случае ниже абсолютного допуска
+        current = {"cases": {"a": case(p95_ms=12.0), "b": case(p95_ms=1.5)}}
+        assert compare(baseline, current, threshold=0.25) == []
+
+    def test_regressions_are_reported(self):
+        baseline = {"cases": {"a": case(), "b": case(), "c": case()}}
+        current = {"cases": {
+            "a": case(p95_ms=20.0),
+            "b": case(queries=4),
+            "c": case(peak_kb=500.0),
+        }}
+        regressions = compare(baseline, current, threshold=0.25)
+        assert len(regressions) == 3
+        assert regressions[0].startswith("a: p95")
+        assert regressions[1] == "b: queries 3 -> 4"
+        assert regressions[2].startswith("c: peak memory")
+
+
+def test_cached_dataset_is_migrated(tmp_path, monkeypatch):
+    """Тест: сохранённая база бенчмарков приводится к текущей схеме."""
+    from datetime import date
+
+    from sqlalchemy import create_engine, inspect, text
+
+    from benchmarks import suite
+
+    monkeypatch.setattr(suite, "DATA_DIR", tmp_path)
+    end_date = date(2024, 1, 31)
+    cached = tmp_path / f"100k-10p-seed1-{end_date.isoformat()}.db"
+    engine = create_engine(f"sqlite:///{cached}")
+    suite.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # База, сохранённая до добавления столбца
+        conn.execute(text("ALTER TABLE projects DROP COLUMN data_version"))
+    engine.dispose()
+
+    assert suite.build_dataset("100k-10p", 1, end_date) == cached
+    engine = create_engine(f"sqlite:///{cached}")
+    columns = {column["name"] for column in inspect(engine).get_columns("projects")}
+    engine.dispose()
+    assert "data_version" in columns
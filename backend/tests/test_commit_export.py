@@ -0,0 +1,83 @@
+"""
+Тесты для экспорта истории коммитов в Parquet / Arrow.
+Tests for streaming commit history export.
+"""
+import io
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models.models import Commit, Project
+from app.services.commit_export_service import CommitExportService
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+START = datetime(2024, 1, 1, 9, 30)
+
+
+@pytest.fixture()
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Project(id=1, external_id="p1", name="P1"), Project(id=2, external_id="p2", name="P2")])
+    session.add_all([
+        Commit(
+            project_id=1, external_id=f"sha{i}", message=f"commit {i}",
+            author_email="dev@example.com", author_name="Dev",
+            committed_at=START + timedelta(days=i), insertions=i, is_churn=i % 2 == 0,
+            churn_days=i if i % 2 == 0 else None,
+            test_coverage_delta=0.5 if i == 3 else None
+        )
+        for i in range(25)
+    ])
+    session.add(Commit(
+        project_id=2, external_id="other", message="other", author_email="x@example.com",
+        author_name="X", committed_at=START
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_batches_are_bounded_and_typed(db):
+    """Тест: пачки не превышают batch_size, колонки имеют типы Arrow."""
+    batches = list(CommitExportService.iter_batches(db, 1, batch_size=10))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+
+    table = pa.Table.from_batches(batches)
+    assert table.schema.names == [column.name for column in Commit.__table__.columns]
+    assert table.schema.field("committed_at").type == pa.timestamp("us")
+    assert table.schema.field("is_churn").type == pa.bool_()
+    assert table.column("external_id").to_pylist()[:2] == ["sha0", "sha1"]
+    assert table.column("churn_days").null_count == 12
+    assert table.column("test_coverage_delta").to_pylist()[3] == 0.5
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_stream_round_trip_with_period(db, export_format):
+    """Тест: поток читается обратно и содержит только коммиты проекта за период."""
+    data = b"".join(CommitExportService.stream(
+        db, 1, export_format,
+        period_start=START + timedelta(days=5),
+        period_end=START + timedelta(days=14),
+        batch_size=4
+    ))
+    if export_format == "parquet":
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+
+    assert table.num_rows == 10
+    assert table.column("external_id").to_pylist() == [f"sha{i}" for i in range(5, 15)]
+    assert table.column("committed_at").to_pylist()[0] == START + timedelta(days=5)
+
+
+def test_stream_of_empty_project_is_valid(db):
+    """Тест: проект без коммитов даёт корректный пустой файл."""
+    data = b"".join(CommitExportService.stream(db, 3, "parquet"))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 0
+    assert table.schema.names == CommitExportService.schema().names
@@ -0,0 +1,89 @@
+"""
+Тесты для продакшен-режима SQLite (WAL, прагмы, раздельные engine).
+Tests for SQLite production mode.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db import session as db_session
+
+
+@pytest.fixture()
+def production_mode(monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_PRODUCTION_MODE", True)
+    monkeypatch.setattr(settings, "DB_READ_POOL_SIZE", 3)
+
+
+def _engine(url: str, read_only: bool):
+    engine = create_engine(url, **db_session._engine_options(url, read_only))
+    db_session.configure_sqlite(engine, read_only)
+    return engine
+
+
+def test_writer_enables_wal_and_reader_is_query_only(production_mode, tmp_path):
+    """Тест: писатель включает WAL, читатель не может изменять данные."""
+    url = f"sqlite:///{tmp_path / 'prod.db'}"
+    writer = _engine(url, read_only=False)
+    reader = _engine(url, read_only=True)
+    try:
+        with writer.begin() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+            assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -settings.SQLITE_CACHE_SIZE_KB
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO t VALUES (2)"))
+
+        assert reader.pool.size() == 3
+        assert writer.pool.size() == 1
+    finally:
+        writer.dispose()
+        reader.dispose()
+
+
+def test_async_reader_applies_pragmas(production_mode, tmp_path):
+    """Тест: прагмы применяются и к асинхронным соединениям aiosqlite."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'prod.db'}"
+
+    async def scenario():
+        engine = create_async_engine(url, **db_session._engine_options(url, True, async_engine=True))
+        db_session.configure_sqlite(engine.sync_engine, read_only=True)
+        try:
+            async with engine.connect() as conn:
+                return (await conn.execute(text("PRAGMA query_only"))).scalar()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_default_and_memory_databases_are_untouched(production_mode):
+    """Тест: вне файловой SQLite пул и прагмы не меняются."""
+    assert db_session._engine_options("sqlite://", read_only=True) == {}
+    assert db_session._engine_options("postgresql://u@host/db", read_only=True) == {}
+
+
+def test_single_writer_engine():
+    """Тест: асинхронный путь только читает, запись идёт через один синхронный engine."""
+    assert not hasattr(db_session, "async_engine")
+    assert not hasattr(db_session, "get_async_db")
+
+
+def test_synchronous_setting_is_validated():
+    """Тест: SQLITE_SYNCHRONOUS принимает только допустимые режимы SQLite."""
+    from pydantic import ValidationError
+    from app.core.config import Settings
+
+    assert Settings(SQLITE_SYNCHRONOUS="FULL").SQLITE_SYNCHRONOUS == "FULL"
+    with pytest.raises(ValidationError):
+        Settings(SQLITE_SYNCHRONOUS="NORMAL; DROP TABLE projects")
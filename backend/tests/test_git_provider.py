@@ -0,0 +1,150 @@
+"""
+Тесты для поставщика данных из локального Git-репозитория.
+Tests for the local git repository data provider.
+"""
+import os
+import shutil
+import subprocess
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models.models import Commit, CommitDailyStats, Project, ProjectMember
+from app.services.data_providers import DataProviderFactory
+from app.services.data_providers.git_provider import LOG_FORMAT, parse_git_log
+from app.services.ingestion_coordinator import IngestionCoordinator
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(repo, *args, date=None):
+    env = dict(os.environ, GIT_AUTHOR_NAME="Alice", GIT_AUTHOR_EMAIL="alice@example.com",
+               GIT_COMMITTER_NAME="Alice", GIT_COMMITTER_EMAIL="alice@example.com")
+    if date:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = date
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, env=env)
+
+
+def commit_file(repo, path, content, message, date):
+    target = repo / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content)
+    git(repo, "add", path)
+    git(repo, "commit", "-q", "-m", message, date=date)
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    # Понедельник 10:00 и суббота 22:00 по московскому времени
+    commit_file(repo, "app.py", "a\n# TODO: split, FIXME\n", "Add app", "2024-03-04T10:00:00+03:00")
+    commit_file(repo, "tests/test_app.py", "x\n", "Add tests", "2024-03-09T22:00:00+03:00")
+    return repo
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'git.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture()
+def db_session(session_factory):
+    db = session_factory()
+    yield db
+    db.close()
+
+
+class TestGitLogParser:
+    """Тесты для потокового разбора git log."""
+
+    def test_parses_numstat_and_local_time(self, repo):
+        output = subprocess.run(
+            ["git", "-C", str(repo), "log", "--numstat", f"--format={LOG_FORMAT}"],
+            check=True, capture_output=True, text=True
+        ).stdout
+        # splitlines() считает \x1e и \x1f разрывами строк, поэтому делим только по \n
+        commits = list(parse_git_log(output.split("\n")))
+
+        assert [c["message"] for c in commits] == ["Add tests", "Add app"]
+        tests_commit, app_commit = commits
+        assert app_commit["insertions"] == 2 and app_commit["files_changed"] == 1
+        assert app_commit["committed_at"] == datetime(2024, 3, 4, 7, 0)
+        assert not app_commit["has_tests"] and not app_commit["is_after_hours"]
+        assert tests_commit["has_tests"] and tests_commit["is_after_hours"] and tests_commit["is_weekend"]
+
+    def test_counts_todo_markers_in_hunks_only(self):
+        lines = ["\x1eabc\x1fBob\x1fbob@example.com\x1f2024-01-01T12:00:00+00:00\x1fTODO in subject\n",
+                 "\n", "2\t1\tapp.py\n", "\n",
+                 "diff --git a/app.py b/app.py\n", "--- a/app.py\n", "+++ b/app.py\n",
+                 "@@ -1 +1,2 @@\n", "-# HACK remove\n", "+# TODO one TODO two\n", "+TODOS are not markers\n"]
+        (commit,) = parse_git_log(lines)
+        assert commit["files"] == ["app.py"]
+        assert commit["todo_count"] == 2 and commit["todo_removed"] == 1
+
+    def test_binary_files_count_without_lines(self):
+        lines = ["\x1eabc\x1fBob\x1fbob@example.com\x1f2024-01-01T12:00:00+00:00\x1fLogo\n",
+                 "\n", "-\t-\tlogo.png\n"]
+        (commit,) = parse_git_log(lines)
+        assert commit["files_changed"] == 1
+        assert commit["insertions"] == commit["deletions"] == 0
+
+
+class TestGitRepositoryProvider:
+    """Тесты для синхронизации локального клона."""
+
+    def test_sync_resumes_from_last_sha(self, repo, db_session):
+        project = Project(external_id="repo", name="Repo", repository_path=str(repo))
+        db_session.add(project)
+        db_session.commit()
+        provider = DataProviderFactory.create("git")
+
+        result = provider.populate_data(db_session, 0, project.id)
+
+        assert result["commits_created"] == 2
+        assert db_session.query(ProjectMember).filter_by(project_id=project.id).count() == 1
+        assert db_session.query(Commit).filter(Commit.author_id.is_(None)).count() == 0
+        assert db_session.query(CommitDailyStats).count() == 2
+
+        commit_file(repo, "app.py", "a\n", "Trim app", "2024-03-11T11:00:00+03:00")
+        messages = [c["message"] for c in provider.fetch_commits(db_session, 0, project.id, None, None)]
+        assert messages == ["Trim app"]
+
+        result = provider.populate_data(db_session, 0, project.id)
+        assert result["commits_created"] == 1
+        trim = db_session.query(Commit).filter(Commit.message == "Trim app").one()
+        assert trim.is_churn and trim.churn_days == 7
+        assert trim.todo_removed == 2 and trim.todo_count == 0
+        db_session.refresh(project)
+        assert project.last_synced_sha == result["last_synced_sha"]
+        assert provider.populate_data(db_session, 0, project.id)["commits_created"] == 0
+
+
+class TestIngestionCoordinator:
+    """Тесты для параллельной синхронизации репозиториев."""
+
+    def test_failures_are_isolated(self, repo, tmp_path, session_factory, db_session):
+        other = tmp_path / "other"
+        other.mkdir()
+        git(other, "init", "-q")
+        for day in range(1, 6):
+            commit_file(other, f"f{day}.txt", "x\n", f"Change {day}", f"2024-04-0{day}T12:00:00+00:00")
+        db_session.add_all([
+            Project(external_id="repo", name="Repo", repository_path=str(repo)),
+            Project(external_id="other", name="Other", repository_path=str(other)),
+            Project(external_id="missing", name="Missing", repository_path=str(tmp_path / "missing")),
+        ])
+        db_session.commit()
+        coordinator = IngestionCoordinator(session_factory, max_workers=2, chunk_size=2)
+
+        results = {r.name: r for r in coordinator.run()}
+
+        assert results["Repo"].status == "ok" and results["Repo"].commits_inserted == 2
+        assert results["Other"].status == "ok" and results["Other"].commits_parsed == 5
+        assert results["Missing"].status == "failed" and results["Missing"].error
+        assert db_session.query(Commit).count() == 7
+        assert [r.status for r in coordinator.run()] == ["up_to_date", "up_to_date", "failed"]
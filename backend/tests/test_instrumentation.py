@@ -0,0 +1,64 @@
+"""
+Тесты для инструментирования в формате Prometheus.
+Tests for Prometheus text-format instrumentation.
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, event, insert, select
+from sqlalchemy.orm import Session
+
+from app.core import instrumentation
+from app.core.instrumentation import Registry
+
+
+def test_counter_and_histogram_rendering():
+    """Тест текстового формата счётчиков и накопительных корзин гистограммы."""
+    registry = Registry()
+    requests = registry.counter("app_requests_total", "Requests.", ("route",))
+    latency = registry.histogram("app_latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    for value in (0.05, 0.5, 3.0):
+        latency.observe("/x", value=value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{route="/a\\"b"} 3' in lines
+    assert 'app_latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'app_latency_seconds_bucket{route="/x",le="1"} 2' in lines
+    assert 'app_latency_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'app_latency_seconds_sum{route="/x"} 3.55' in lines
+    assert 'app_latency_seconds_count{route="/x"} 3' in lines
+
+
+def test_gauge_without_labels():
+    """Тест gauge без меток."""
+    registry = Registry()
+    in_flight = registry.gauge("app_in_flight", "In flight.")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    assert "app_in_flight 1" in registry.render().splitlines()
+
+
+def test_rows_are_not_buffered_by_default():
+    """Тест: без count_rows результаты SELECT не буферизуются ради подсчёта строк."""
+    instrumentation.instrument_sqlalchemy()
+    assert not event.contains(Session, "do_orm_execute", instrumentation._on_orm_execute)
+
+
+def test_row_counting_in_diagnostic_mode():
+    """Тест подсчёта материализованных строк вызова сервиса."""
+    engine = create_engine("sqlite://")
+    numbers = Table("numbers", MetaData(), Column("x", Integer))
+    numbers.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(insert(numbers), [{"x": 1}, {"x": 2}, {"x": 3}])
+        event.listen(db, "do_orm_execute", instrumentation._on_orm_execute)
+        stats = instrumentation._CallStats()
+        token = instrumentation._service_stats.set(stats)
+        try:
+            rows = db.execute(select(numbers)).all()
+        finally:
+            instrumentation._service_stats.reset(token)
+    engine.dispose()
+    assert len(rows) == 3
+    assert stats.rows == 3
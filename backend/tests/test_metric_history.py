@@ -0,0 +1,87 @@
+"""
+Тесты для истории снимков метрик.
+Tests for metric snapshot deduplication and compaction.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models.models import Project, ProjectMetric
+from app.services.metric_history_service import MetricHistoryService, align_bucket
+from app.services.project_effectiveness_service import ProjectEffectivenessService
+
+
+@pytest.fixture()
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Project(id=1, external_id="p1", name="P1"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def make_snapshot(period_end: datetime, score: float) -> ProjectMetric:
+    return ProjectEffectivenessService.build_project_metric(
+        project_id=1,
+        metric_type="effectiveness_score",
+        metric_data={"effectiveness_score": score},
+        score=score,
+        trend="stable",
+        period_start=period_end - timedelta(days=30),
+        period_end=period_end
+    )
+
+
+def test_upsert_keeps_one_snapshot_per_hour(db):
+    """Тест: повторные расчёты в пределах часа заменяют снимок."""
+    hour = datetime(2024, 3, 1, 10)
+    MetricHistoryService.upsert_snapshots(db, [make_snapshot(hour + timedelta(minutes=5), 10)])
+    MetricHistoryService.upsert_snapshots(db, [
+        make_snapshot(hour + timedelta(minutes=20), 20),
+        make_snapshot(hour + timedelta(minutes=50), 30),
+        make_snapshot(hour + timedelta(hours=1), 40),
+    ])
+    db.commit()
+    
+    rows = db.query(ProjectMetric).order_by(ProjectMetric.bucket_start).all()
+    assert [(row.bucket_start, row.score) for row in rows] == [
+        (hour, 30),
+        (hour + timedelta(hours=1), 40),
+    ]
+    assert rows[0].period_days == 30
+
+
+def test_compact_downsamples_and_expires(db):
+    """Тест прореживания hourly → daily → weekly и удаления старых снимков."""
+    now = datetime(2024, 6, 15, 12)
+    snapshots = []
+    # Три часа двухнедельной давности -> один дневной снимок
+    old_day = now - timedelta(days=14)
+    for hour in range(3):
+        snapshots.append(make_snapshot(old_day.replace(hour=hour), hour))
+    # Свежий час остаётся почасовым
+    snapshots.append(make_snapshot(now - timedelta(hours=1), 100))
+    MetricHistoryService.upsert_snapshots(db, snapshots)
+    # Дневные снимки полугодовой давности -> недельные, трёхлетние - удаляются
+    for days_ago, score in ((182, 50), (183, 60), (365 * 3, 70)):
+        snapshot = make_snapshot(now - timedelta(days=days_ago), score)
+        snapshot.granularity = "daily"
+        snapshot.bucket_start = align_bucket(snapshot.period_end, "daily")
+        MetricHistoryService.upsert_snapshots(db, [snapshot])
+    db.commit()
+    
+    stats = MetricHistoryService.compact(db, now=now)
+    
+    rows = db.query(ProjectMetric).order_by(ProjectMetric.bucket_start).all()
+    assert [row.granularity for row in rows] == ["weekly", "daily", "hourly"]
+    assert rows[1].bucket_start == align_bucket(old_day, "daily")
+    assert rows[1].score == 2
+    assert stats["hourly_to_daily"] == 3
+    assert stats["weekly_expired"] == 1
+    
+    # Повторная компактизация ничего не меняет
+    MetricHistoryService.compact(db, now=now)
+    assert db.query(ProjectMetric).count() == 3
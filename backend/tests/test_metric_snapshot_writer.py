@@ -0,0 +1,75 @@
+"""
+Тесты для фоновой записи снимков метрик.
+Tests for the write-behind metric snapshot writer.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models.models import Project, ProjectMetric
+from app.services.metric_snapshot_writer import MetricSnapshotWriter
+from app.services.project_effectiveness_service import ProjectEffectivenessService
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Project(id=1, external_id="p1", name="P1"))
+    db.commit()
+    db.close()
+    return factory
+
+
+def make_snapshot(score: float) -> ProjectMetric:
+    # Каждый снимок в своём часе, чтобы они не заменяли друг друга
+    period_end = datetime(2024, 1, 1) + timedelta(hours=score)
+    return ProjectEffectivenessService.build_project_metric(
+        project_id=1,
+        metric_type="effectiveness_score",
+        metric_data={"effectiveness_score": score},
+        score=score,
+        trend="stable",
+        period_start=period_end - timedelta(days=30),
+        period_end=period_end
+    )
+
+
+def test_flush_writes_batch_in_one_transaction(session_factory):
+    """Тест пакетной записи снимков из очереди."""
+    writer = MetricSnapshotWriter(session_factory=session_factory, batch_size=10)
+    for score in range(5):
+        assert writer.enqueue(make_snapshot(score))
+    
+    assert writer.flush() == 5
+    
+    db = session_factory()
+    assert db.query(ProjectMetric).count() == 5
+    db.close()
+    assert writer.stats()["batches"] == 1
+
+
+def test_full_queue_drops_snapshots(session_factory):
+    """Тест: переполненная очередь не блокирует запрос, а отбрасывает снимок."""
+    writer = MetricSnapshotWriter(session_factory=session_factory, max_queue_size=2)
+    results = [writer.enqueue(make_snapshot(score)) for score in range(3)]
+    
+    assert results == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+
+
+def test_stop_flushes_pending_snapshots(session_factory):
+    """Тест: при остановке все снимки из очереди записываются."""
+    writer = MetricSnapshotWriter(session_factory=session_factory, flush_interval=0.05)
+    writer.start()
+    for score in range(20):
+        writer.enqueue(make_snapshot(score))
+    writer.stop()
+    
+    db = session_factory()
+    assert db.query(ProjectMetric).count() == 20
+    db.close()
+    assert not writer.running
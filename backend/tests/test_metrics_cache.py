@@ -0,0 +1,96 @@
+"""
+Тесты для кэша результатов метрик.
+Tests for the metric result cache.
+"""
+from app.core.cache import MetricsCache
+
+
+class FakeClock:
+    """Управляемые часы для тестов."""
+    
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    """Тест подсчёта попаданий и промахов."""
+    cache = MetricsCache(clock=FakeClock())
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {"score": 42}
+    
+    assert cache.get_or_compute(1, "effectiveness", 30, compute) == {"score": 42}
+    assert cache.get_or_compute(1, "effectiveness", 30, compute) == {"score": 42}
+    assert cache.get_or_compute(1, "effectiveness", 90, compute) == {"score": 42}
+    
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_none_is_not_cached():
+    """Тест: отсутствующий проект (None) не кэшируется."""
+    cache = MetricsCache(clock=FakeClock())
+    
+    assert cache.get_or_compute(1, "effectiveness", 30, lambda: None) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_and_period_bucket_expiry():
+    """Тест истечения записей по TTL и смене календарного интервала."""
+    clock = FakeClock(now=600.0)
+    cache = MetricsCache(ttl_seconds=100, bucket_seconds=300, clock=clock)
+    cache.set(1, "effectiveness", 30, "a")
+    
+    clock.now = 650.0
+    assert cache.get(1, "effectiveness", 30) == "a"
+    
+    clock.now = 701.0  # TTL истёк
+    assert cache.get(1, "effectiveness", 30) is None
+    
+    cache.set(1, "effectiveness", 30, "b")
+    clock.now = 900.0  # новый интервал 900-1200
+    assert cache.get(1, "effectiveness", 30) is None
+
+
+def test_lru_eviction():
+    """Тест вытеснения самых давно использованных записей."""
+    cache = MetricsCache(max_entries=2, clock=FakeClock())
+    cache.set(1, "m", None, "a")
+    cache.set(2, "m", None, "b")
+    assert cache.get(1, "m") == "a"  # проект 1 становится последним использованным
+    cache.set(3, "m", None, "c")
+    
+    assert cache.get(2, "m") is None
+    assert cache.get(1, "m") == "a"
+    assert cache.get(3, "m") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_project():
+    """Тест инвалидации записей проекта при поступлении новых данных."""
+    cache = MetricsCache(clock=FakeClock())
+    cache.set(1, "effectiveness", 30, "old")
+    cache.set(2, "effectiveness", 30, "other")
+    
+    cache.invalidate_project(1)
+    
+    assert cache.get(1, "effectiveness", 30) is None
+    assert cache.get(2, "effectiveness", 30) == "other"
+
+
+def test_version_is_part_of_key():
+    """Тест: новая версия данных проекта (из базы) делает старые записи недостижимыми без инвалидации."""
+    cache = MetricsCache(clock=FakeClock())
+    cache.set(1, "effectiveness", 30, "old", version=(1, "created"))
+    
+    assert cache.get(1, "effectiveness", 30, version=(1, "created")) == "old"
+    assert cache.get(1, "effectiveness", 30, version=(2, "created")) is None
+    assert cache.get_or_compute(1, "effectiveness", 30, lambda: "new", version=(2, "created")) == "new"
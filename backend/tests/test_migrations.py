@@ -0,0 +1,84 @@
+"""
+Тесты для миграций схемы.
+Tests for schema migrations.
+"""
+from sqlalchemy import create_engine, inspect, text
+from app.db.session import Base
+from app.db.migrations import run_migrations
+import app.models.models  # noqa: F401
+
+
+def test_commit_project_id_backfill(tmp_path):
+    """Тест добавления и заполнения commits.project_id в существующей базе."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    
+    # Создать схему без commits.project_id (как в старых базах)
+    commits_table = Base.metadata.tables["commits"]
+    tables = [t for t in Base.metadata.sorted_tables if t is not commits_table]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE commits (id INTEGER PRIMARY KEY, external_id VARCHAR NOT NULL, "
+            "author_id INTEGER, message VARCHAR NOT NULL, author_email VARCHAR NOT NULL, "
+            "author_name VARCHAR NOT NULL, committed_at DATETIME NOT NULL, files_changed INTEGER, "
+            "insertions INTEGER, deletions INTEGER, has_tests BOOLEAN, test_coverage_delta FLOAT, "
+            "todo_count INTEGER, is_churn BOOLEAN, churn_days INTEGER, is_after_hours BOOLEAN, "
+            "is_weekend BOOLEAN)"
+        ))
+        conn.execute(text("INSERT INTO projects (id, external_id, name) VALUES (7, 'p', 'P')"))
+        conn.execute(text(
+            "INSERT INTO team_members (id, project_id, email, name) VALUES (3, 7, 'a@test.com', 'A')"
+        ))
+        conn.execute(text(
+            "INSERT INTO commits (id, external_id, author_id, message, author_email, author_name, committed_at) "
+            "VALUES (1, 'sha1', 3, 'm', 'a@test.com', 'A', '2024-01-01 10:00:00'), "
+            "(2, 'sha2', NULL, 'm', 'x@test.com', 'X', '2024-01-01 11:00:00')"
+        ))
+    
+    run_migrations(engine)
+    run_migrations(engine)  # повторный запуск не должен падать
+    
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, project_id FROM commits ORDER BY id")).all()
+    assert rows == [(1, 7), (2, None)]
+    
+    index_names = {index["name"] for index in inspect(engine).get_indexes("commits")}
+    assert "ix_commits_project_committed_at" in index_names
+    assert "ix_commits_project_author_committed_at" in index_names
+
+
+def test_metric_snapshot_dedupe(tmp_path):
+    """Тест: старые снимки метрик получают ключ и дедуплицируются по часу."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    metrics_table = Base.metadata.tables["project_metrics"]
+    tables = [t for t in Base.metadata.sorted_tables if t is not metrics_table]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE project_metrics (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, "
+            "metric_type VARCHAR NOT NULL, metric_value TEXT NOT NULL, score FLOAT, trend VARCHAR, "
+            "period_start DATETIME NOT NULL, period_end DATETIME NOT NULL, calculated_at DATETIME, "
+            "has_alert BOOLEAN, alert_message VARCHAR, alert_severity VARCHAR)"
+        ))
+        conn.execute(text("INSERT INTO projects (id, external_id, name) VALUES (1, 'p', 'P')"))
+        conn.execute(text(
+            "INSERT INTO project_metrics (id, project_id, metric_type, metric_value, score, "
+            "period_start, period_end) VALUES "
+            "(1, 1, 'effectiveness_score', '{}', 10, '2024-01-01 10:05:00', '2024-01-31 10:05:00'), "
+            "(2, 1, 'effectiveness_score', '{}', 20, '2024-01-01 10:40:00', '2024-01-31 10:40:00'), "
+            "(3, 1, 'effectiveness_score', '{}', 30, '2024-01-01 11:10:00', '2024-01-31 11:10:00')"
+        ))
+    
+    run_migrations(engine)
+    run_migrations(engine)
+    
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, period_days, granularity, bucket_start FROM project_metrics ORDER BY id"
+        )).all()
+    assert rows == [
+        (2, 30, "hourly", "2024-01-31 10:00:00.000000"),
+        (3, 30, "hourly", "2024-01-31 11:00:00.000000"),
+    ]
+    index_names = {index["name"] for index in inspect(engine).get_indexes("project_metrics")}
+    assert "ix_project_metrics_snapshot_key" in index_names
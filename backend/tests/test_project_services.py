@@ -4,13 +4,17 @@ Tests for project services.
 """
 import pytest
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.db.session import Base
-from app.models.models import Project, ProjectMember, Commit, PullRequest, Task, CodeReview
+from app.models.models import Project, ProjectMember, Commit, CommitDailyStats, FileModification, PullRequest, Task, CodeReview
 from app.services.project_effectiveness_service import ProjectEffectivenessService
 from app.services.project_technical_debt_service import ProjectTechnicalDebtService
 from app.services.project_bottleneck_service import ProjectBottleneckService
+from app.services.project_timeseries_service import ProjectTimeseriesService, bucket_boundaries
+from app.services.commit_stats_service import CommitStatsService
+from app.services.bulk_ingest_service import BulkIngestService
+from app.services.data_providers import DataProviderFactory
 
 
 # Настройка тестовой базы данных
@@ -69,9 +73,11 @@ def sample_project(db_session):
     
     # Создать коммиты
     base_date = datetime.utcnow() - timedelta(days=15)
+    commits = []
     for i in range(20):
         commit = Commit(
             external_id=f"commit-{i}",
+            project_id=project.id,
             author_id=member1.id if i % 2 == 0 else member2.id,
             message=f"Test commit {i}",
             author_email=member1.email if i % 2 == 0 else member2.email,
@@ -87,6 +93,9 @@ def sample_project(db_session):
             is_churn=i % 8 == 0
         )
         db_session.add(commit)
+        commits.append(commit)
+    
+    CommitStatsService.apply_commits(db_session, commits)
     
     # Создать PR
     for i in range(5):
@@ -164,6 +173,36 @@ class TestProjectEffectivenessService:
         assert result["active_contributors"] == 2
         assert isinstance(result["has_alert"], bool)
     
+    def test_effectiveness_score_aggregates(self, db_session, sample_project):
+        """Тест точных значений агрегатов (after-hours, выходные, churn)."""
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=30)
+        
+        result = ProjectEffectivenessService.calculate_effectiveness_score(
+            db_session, sample_project.id, period_start, period_end
+        )
+        
+        # 20 коммитов: after-hours i%10==0, выходные i%15==0, churn i%8==0
+        assert result["after_hours_percentage"] == 10.0
+        assert result["weekend_percentage"] == 10.0
+        assert result["churn_rate"] == 15.0
+    
+    def test_effectiveness_trend_compares_previous_period(self, db_session, sample_project):
+        """Тест тренда: коммиты только в предыдущем периоде дают снижение."""
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=5)
+        
+        result = ProjectEffectivenessService.calculate_effectiveness_score(
+            db_session, sample_project.id, period_start, period_end
+        )
+        
+        assert result["total_commits"] == 0
+        assert result["trend"] == "declining"
+        previous = result["previous_period"]
+        assert previous["total_commits"] > 0
+        assert result["score_delta"] == -previous["effectiveness_score"]
+        assert sum(previous["components"].values()) == pytest.approx(previous["effectiveness_score"], abs=0.05)
+    
     def test_calculate_employee_care_metric(self, db_session, sample_project):
         """Тест расчёта метрики заботы о сотрудниках."""
         period_end = datetime.utcnow()
@@ -253,6 +292,27 @@ class TestProjectTechnicalDebtService:
         assert isinstance(result["recommendations"], list)
         assert len(result["recommendations"]) > 0
     
+    def test_technical_debt_uses_net_todo_change(self, db_session, sample_project):
+        """Долг определяется разницей добавленных и удалённых TODO."""
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=30)
+        commits = db_session.query(Commit).filter(Commit.project_id == sample_project.id).all()
+        added = sum(c.todo_count for c in commits)
+        for commit in commits:
+            commit.todo_removed = 3
+        db_session.commit()
+        CommitStatsService.rebuild(db_session, sample_project.id)
+        
+        result = ProjectTechnicalDebtService.analyze_technical_debt(
+            db_session, sample_project.id, period_start, period_end
+        )
+        
+        assert result["todo_added"] == added
+        assert result["todo_removed"] == 3 * len(commits)
+        assert result["todo_count"] == added - 3 * len(commits) < 0
+        assert result["todo_trend"] == "down"
+        assert result["technical_debt_score"] == 0
+    
     def test_save_technical_debt_metric(self, db_session, sample_project):
         """Тест сохранения метрики технического долга."""
         period_end = datetime.utcnow()
@@ -412,6 +472,50 @@ class TestProjectBottleneckService:
         assert "🌧️" in indicators  # 24-96 часов
         assert "☀️" in indicators  # < 24 часов
     
+    def test_get_prs_needing_attention_query_count(self, db_session, sample_project):
+        """Количество SQL-запросов не зависит от числа открытых PR."""
+        base_date = datetime.utcnow()
+        for i in range(10):
+            pr = PullRequest(
+                external_id=f"pr-open-{i}",
+                project_id=sample_project.id,
+                author_id=1,
+                title=f"Open PR {i}",
+                state="open",
+                created_at=base_date - timedelta(hours=10 * i + 1),
+                updated_at=base_date
+            )
+            db_session.add(pr)
+            db_session.flush()
+            if i % 2:
+                db_session.add(CodeReview(
+                    pull_request_id=pr.id,
+                    reviewer_id=2,
+                    state="commented",
+                    created_at=base_date - timedelta(hours=i)
+                ))
+        db_session.commit()
+        project_id = sample_project.id
+        
+        statements = []
+        
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            result = ProjectBottleneckService.get_prs_needing_attention(
+                db_session, project_id, min_hours_in_review=0, limit=20
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        
+        assert len(result) == 10
+        assert len(statements) == 2  # проект + PR с первым ревью
+        hours = [pr["time_in_review_hours"] for pr in result]
+        assert hours == sorted(hours, reverse=True)
+        assert sum(1 for pr in result if pr["has_reviews"]) == 5
+    
     def test_get_prs_needing_attention_empty(self, db_session):
         """Тест для проекта без PR."""
         project = Project(
@@ -436,3 +540,248 @@ class TestProjectBottleneckService:
         )
         
         assert result is None
+
+
+class TestCommitStatsService:
+    """Тесты для дневной сводки коммитов."""
+    
+    def test_period_totals_match_raw_commits(self, db_session, sample_project):
+        """Сводка + граничные дни дают тот же результат, что и подсчёт по коммитам."""
+        now = datetime.utcnow()
+        periods = [
+            (now - timedelta(days=30), now),
+            (now - timedelta(days=10, hours=7), now - timedelta(days=6, hours=3)),
+            (now - timedelta(days=9, hours=5), now - timedelta(days=9, hours=1)),
+        ]
+        for period_start, period_end in periods:
+            commits = db_session.query(Commit).filter(
+                Commit.project_id == sample_project.id,
+                Commit.committed_at.between(period_start, period_end)
+            ).all()
+            
+            totals = CommitStatsService.period_totals(
+                db_session, sample_project.id, period_start, period_end
+            )
+            
+            assert totals["total_commits"] == len(commits)
+            assert totals["active_contributors"] == len({c.author_id for c in commits})
+            assert totals["after_hours_commits"] == sum(1 for c in commits if c.is_after_hours)
+            assert totals["churn_commits"] == sum(1 for c in commits if c.is_churn)
+            assert totals["todo_count"] == sum(c.todo_count for c in commits)
+    
+    def test_bucket_totals_match_single_periods(self, db_session, sample_project):
+        """Один проход по нескольким интервалам совпадает с отдельными запросами."""
+        now = datetime.utcnow()
+        boundaries = [
+            now - timedelta(days=16, hours=3),
+            now - timedelta(days=9, hours=17),
+            now - timedelta(days=9, hours=2),
+            now,
+        ]
+        
+        buckets = CommitStatsService.bucket_totals_by_project(
+            db_session, [sample_project.id], boundaries
+        )[sample_project.id]
+        
+        assert len(buckets) == 3
+        for i, bucket in enumerate(buckets):
+            end = boundaries[i + 1]
+            if i < len(buckets) - 1:
+                end -= timedelta(microseconds=1)
+            expected = CommitStatsService.period_totals(
+                db_session, sample_project.id, boundaries[i], end
+            )
+            assert bucket == expected
+        assert sum(bucket["total_commits"] for bucket in buckets) == 20
+    
+    def test_rebuild_matches_incremental(self, db_session, sample_project):
+        """Полный пересчёт сводки совпадает с инкрементальным обновлением."""
+        def snapshot():
+            rows = db_session.query(CommitDailyStats).order_by(
+                CommitDailyStats.day, CommitDailyStats.author_id
+            ).all()
+            return [(r.author_id, r.day, r.commit_count, r.insertions, r.todo_count) for r in rows]
+        
+        incremental = snapshot()
+        CommitStatsService.rebuild(db_session, sample_project.id)
+        db_session.commit()
+        
+        assert incremental
+        assert snapshot() == incremental
+
+
+class TestPortfolioEffectiveness:
+    """Тесты для оценки эффективности портфеля проектов."""
+    
+    def test_portfolio_matches_single_project(self, db_session, sample_project):
+        """Оценка в портфеле совпадает с оценкой отдельного проекта."""
+        empty_project = Project(external_id="empty-portfolio", name="Empty")
+        db_session.add(empty_project)
+        db_session.commit()
+        
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=30)
+        
+        portfolio = ProjectEffectivenessService.calculate_portfolio_effectiveness(
+            db_session, period_start, period_end,
+            project_ids=[sample_project.id, empty_project.id, 999]
+        )
+        
+        assert portfolio["total_count"] == 2
+        by_id = {p["project_id"]: p for p in portfolio["projects"]}
+        assert by_id[sample_project.id] == ProjectEffectivenessService.calculate_effectiveness_score(
+            db_session, sample_project.id, period_start, period_end
+        )
+        assert by_id[empty_project.id]["total_commits"] == 0
+    
+    def test_portfolio_pagination(self, db_session, sample_project):
+        """Без списка ID возвращаются все проекты постранично."""
+        db_session.add(Project(external_id="second", name="Second"))
+        db_session.commit()
+        
+        period_end = datetime.utcnow()
+        period_start = period_end - timedelta(days=30)
+        
+        page = ProjectEffectivenessService.calculate_portfolio_effectiveness(
+            db_session, period_start, period_end, skip=1, limit=1
+        )
+        
+        assert page["total_count"] == 2
+        assert [p["project_name"] for p in page["projects"]] == ["Second"]
+
+
+class TestProjectTimeseriesService:
+    """Тесты для временных рядов метрик проекта."""
+    
+    def test_bucket_boundaries_are_calendar_aligned(self):
+        """Интервалы выровнены по дню, понедельнику и первому числу месяца."""
+        now = datetime(2024, 3, 13, 15, 30)  # среда
+        assert bucket_boundaries("day", 2, now) == [datetime(2024, 3, 12), datetime(2024, 3, 13), now]
+        assert bucket_boundaries("week", 2, now) == [datetime(2024, 3, 4), datetime(2024, 3, 11), now]
+        assert bucket_boundaries("month", 3, now) == [
+            datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1), now
+        ]
+    
+    @pytest.mark.parametrize("metric", ["effectiveness", "employee_care", "technical_debt", "commits"])
+    def test_points_match_single_period_scoring(self, db_session, sample_project, metric):
+        """Каждая точка совпадает с расчётом за тот же период отдельным вызовом."""
+        now = datetime.utcnow()
+        series = ProjectTimeseriesService.calculate_timeseries(
+            db_session, sample_project.id, metric, "week", 4, now=now
+        )
+        
+        assert len(series["points"]) == 4
+        assert series["points"][-1]["period_end"] == now
+        assert sum(point["total_commits"] for point in series["points"]) == 20
+        for point in series["points"]:
+            start, end = point["period_start"], point["period_end"]
+            if metric == "effectiveness":
+                expected = ProjectEffectivenessService.calculate_effectiveness_score(
+                    db_session, sample_project.id, start, end
+                )["effectiveness_score"]
+            elif metric == "employee_care":
+                expected = ProjectEffectivenessService.calculate_employee_care_metric(
+                    db_session, sample_project.id, start, end
+                )["employee_care_score"]
+            elif metric == "technical_debt":
+                expected = ProjectTechnicalDebtService.analyze_technical_debt(
+                    db_session, sample_project.id, start, end
+                )["technical_debt_score"]
+            else:
+                expected = CommitStatsService.period_totals(
+                    db_session, sample_project.id, start, end
+                )["total_commits"]
+            assert point["value"] == expected
+    
+    def test_timeseries_is_one_aggregate_query(self, db_session, sample_project):
+        """Ряд из 52 точек считается одним запросом агрегации."""
+        statements = []
+        
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            ProjectTimeseriesService.calculate_timeseries(
+                db_session, sample_project.id, "effectiveness", "week", 52
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        
+        assert sum("GROUP BY" in statement for statement in statements) == 1
+    
+    def test_nonexistent_project(self, db_session):
+        """Несуществующий проект."""
+        assert ProjectTimeseriesService.calculate_timeseries(db_session, 999, "commits", "day", 7) is None
+
+
+class TestBulkIngestService:
+    """Тесты для пакетной загрузки записей."""
+    
+    def test_reviews_resolve_pull_requests_by_external_id(self, db_session, sample_project):
+        """Ревью привязываются к PR проекта, неизвестные PR отклоняются."""
+        pr_external_id = db_session.query(PullRequest.external_id).filter(
+            PullRequest.project_id == sample_project.id
+        ).first()[0]
+        reviews = [
+            {"external_id": "review-1", "pull_request_external_id": pr_external_id,
+             "reviewer_email": "user2@test.com", "state": "approved",
+             "created_at": datetime.utcnow().isoformat()},
+            {"external_id": "review-2", "pull_request_external_id": "missing-pr",
+             "state": "commented", "created_at": datetime.utcnow().isoformat()},
+        ]
+        
+        result = BulkIngestService.ingest_batch(db_session, sample_project.id, "reviews", reviews)
+        
+        assert result["inserted"] == 1
+        assert result["rejected"] == 1
+        review = db_session.query(CodeReview).filter(CodeReview.external_id == "review-1").one()
+        assert review.reviewer.email == "user2@test.com"
+    
+    def test_mock_provider_populate_is_idempotent(self, db_session, sample_project):
+        """Повторная загрузка не дублирует записи, авторы определяются по email."""
+        provider = DataProviderFactory.create("mock")
+        provider.ingest_batch_size = 7
+        
+        result = provider.populate_data(db_session, 0, sample_project.id)
+        commits_total = db_session.query(Commit).count()
+        
+        assert result["commits_created"] > 0
+        assert result["reviews_created"] > 0
+        assert db_session.query(Commit).filter(Commit.author_id.is_(None)).count() == 0
+        
+        # Те же записи повторно: все external_id уже есть
+        commits = provider.fetch_commits(db_session, 0, sample_project.id,
+                                         datetime.utcnow() - timedelta(days=5), datetime.utcnow())
+        provider.store_records(db_session, sample_project.id, "commits", commits)
+        assert provider.store_records(db_session, sample_project.id, "commits", commits) == 0
+        assert db_session.query(Commit).count() == commits_total + len(commits)
+
+    def test_churn_is_computed_from_file_index(self, db_session, sample_project):
+        """Коммит, меняющий недавно изменённый файл, отмечается как churn."""
+        start = datetime(2024, 1, 1, 12, 0)
+        
+        def commit(external_id, days, files):
+            return {"external_id": external_id, "message": "change", "author_email": "user1@test.com",
+                    "author_name": "Test User 1", "committed_at": (start + timedelta(days=days)).isoformat(),
+                    "files": files, "is_churn": True}
+        
+        BulkIngestService.ingest_batch(db_session, sample_project.id, "commits", [
+            commit("c-3", 3, ["a.py", "b.py"]),
+            commit("c-1", 0, ["a.py"]),
+            commit("c-2", 1, ["c.py"]),
+        ])
+        # Следующая пачка: b.py изменён 30 дней назад (вне окна), c.py - 39 дней назад
+        BulkIngestService.ingest_batch(db_session, sample_project.id, "commits", [
+            commit("c-4", 33, ["b.py"]),
+            commit("c-3", 40, ["c.py"]),  # дубликат не меняет индекс
+        ])
+        
+        churn = dict(db_session.query(Commit.external_id, Commit.churn_days).filter(
+            Commit.external_id.like("c-%"), Commit.is_churn.is_(True)
+        ))
+        assert churn == {"c-3": 3}
+        index = dict(db_session.query(FileModification.path, FileModification.last_commit_sha).filter(
+            FileModification.project_id == sample_project.id
+        ))
+        assert index == {"a.py": "c-3", "b.py": "c-4", "c.py": "c-2"}
@@ -0,0 +1,118 @@
+"""
+Тесты для профилирования запросов по требованию.
+Tests for on-demand request profiling.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+
+from app.core.cache import MetricsCache
+from app.core.config import settings
+from app.core.request_profiler import ProfileStore, ProfiledRoute, profile_store, run_profiled
+
+
+def test_profile_store_evicts_oldest():
+    """Тест ограниченного хранилища отчётов."""
+    store = ProfileStore(max_entries=2)
+    first = store.add({"mode": "cpu"})
+    second = store.add({"mode": "mem"})
+    third = store.add({"mode": "cpu"})
+    assert store.get(first) is None
+    assert store.get(second)["mode"] == "mem"
+    assert store.get(third)["id"] == third
+
+
+def test_cache_bypass_skips_reads():
+    """Тест: внутри bypass() кэш не читается, но сохраняет результат."""
+    cache = MetricsCache()
+    cache.set(1, "metric", None, "cached")
+    with cache.bypass():
+        assert cache.get(1, "metric") is None
+        assert cache.get_or_compute(1, "metric", None, lambda: "fresh") == "fresh"
+    assert cache.get(1, "metric") == "fresh"
+
+
+def test_run_profiled_cpu_reports_handler_functions():
+    """Тест: отчёт cpu содержит функции обработчика, но не окружающий стек."""
+    def scoring():
+        return sum(i * i for i in range(10000))
+
+    async def handler():
+        await asyncio.sleep(0)
+        return scoring()
+
+    result, report = asyncio.run(run_profiled("cpu", handler))
+    locations = [entry["location"] for entry in report["entries"]]
+    assert result == scoring()
+    assert any(location.endswith("(scoring)") for location in locations)
+    assert not any("(test_run_profiled_cpu_reports_handler_functions)" in location for location in locations)
+    assert report["duration_ms"] >= 0
+
+
+def test_run_profiled_mem_reports_allocation_sites():
+    """Тест: отчёт mem содержит места выделения памяти, оставшейся занятой."""
+    async def handler():
+        return [bytearray(1024) for _ in range(100)]
+
+    result, report = asyncio.run(run_profiled("mem", handler))
+    assert len(result) == 100
+    assert report["peak_kb"] >= 100
+    assert report["entries"][0]["location"].endswith(f"test_request_profiler.py:{handler.__code__.co_firstlineno + 1}")
+
+
+def test_profiling_disabled_by_default(monkeypatch):
+    """Тест: без REQUEST_PROFILING_ENABLED параметр profile запрещён, даже при DEBUG."""
+    from starlette.requests import Request
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    monkeypatch.setattr(settings, "REQUEST_PROFILING_ENABLED", False)
+
+    async def endpoint():
+        return {}
+
+    handler = ProfiledRoute("/x", endpoint).get_route_handler()
+    request = Request({"type": "http", "method": "GET", "path": "/x", "query_string": b"profile=cpu", "headers": []})
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(handler(request))
+    assert error.value.status_code == 403
+
+
+def test_cpu_report_excludes_concurrent_requests(monkeypatch):
+    """Тест: работа другого маршрута во время ожидания обработчика не попадает в отчёт cpu."""
+    monkeypatch.setattr(settings, "REQUEST_PROFILING_ENABLED", True)
+    router = APIRouter(route_class=ProfiledRoute)
+
+    def profiled_work():
+        return sum([i * i for i in range(100000)])
+
+    def other_work():
+        return sum(i * i for i in range(200000))
+
+    @router.get("/profiled")
+    async def profiled():
+        await asyncio.sleep(0.2)
+        return {"value": profiled_work()}
+
+    @router.get("/other")
+    async def other():
+        return {"value": other_work()}
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            profiled_request = asyncio.create_task(client.get("/profiled", params={"profile": "cpu"}))
+            await asyncio.sleep(0.05)
+            await client.get("/other")
+            return await profiled_request
+
+    response = asyncio.run(scenario())
+    report = profile_store.get(response.headers["x-profile-id"])
+    locations = [entry["location"] for entry in report["entries"]]
+    assert any(location.endswith("(profiled_work)") for location in locations)
+    assert not any(location.endswith("(other_work)") or location.endswith("(other)") for location in locations)
+    assert "other requests" in report["note"]
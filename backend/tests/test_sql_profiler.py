@@ -0,0 +1,82 @@
+"""
+Тесты для профилировщика SQL-запросов.
+Tests for the per-request SQL profiler.
+"""
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.sql_profiler import (
+    QueryProfile,
+    SQLProfilerMiddleware,
+    install_sql_profiler,
+    statement_shape,
+)
+
+
+def test_statement_shape_collapses_parameter_lists():
+    """Тест: формы запросов не зависят от пробелов и длины списка IN."""
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?...)"
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?)") == "SELECT * FROM t WHERE id IN (?...)"
+    assert statement_shape("SELECT * FROM t WHERE id = ?") == "SELECT * FROM t WHERE id = ?"
+
+
+def test_query_profile_summary():
+    """Тест подсчёта запросов, самого медленного запроса и повторов."""
+    profile = QueryProfile()
+    for i in range(3):
+        profile.record("SELECT * FROM t WHERE id = ?", 0.001)
+    profile.record("SELECT count(*) FROM t", 0.01)
+
+    summary = profile.summary(threshold=2)
+    assert summary["queries"] == 4
+    assert summary["total_ms"] == 13.0
+    assert summary["slowest_statement"] == "SELECT count(*) FROM t"
+    assert summary["repeated_statements"] == [{"statement": "SELECT * FROM t WHERE id = ?", "count": 3}]
+    assert profile.server_timing() == 'db;desc="4 queries";dur=13.00, db-slowest;dur=10.00'
+
+
+def _profiled_app():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    app = FastAPI()
+
+    @app.get("/items")
+    def items():
+        # Намеренный N+1: отдельный запрос на каждый элемент
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT :id"), {"id": i}).scalar() for i in range(5)]
+
+    install_sql_profiler()
+    app.add_middleware(SQLProfilerMiddleware)
+    return app
+
+
+def test_middleware_is_opt_in_by_header(monkeypatch):
+    """Тест: без DEBUG профиль включается только заголовком."""
+    monkeypatch.setattr(settings, "DEBUG", False)
+    client = TestClient(_profiled_app())
+
+    assert "server-timing" not in client.get("/items").headers
+    response = client.get("/items", headers={settings.SQL_PROFILER_HEADER: "1"})
+    assert response.headers["server-timing"].startswith('db;desc="5 queries";dur=')
+
+
+def test_middleware_warns_about_repeated_statements(monkeypatch, caplog):
+    """Тест предупреждения N+1 при превышении порога повторов."""
+    monkeypatch.setattr(settings, "DEBUG", True)
+    monkeypatch.setattr(settings, "SQL_PROFILER_REPEAT_THRESHOLD", 3)
+    client = TestClient(_profiled_app())
+
+    with caplog.at_level(logging.INFO, logger="app.core.sql_profiler"):
+        client.get("/items")
+
+    assert any('"queries": 5' in record.getMessage() for record in caplog.records)
+    warnings = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert len(warnings) == 1
+    assert "5 раз" in warnings[0].getMessage()
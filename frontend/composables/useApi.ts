@@ -63,6 +63,22 @@ export const useApi = () => {
     }
   }
 
+  const fetchPortfolioEffectiveness = async (projectIds: number[] = [], periodDays: number = 30, skip: number = 0, limit: number = 100) => {
+    try {
+      const ids = projectIds.length ? `&ids=${projectIds.join(',')}` : ''
+      const response = await fetch(
+        `${apiBase}/metrics/projects/effectiveness?period_days=${periodDays}&skip=${skip}&limit=${limit}${ids}`
+      )
+      if (!response.ok) {
+        throw new Error('Failed to fetch portfolio effectiveness')
+      }
+      return await response.json()
+    } catch (error) {
+      console.error('Error fetching portfolio effectiveness:', error)
+      throw error
+    }
+  }
+
   const fetchProjectTechnicalDebt = async (projectId: number, periodDays: number = 30) => {
     try {
       const response = await fetch(
@@ -153,6 +169,26 @@ export const useApi = () => {
     }
   }
 
+  const fetchMetricTimeseries = async (
+    projectId: number,
+    metric: string = 'effectiveness',
+    bucket: 'day' | 'week' | 'month' = 'week',
+    periods: number = 12
+  ) => {
+    try {
+      const response = await fetch(
+        `${apiBase}/metrics/project/${projectId}/timeseries?metric=${metric}&bucket=${bucket}&periods=${periods}`
+      )
+      if (!response.ok) {
+        throw new Error('Failed to fetch metric time series')
+      }
+      return await response.json()
+    } catch (error) {
+      console.error('Error fetching metric time series:', error)
+      throw error
+    }
+  }
+
 
   return {
     // Projects
@@ -161,11 +197,13 @@ export const useApi = () => {
     deleteProject,
     // Project Metrics
     fetchProjectMetrics,
+    fetchPortfolioEffectiveness,
     fetchProjectTechnicalDebt,
     fetchProjectBottlenecks,
     fetchProjectEmployeeCare,
     fetchPRsNeedingAttention,
     fetchActiveContributors,
-    fetchCommitsPerPerson
+    fetchCommitsPerPerson,
+    fetchMetricTimeseries
   }
 }